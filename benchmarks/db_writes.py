@@ -0,0 +1,75 @@
+"""
+Author Sarthak Vijayvergiya - https://github.com/sarthakvijayvergiya
+Description: Measures how many settings writes per second the database handles, one commit per write
+in rollback journal mode versus grouped commits in WAL mode.
+
+Usage: python -m benchmarks.db_writes [--writes 2000] [--directory .]
+"""
+
+import argparse
+import asyncio
+import tempfile
+import time
+
+import aiosqlite
+
+from database import DatabaseManager
+
+
+async def create_database(path: str) -> aiosqlite.Connection:
+    connection = await aiosqlite.connect(path)
+    await DatabaseManager(connection=connection).migrate()
+    return connection
+
+
+async def commit_per_write(path: str, writes: int) -> float:
+    connection = await create_database(path)
+    lock = asyncio.Lock()
+
+    async def add_api_key(user_id, api_key):
+        # The write path before batching: one transaction per call
+        async with lock:
+            await connection.execute(
+                "INSERT INTO user_settings(user_id, api_key) VALUES (?, ?) "
+                "ON CONFLICT(user_id) DO UPDATE SET api_key = excluded.api_key",
+                (user_id, api_key),
+            )
+            await connection.commit()
+
+    started_at = time.perf_counter()
+    await asyncio.gather(*(add_api_key(i, f"key-{i}") for i in range(writes)))
+    elapsed = time.perf_counter() - started_at
+    await connection.close()
+    return elapsed
+
+
+async def batched_wal_writes(path: str, writes: int) -> float:
+    database = DatabaseManager(connection=await create_database(path))
+    await database.initialize()
+    started_at = time.perf_counter()
+    await asyncio.gather(*(database.add_api_key(i, f"key-{i}") for i in range(writes)))
+    elapsed = time.perf_counter() - started_at
+    await database.close()
+    return elapsed
+
+
+async def main() -> None:
+    parser = argparse.ArgumentParser(description=__doc__)
+    parser.add_argument("--writes", type=int, default=2000)
+    parser.add_argument(
+        "--directory",
+        default=None,
+        help="Where to create the databases, use a directory on the same disk as the bot",
+    )
+    args = parser.parse_args()
+    with tempfile.TemporaryDirectory(dir=args.directory) as directory:
+        before = await commit_per_write(f"{directory}/before.db", args.writes)
+        after = await batched_wal_writes(f"{directory}/after.db", args.writes)
+    print(f"{args.writes} concurrent writes")
+    print(f"Commit per write, rollback journal: {args.writes / before:10.0f} writes/s")
+    print(f"Grouped commits, WAL:              {args.writes / after:10.0f} writes/s")
+    print(f"Speedup: {before / after:.1f}x")
+
+
+if __name__ == "__main__":
+    asyncio.run(main())
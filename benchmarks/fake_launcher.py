@@ -0,0 +1,167 @@
+"""
+Author Sarthak Vijayvergiya - https://github.com/sarthakvijayvergiya
+Description: A local stand-in for the Human Protocol job launcher server, implementing the endpoints used by
+the ExternalAPIHandler with configurable latency, error rate and result sizes.
+
+Usage: python -m benchmarks.fake_launcher [--port 8000] [--latency 0.05] [--error-rate 0.01]
+Then point API_BASE_URL at http://127.0.0.1:8000.
+"""
+
+import argparse
+import asyncio
+import itertools
+import random
+
+from aiohttp import web
+
+
+class FakeLauncher:
+    def __init__(
+        self,
+        *,
+        latency: float = 0.0,
+        latency_jitter: float = 0.0,
+        error_rate: float = 0.0,
+        ready_after: int = 1,
+        solution_size: int = 32,
+        batch: bool = False,
+        trickle: int = 0,
+    ) -> None:
+        """
+        :param latency: The mean number of seconds every request takes.
+        :param latency_jitter: The maximum number of seconds randomly added to or removed from the latency.
+        :param error_rate: The fraction of requests answered with a 500.
+        :param ready_after: The number of result requests of a job answered with no results before its results are ready.
+        :param solution_size: The number of characters of every solution.
+        :param batch: Whether to serve the batch result endpoint on /job/results.
+        :param trickle: The number of submissions added by every result request once results are ready,
+        0 for all of them at once.
+        """
+        self.latency = latency
+        self.latency_jitter = latency_jitter
+        self.error_rate = error_rate
+        self.ready_after = ready_after
+        self.solution_size = solution_size
+        self.batch = batch
+        self.trickle = trickle
+        self.job_ids = itertools.count(1)
+        self.jobs = {}  # job ID -> [submissions required, result requests so far]
+        self.requests = 0
+        self.errors = 0
+
+    def application(self) -> web.Application:
+        app = web.Application()
+        app.router.add_post("/job/fortune", self.create_job)
+        app.router.add_get("/job/result", self.get_result)
+        app.router.add_get("/job/details/{job_id}", self.get_details)
+        if self.batch:
+            app.router.add_post("/job/results", self.get_results)
+        return app
+
+    async def simulate(self) -> bool:
+        """
+        This function waits for the simulated latency and returns whether the request should fail.
+        """
+        self.requests += 1
+        delay = self.latency + random.uniform(-self.latency_jitter, self.latency_jitter)
+        if delay > 0:
+            await asyncio.sleep(delay)
+        if random.random() < self.error_rate:
+            self.errors += 1
+            return True
+        return False
+
+    def results(self, job_id: int):
+        job = self.jobs.get(job_id)
+        if job is None:
+            return None
+        job[1] += 1
+        if job[1] <= self.ready_after:
+            return []
+        submissions = job[0]
+        if self.trickle:
+            submissions = min(submissions, (job[1] - self.ready_after) * self.trickle)
+        return [
+            {
+                "workerAddress": f"0x{index:040x}",
+                "solution": f"{job_id}-{index}-".ljust(self.solution_size, "x"),
+            }
+            for index in range(submissions)
+        ]
+
+    async def create_job(self, request: web.Request) -> web.Response:
+        if await self.simulate():
+            return web.json_response({"message": "Internal server error"}, status=500)
+        payload = await request.json()
+        job_id = next(self.job_ids)
+        self.jobs[job_id] = [int(payload["submissionsRequired"]), 0]
+        return web.json_response(job_id, status=201)
+
+    async def get_result(self, request: web.Request) -> web.Response:
+        if await self.simulate():
+            return web.json_response({"message": "Internal server error"}, status=500)
+        results = self.results(int(request.query["jobId"]))
+        if results is None:
+            return web.json_response({"message": "Job not found"}, status=404)
+        # Like a server supporting API_RESULT_OFFSET_PARAM=skip
+        return web.json_response(results[int(request.query.get("skip", 0)):])
+
+    async def get_details(self, request: web.Request) -> web.Response:
+        if await self.simulate():
+            return web.json_response({"message": "Internal server error"}, status=500)
+        job = self.jobs.get(int(request.match_info["job_id"]))
+        if job is None:
+            return web.json_response({"message": "Job not found"}, status=404)
+        return web.json_response({"details": {"status": "LAUNCHED"}})
+
+    async def get_results(self, request: web.Request) -> web.Response:
+        if await self.simulate():
+            return web.json_response({"message": "Internal server error"}, status=500)
+        payload = await request.json()
+        response = {}
+        for job_id in payload["jobIds"]:
+            results = self.results(int(job_id))
+            response[str(job_id)] = results if results is not None else {"error": "Job not found"}
+        return web.json_response(response)
+
+
+async def start_fake_launcher(launcher: FakeLauncher, host: str = "127.0.0.1", port: int = 0):
+    """
+    This function serves a fake launcher in the running event loop.
+
+    :return: A tuple of the runner, to clean up when done, and the base URL of the server.
+    """
+    runner = web.AppRunner(launcher.application(), access_log=None)
+    await runner.setup()
+    site = web.TCPSite(runner, host, port)
+    await site.start()
+    port = runner.addresses[0][1]
+    return runner, f"http://{host}:{port}"
+
+
+def main() -> None:
+    parser = argparse.ArgumentParser(description=__doc__, formatter_class=argparse.RawDescriptionHelpFormatter)
+    parser.add_argument("--host", default="127.0.0.1")
+    parser.add_argument("--port", type=int, default=8000)
+    parser.add_argument("--latency", type=float, default=0.05)
+    parser.add_argument("--latency-jitter", type=float, default=0.02)
+    parser.add_argument("--error-rate", type=float, default=0.0)
+    parser.add_argument("--ready-after", type=int, default=1)
+    parser.add_argument("--solution-size", type=int, default=32)
+    parser.add_argument("--batch", action="store_true")
+    parser.add_argument("--trickle", type=int, default=0)
+    args = parser.parse_args()
+    launcher = FakeLauncher(
+        latency=args.latency,
+        latency_jitter=args.latency_jitter,
+        error_rate=args.error_rate,
+        ready_after=args.ready_after,
+        solution_size=args.solution_size,
+        batch=args.batch,
+        trickle=args.trickle,
+    )
+    web.run_app(launcher.application(), host=args.host, port=args.port, access_log=None)
+
+
+if __name__ == "__main__":
+    main()
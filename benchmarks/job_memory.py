@@ -0,0 +1,73 @@
+"""
+Author Sarthak Vijayvergiya - https://github.com/sarthakvijayvergiya
+Description: Measures the memory held by queued jobs, as the dictionaries that kept the API key and the whole
+launch response of every job versus the JobRecord slots that keep the parsed job ID and integer references.
+
+Usage: python -m benchmarks.job_memory [--jobs 100000]
+"""
+
+import argparse
+import gc
+import tracemalloc
+
+from database.records import JobRecord
+
+
+def job_dicts(jobs: int, users: int) -> list:
+    # What claiming jobs returned before: text columns read from SQLite, one copy of every string per job
+    return [
+        {
+            "id": index,
+            "job_id": f"{{'id': {index}, 'escrowAddress': '0x{index:040x}', 'chainId': 80001}}",
+            "user_id": f"{100000000000000000 + index % users}",
+            "api_key": f"{index % users:064x}",
+            "result_channel_id": f"{200000000000000000 + index % users}",
+            "attempts": 0,
+            "claim": f"worker-1:{0:032x}",
+        }
+        for index in range(jobs)
+    ]
+
+
+def job_records(jobs: int, users: int) -> list:
+    # What claiming jobs returns now, see DatabaseManager.claim_due_jobs
+    claim = f"worker-1:{0:032x}"
+    ids = {}
+    return [
+        JobRecord(
+            index,
+            str(index),
+            ids.setdefault(f"u{index % users}", 100000000000000000 + index % users),
+            ids.setdefault(f"c{index % users}", 200000000000000000 + index % users),
+            0,
+            claim,
+        )
+        for index in range(jobs)
+    ]
+
+
+def measure(build, jobs: int, users: int) -> int:
+    gc.collect()
+    tracemalloc.start()
+    queued = build(jobs, users)
+    size, _ = tracemalloc.get_traced_memory()
+    tracemalloc.stop()
+    del queued
+    return size
+
+
+def main() -> None:
+    parser = argparse.ArgumentParser(description=__doc__)
+    parser.add_argument("--jobs", type=int, default=100000)
+    parser.add_argument("--users", type=int, default=1000)
+    args = parser.parse_args()
+    before = measure(job_dicts, args.jobs, args.users)
+    after = measure(job_records, args.jobs, args.users)
+    print(f"{args.jobs} queued jobs of {args.users} users")
+    print(f"Dictionaries with API key and response: {before / 2 ** 20:8.1f} MiB ({before / args.jobs:.0f} bytes/job)")
+    print(f"JobRecord slots:                        {after / 2 ** 20:8.1f} MiB ({after / args.jobs:.0f} bytes/job)")
+    print(f"Reduction: {before / after:.1f}x")
+
+
+if __name__ == "__main__":
+    main()
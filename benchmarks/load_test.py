@@ -0,0 +1,209 @@
+"""
+Author Sarthak Vijayvergiya - https://github.com/sarthakvijayvergiya
+Description: Drives JobLauncher.launch and publish_results with thousands of synthetic jobs against the
+fake job launcher server, with Discord stubbed out, and reports throughput, latency and memory.
+
+Usage: python -m benchmarks.load_test [--jobs 2000] [--submissions 20] [--latency 0.02] [--error-rate 0.01]
+"""
+
+import argparse
+import asyncio
+import logging
+import os
+import resource
+import tempfile
+import time
+import tracemalloc
+
+import aiosqlite
+
+from benchmarks.fake_launcher import FakeLauncher, start_fake_launcher
+from database import DatabaseManager
+from database.key_vault import KeyVault
+from services.http_client import create_http_session
+from services.network_registry import NetworkRegistry
+
+
+def percentile(values, percent: float) -> float:
+    if not values:
+        return 0.0
+    values = sorted(values)
+    return values[min(len(values) - 1, int(len(values) * percent / 100))]
+
+
+class StubChannel:
+    def __init__(self, channel_id: int, latency: float, sends: list) -> None:
+        self.id = channel_id
+        self.latency = latency
+        self.sends = sends
+
+    async def send(self, content=None, **kwargs) -> None:
+        started_at = time.perf_counter()
+        await asyncio.sleep(self.latency)
+        self.sends.append(time.perf_counter() - started_at)
+
+
+class StubBot:
+    """
+    The parts of the bot used by the JobLauncher cog, without a gateway connection.
+    """
+
+    def __init__(self, database, http_session, discord_latency: float) -> None:
+        self.database = database
+        self.http_session = http_session
+        self.logger = logging.getLogger("load_test")
+        self.sends = []
+        self.channels = {}
+        self.discord_latency = discord_latency
+        self.networks = NetworkRegistry.from_env()
+
+    def get_channel(self, channel_id: int):
+        if channel_id not in self.channels:
+            self.channels[channel_id] = StubChannel(channel_id, self.discord_latency, self.sends)
+        return self.channels[channel_id]
+
+    def get_partial_messageable(self, channel_id: int):
+        return self.get_channel(channel_id)
+
+
+async def run(args) -> None:
+    launcher = FakeLauncher(
+        latency=args.latency,
+        latency_jitter=args.latency / 2,
+        error_rate=args.error_rate,
+        ready_after=args.ready_after,
+        batch=args.batch,
+        trickle=args.trickle,
+    )
+    runner, base_url = await start_fake_launcher(launcher)
+    os.environ["API_BASE_URL"] = base_url
+    os.environ["SUPPORTED_NETWORKS"] = '{"Localhost": 1338}'
+    os.environ["RESULT_CHECK_MIN_INTERVAL"] = "0"
+    os.environ.setdefault("API_KEY_VAULT_SECRET", "load test")
+    if args.batch:
+        os.environ["API_BATCH_RESULT_PATH"] = "/job/results"
+    if args.skip:
+        os.environ["API_RESULT_OFFSET_PARAM"] = "skip"
+    # Imported after the environment is set, as the cog reads it when it is created
+    from cogs.job_launcher import JobLauncher
+
+    with tempfile.TemporaryDirectory() as directory:
+        database = DatabaseManager(
+            connection=await aiosqlite.connect(f"{directory}/database.db"), vault=KeyVault.from_env()
+        )
+        await database.initialize()
+        http_session = create_http_session()
+        bot = StubBot(database, http_session, args.discord_latency)
+        cog = JobLauncher(bot)
+        users = range(1, args.users + 1)
+        for user_id in users:
+            await database.add_api_key(user_id, f"key-{user_id}")
+            await database.add_result_channel(user_id, 10_000 + user_id)
+            if args.digest:
+                await database.set_channel_digest(10_000 + user_id, args.digest)
+
+        tracemalloc.start()
+        launch_latencies = []  # Of the launches that succeeded
+        failed_launches = []  # Answers to the launches that did not
+        semaphore = asyncio.Semaphore(args.concurrency)
+
+        async def launch(index: int) -> None:
+            user_id = users[index % len(users)]
+            async with semaphore:
+                started_at = time.perf_counter()
+                # What the launch form does once it is submitted
+                answer = await cog.launch(user_id, f"Job {index}", args.submissions, "Load test", 1, "Localhost")
+                if answer.startswith("Job launched successfully"):
+                    launch_latencies.append(time.perf_counter() - started_at)
+                else:
+                    failed_launches.append(answer)
+
+        started_at = time.perf_counter()
+        await asyncio.gather(*(launch(index) for index in range(args.jobs)))
+        launch_elapsed = time.perf_counter() - started_at
+
+        tick_durations = []
+        started_at = time.perf_counter()
+        while True:
+            async with database.connection.execute(
+                "SELECT COUNT(*) FROM jobs WHERE status = 'pending'"
+            ) as cursor:
+                (pending,) = await cursor.fetchone()
+            if not pending or time.perf_counter() - started_at > args.max_duration:
+                break
+            # Make every pending job due so that one pass checks all of them. Jobs whose results are still
+            # being sent stay claimed, and are completed by the pass after their messages were sent.
+            due = await database.write(
+                "UPDATE jobs SET next_check_at = 0 WHERE status = 'pending' AND claimed_by IS NULL"
+            )
+            if not due:
+                await cog.result_worker.write_deliveries()
+                await asyncio.sleep(0.01)
+                continue
+            cog.scheduler.throttled_until = 0
+            tick_started_at = time.perf_counter()
+            await cog.result_worker.run_pass()
+            tick_durations.append(time.perf_counter() - tick_started_at)
+        poll_elapsed = time.perf_counter() - started_at
+        # Sends are paced per channel, so draining the queues depends on how many jobs share a channel
+        while cog.result_worker.result_publisher.senders or cog.result_worker.result_publisher.digests:
+            await asyncio.sleep(0.01)
+        publish_elapsed = time.perf_counter() - started_at
+        current_memory, peak_memory = tracemalloc.get_traced_memory()
+        tracemalloc.stop()
+
+        await cog.result_worker.result_publisher.close()
+        await http_session.close()
+        await database.close()
+    await runner.cleanup()
+
+    print(
+        f"Launched {len(launch_latencies)} jobs in {launch_elapsed:.2f}s"
+        f" ({len(launch_latencies) / launch_elapsed:.0f} jobs/s), {len(failed_launches)} launches failed"
+    )
+    print(
+        f"  launch latency p50 {percentile(launch_latencies, 50) * 1000:.1f}ms"
+        f" p99 {percentile(launch_latencies, 99) * 1000:.1f}ms"
+    )
+    for answer in sorted(set(failed_launches)):
+        print(f"  {failed_launches.count(answer)} answered: {answer}")
+    print(f"Polled results in {poll_elapsed:.2f}s over {len(tick_durations)} passes, {pending} jobs left")
+    print(
+        f"  pass duration p50 {percentile(tick_durations, 50) * 1000:.1f}ms"
+        f" p99 {percentile(tick_durations, 99) * 1000:.1f}ms"
+        f" max {max(tick_durations, default=0) * 1000:.1f}ms"
+    )
+    print(f"Published results in {publish_elapsed:.2f}s to {len(bot.channels)} channels")
+    print(
+        f"  {len(bot.sends)} Discord messages, send latency p50 {percentile(bot.sends, 50) * 1000:.1f}ms"
+        f" p99 {percentile(bot.sends, 99) * 1000:.1f}ms"
+    )
+    print(f"Launcher requests: {launcher.requests} ({launcher.errors} errors)")
+    print(
+        f"Memory: peak traced {peak_memory / 1024 / 1024:.1f} MiB,"
+        f" max RSS {resource.getrusage(resource.RUSAGE_SELF).ru_maxrss / 1024:.1f} MiB"
+    )
+
+
+def main() -> None:
+    parser = argparse.ArgumentParser(description=__doc__, formatter_class=argparse.RawDescriptionHelpFormatter)
+    parser.add_argument("--jobs", type=int, default=2000)
+    parser.add_argument("--users", type=int, default=100)
+    parser.add_argument("--submissions", type=int, default=20)
+    parser.add_argument("--concurrency", type=int, default=50, help="Launches in flight at once")
+    parser.add_argument("--latency", type=float, default=0.02, help="Launcher latency in seconds")
+    parser.add_argument("--error-rate", type=float, default=0.0)
+    parser.add_argument("--ready-after", type=int, default=1)
+    parser.add_argument("--discord-latency", type=float, default=0.01)
+    parser.add_argument("--batch", action="store_true", help="Use the batch result endpoint")
+    parser.add_argument("--trickle", type=int, default=0, help="Submissions added by every result request, 0 for all")
+    parser.add_argument("--skip", action="store_true", help="Leave out published results on the server")
+    parser.add_argument("--digest", type=float, default=0, help="Seconds between digests of every channel, 0 for none")
+    parser.add_argument("--max-duration", type=float, default=300, help="Give up publishing after this many seconds")
+    args = parser.parse_args()
+    logging.basicConfig(level=logging.WARNING)
+    asyncio.run(run(args))
+
+
+if __name__ == "__main__":
+    main()
@@ -3,20 +3,36 @@ Author Sarthak Vijayvergiya - https://github.com/sarthakvijayvergiya
 Description: A Discord bot that helps in launching jobs, setting API keys, and configuring result channels for the Human Protocol.
 """
 
+import ast
+import asyncio
+import importlib
 import json
-import logging
 import os
 import platform
 import random
 import sys
+import time
+
+if os.getenv("PROFILE_IMPORTS"):
+    # Installed before the other imports so that they are timed too
+    from helpers.import_profiler import ImportProfiler
+
+    import_profiler = ImportProfiler()
+    import_profiler.install()
+else:
+    import_profiler = None
 
-import aiosqlite
 import discord
 from discord.ext import commands, tasks
 from discord.ext.commands import Context
 from dotenv import load_dotenv
 
-from database import DatabaseManager
+from database import open_database
+from helpers.conversations import ConversationRouter
+from helpers.logger import process_log_file, setup_logging
+from services.http_client import create_http_session
+from services.metrics import REGISTRY, start_metrics_server
+from services.network_registry import NetworkConfigError, NetworkRegistry
 
 if not os.path.isfile(f"{os.path.realpath(os.path.dirname(__file__))}/config.json"):
     sys.exit("'config.json' not found! Please add it and try again.")
@@ -24,6 +40,8 @@ else:
     with open(f"{os.path.realpath(os.path.dirname(__file__))}/config.json") as file:
         config = json.load(file)
 
+load_dotenv()
+
 """	
 Setup bot intents (events restrictions)
 For more information about intents, please go to the following websites:
@@ -68,64 +86,71 @@ If you want to use prefix commands, make sure to also enable the intent below in
 """
 # intents.message_content = True
 
-# Setup both of the loggers
-
-
-class LoggingFormatter(logging.Formatter):
-    # Colors
-    black = "\x1b[30m"
-    red = "\x1b[31m"
-    green = "\x1b[32m"
-    yellow = "\x1b[33m"
-    blue = "\x1b[34m"
-    gray = "\x1b[38m"
-    # Styles
-    reset = "\x1b[0m"
-    bold = "\x1b[1m"
-
-    COLORS = {
-        logging.DEBUG: gray + bold,
-        logging.INFO: blue + bold,
-        logging.WARNING: yellow + bold,
-        logging.ERROR: red,
-        logging.CRITICAL: red + bold,
-    }
-
-    def format(self, record):
-        log_color = self.COLORS[record.levelno]
-        format = "(black){asctime}(reset) (levelcolor){levelname:<8}(reset) (green){name}(reset) {message}"
-        format = format.replace("(black)", self.black + self.bold)
-        format = format.replace("(reset)", self.reset)
-        format = format.replace("(levelcolor)", log_color)
-        format = format.replace("(green)", self.green + self.bold)
-        formatter = logging.Formatter(format, "%Y-%m-%d %H:%M:%S", style="{")
-        return formatter.format(record)
-
-
-logger = logging.getLogger("discord_bot")
-logger.setLevel(logging.INFO)
-
-# Console handler
-console_handler = logging.StreamHandler()
-console_handler.setFormatter(LoggingFormatter())
-# File handler
-file_handler = logging.FileHandler(filename="discord.log", encoding="utf-8", mode="w")
-file_handler_formatter = logging.Formatter(
-    "[{asctime}] [{levelname:<8}] {name}: {message}", "%Y-%m-%d %H:%M:%S", style="{"
+# Setup both of the loggers. A process running some of the shards writes its own log file
+logger = setup_logging(
+    log_file=process_log_file(f"shards-{os.getenv('SHARD_IDS')}") if os.getenv("SHARD_IDS") else "discord.log"
 )
-file_handler.setFormatter(file_handler_formatter)
 
-# Add the handlers
-logger.addHandler(console_handler)
-logger.addHandler(file_handler)
+
+def parse_shard_ids(value):
+    """
+    Parse the shards run by this process, e.g. `0-3,8`, or None to run every shard.
+    """
+    if not value:
+        return None
+    shard_ids = []
+    for part in value.split(","):
+        first, _, last = part.strip().partition("-")
+        shard_ids.extend(range(int(first), int(last or first) + 1))
+    return shard_ids
+
+
+"""
+Several processes can share the shards: every process sets SHARD_COUNT to the total number of shards and
+SHARD_IDS to the range it runs. Without them, Discord's recommended number of shards all run in this process.
+"""
+shard_count = int(os.getenv("SHARD_COUNT")) if os.getenv("SHARD_COUNT") else None
+shard_ids = parse_shard_ids(os.getenv("SHARD_IDS"))
+if shard_ids is not None and shard_count is None:
+    sys.exit("'SHARD_IDS' is set without 'SHARD_COUNT'! Please set both and try again.")
+
+
+def prepare_extension(path):
+    """
+    This function imports the modules an extension needs, so that loading it afterwards only runs its own
+    code. The extension itself is not imported, as discord.py runs a fresh copy of it when it is loaded.
+
+    :param path: The path of the extension.
+    :return: The names of the extensions it depends on, from its `DEPENDENCIES`.
+    """
+    with open(path, encoding="utf-8") as file:
+        tree = ast.parse(file.read(), path)
+    dependencies = ()
+    for node in tree.body:
+        if isinstance(node, ast.Import):
+            modules = [alias.name for alias in node.names]
+        elif isinstance(node, ast.ImportFrom) and not node.level:
+            modules = [node.module]
+        elif isinstance(node, ast.Assign) and any(
+            isinstance(target, ast.Name) and target.id == "DEPENDENCIES" for target in node.targets
+        ):
+            dependencies = tuple(ast.literal_eval(node.value))
+            continue
+        else:
+            continue
+        for module in modules:
+            importlib.import_module(module)
+    return dependencies
 
 
-class DiscordBot(commands.Bot):
+class DiscordBot(commands.AutoShardedBot):
     def __init__(self) -> None:
         super().__init__(
             command_prefix=commands.when_mentioned_or(config["prefix"]),
             intents=intents,
             help_command=None,
+            shard_count=shard_count,
+            shard_ids=shard_ids,
         )
         """
         This creates custom bot variables so that we can access these variables in cogs more easily.
@@ -138,32 +163,70 @@ class DiscordBot(commands.Bot):
         self.logger = logger
         self.config = config
         self.database = None
+        self.http_session = None
+        self.metrics_server = None
+        self.startup_timings = {}
+        self.gateway_started_at = None
+        self.conversations = ConversationRouter()
+        self.networks = NetworkRegistry()
 
     async def init_db(self) -> None:
-        async with aiosqlite.connect(
-            f"{os.path.realpath(os.path.dirname(__file__))}/database/database.db"
-        ) as db:
-            with open(
-                f"{os.path.realpath(os.path.dirname(__file__))}/database/schema.sql"
-            ) as file:
-                await db.executescript(file.read())
-            await db.commit()
+        """
+        Open the database connection used for the whole lifetime of the bot and apply the pending migrations.
+        """
+        self.database = await open_database()
+        applied = await self.database.initialize()
+        self.logger.info(f"Applied {applied} database migrations")
 
     async def load_cogs(self) -> None:
         """
-        The code in this function is executed whenever the bot will start.
+        The code in this function is executed whenever the bot will start. The modules every extension
+        needs are imported concurrently in threads, and each one is set up once the extensions listed in
+        its `DEPENDENCIES` are loaded.
         """
-        for file in os.listdir(f"{os.path.realpath(os.path.dirname(__file__))}/cogs"):
-            if file.endswith(".py"):
-                extension = file[:-3]
-                try:
-                    await self.load_extension(f"cogs.{extension}")
-                    self.logger.info(f"Loaded extension '{extension}'")
-                except Exception as e:
-                    exception = f"{type(e).__name__}: {e}"
-                    self.logger.error(
-                        f"Failed to load extension {extension}\n{exception}"
-                    )
+        directory = f"{os.path.realpath(os.path.dirname(__file__))}/cogs"
+        files = await asyncio.to_thread(os.listdir, directory)
+        extensions = sorted(file[:-3] for file in files if file.endswith(".py"))
+        loop = asyncio.get_running_loop()
+        loaded = {extension: loop.create_future() for extension in extensions}
+        dependencies = {}
+
+        def depends_on(extension, target, seen=()):
+            return any(
+                dependency == target
+                or (dependency not in seen and depends_on(dependency, target, (*seen, dependency)))
+                for dependency in dependencies.get(extension, ())
+            )
+
+        async def load(extension):
+            try:
+                started_at = time.perf_counter()
+                dependencies[extension] = await asyncio.to_thread(
+                    prepare_extension, f"{directory}/{extension}.py"
+                )
+                import_time = time.perf_counter() - started_at
+                for dependency in dependencies[extension]:
+                    if dependency not in loaded:
+                        raise RuntimeError(f"it depends on the unknown extension {dependency}")
+                    if depends_on(dependency, extension):
+                        raise RuntimeError(f"it depends on {dependency}, which depends on it")
+                    if not await loaded[dependency]:
+                        raise RuntimeError(f"its dependency {dependency} failed to load")
+                started_at = time.perf_counter()
+                await self.load_extension(f"cogs.{extension}")
+                setup_time = time.perf_counter() - started_at
+                self.logger.info(
+                    f"Loaded extension '{extension}' (import {import_time:.3f}s, setup {setup_time:.3f}s)"
+                )
+                loaded[extension].set_result(True)
+            except Exception as e:
+                exception = f"{type(e).__name__}: {e}"
+                self.logger.error(
+                    f"Failed to load extension {extension}\n{exception}"
+                )
+                loaded[extension].set_result(False)
+
+        await asyncio.gather(*(load(extension) for extension in extensions))
 
     @tasks.loop(minutes=1.0)
     async def status_task(self) -> None:
@@ -191,15 +254,62 @@ class DiscordBot(commands.Bot):
             f"Running on: {platform.system()} {platform.release()} ({os.name})"
         )
         self.logger.info("-------------------")
+        started_at = time.perf_counter()
         await self.init_db()
+        self.startup_timings["database"] = time.perf_counter() - started_at
+        self.http_session = create_http_session()
+        try:
+            self.networks = NetworkRegistry.from_env()
+            self.logger.info(f"Loaded {len(self.networks)} networks: {self.networks.choices}")
+        except NetworkConfigError as e:
+            self.logger.error(f"Jobs cannot be launched until the networks are fixed: {e}")
+        if os.getenv("METRICS_PORT"):
+            REGISTRY.add_collector(self.database.collect_metrics)
+            self.metrics_server = await start_metrics_server(
+                os.getenv("METRICS_HOST", "127.0.0.1"), int(os.getenv("METRICS_PORT"))
+            )
+            self.logger.info(f"Serving metrics on port {os.getenv('METRICS_PORT')}")
+        started_at = time.perf_counter()
         await self.load_cogs()
+        self.startup_timings["cogs"] = time.perf_counter() - started_at
+        if import_profiler is not None:
+            import_profiler.uninstall()
+            self.logger.info(f"Slowest imports:\n{import_profiler.summary()}")
+        if os.getenv("SYNC_COMMANDS"):
+            # Syncing is rate limited by Discord, so it is only done when the slash commands have changed
+            synced = await self.tree.sync()
+            self.logger.info(f"Synced {len(synced)} slash commands")
         self.status_task.start()
-        self.database = DatabaseManager(
-            connection=await aiosqlite.connect(
-                f"{os.path.realpath(os.path.dirname(__file__))}/database/database.db"
+        self.gateway_started_at = time.perf_counter()
+
+    async def on_ready(self) -> None:
+        """
+        The code in this event is executed every time the bot is connected to the gateway and ready.
+        """
+        if self.gateway_started_at is None:
+            return
+        self.startup_timings["gateway"] = time.perf_counter() - self.gateway_started_at
+        self.gateway_started_at = None
+        self.logger.info(f"Running shards {sorted(self.shards)} of {self.shard_count}")
+        self.logger.info(
+            "Startup took "
+            + ", ".join(
+                f"{step} {duration:.2f}s" for step, duration in self.startup_timings.items()
             )
         )
 
+    async def close(self) -> None:
+        """
+        This will be executed when the bot shuts down, after the cogs have been unloaded.
+        """
+        await super().close()
+        if self.metrics_server is not None:
+            await self.metrics_server.cleanup()
+        if self.http_session is not None:
+            await self.http_session.close()
+        if self.database is not None:
+            await self.database.close()
+
     async def on_message(self, message: discord.Message) -> None:
         """
         The code in this event is executed every time someone sends a message, with or without the prefix
@@ -208,6 +318,8 @@ class DiscordBot(commands.Bot):
         """
         if message.author == self.user or message.author.bot:
             return
+        if self.conversations.dispatch(message):
+            return  # The message answers a prompt, such as the API key asked by !setAPIKey
         await self.process_commands(message)
 
     async def on_command_completion(self, context: Context) -> None:
@@ -296,8 +408,10 @@ class DiscordBot(commands.Bot):
             "Hello! Before you can launch jobs, you need to set up your API key, result channel, and launch jobs. "
             "Please use the following commands in this chat:\n"
             "`!setAPIKey` to set your API key. For example, use `!setAPIKey`.\n"
-            "`!setResultChannel <CHANNEL_ID>` to set your result publishing channel. For example, `!setResultChannel 123456789`.\n"
-            "`!launchJob` to launch a new job and provide the required information.\n"
+            "`!setResultChannel <CHANNEL_ID>` to set your result publishing channel. For example, `!setResultChannel 123456789`. "
+            "Add `digest` to collect the results of every job published in the channel into one message every few minutes, "
+            "or `live` to publish them as they come in.\n"
+            "`/launchjob` or `!launchJob` to launch a new job and provide the required information.\n"
             "Your conversation here is private and secure."
         )
 
@@ -309,7 +423,7 @@ class DiscordBot(commands.Bot):
                 await welcome_channel.send(
                     f"{member.mention}, please enable your DMs to receive important information about setting up your API key and result channel."
                 )
-load_dotenv()
+
 
 bot = DiscordBot()
 bot.run(os.getenv("TOKEN"))
\ No newline at end of file
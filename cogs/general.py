@@ -10,6 +10,9 @@ from discord import app_commands
 from discord.ext import commands
 from discord.ext.commands import Context
 
+# Extensions that must be loaded before this one, see DiscordBot.load_cogs
+DEPENDENCIES = ()
+
 
 class General(commands.Cog, name="general"):
     def __init__(self, bot) -> None:
@@ -3,57 +3,76 @@ Author Sarthak Vijayvergiya - https://github.com/sarthakvijayvergiya
 Description: A Discord bot that helps in launching jobs, setting API keys, and configuring result channels for the Human Protocol.
 """
 
+import discord
+from discord import app_commands
 from discord.ext import commands
 from discord.ext.commands import Context
+from dotenv import load_dotenv
 import asyncio
 from discord.ext import tasks
 from datetime import datetime, timedelta
 import os
 import json
-from services.external_api_handler import ExternalAPIHandler
+import time
+import hashlib
+import uuid
+from functools import cached_property
+from database.records import LaunchOutcome
+from services.external_api_handler import ExternalAPIHandler, LaunchOutcomeUnknownError, parse_job_id
+from services.network_registry import LaunchValidationError, NetworkConfigError
+from services.result_worker import ResultWorker
+
+
+# Extensions that must be loaded before this one, see DiscordBot.load_cogs
+DEPENDENCIES = ()
 
 
 class JobLauncher(commands.Cog, name="JobLauncher"):
     def __init__(self, bot) -> None:
         self.bot = bot
-        self.job_queue = []  # A list to keep track of jobs to publish results for
-        self.external_api_handler = ExternalAPIHandler()
-        self.result_check_interval = int(
-            os.getenv("RESULT_CHECK_INTERVAL", 180)
-        )  # Default to 180 seconds
+        # Identical launches of a user within this many seconds are collapsed into one job
+        self.launch_window = int(os.getenv("LAUNCH_DEDUP_WINDOW", 600))
+        self.launches = {}  # Launches in flight, by user ID and fingerprint
+        # Seconds between two digests of a channel put in digest mode without an interval
+        self.digest_interval = int(os.getenv("RESULT_DIGEST_INTERVAL", 300))
+
+    # The services are built on first use, so that loading the cog does not wait for them
+    @cached_property
+    def external_api_handler(self):
+        return ExternalAPIHandler(self.bot.http_session)
+
+    @cached_property
+    def result_worker(self):
+        return ResultWorker(
+            self.bot, self.bot.database, self.external_api_handler, logger=self.bot.logger
+        )
 
+    @property
+    def scheduler(self):
+        return self.result_worker.scheduler
 
-    def cog_unload(self):
+    async def cog_unload(self):
         self.publish_results.cancel()  # Cancel the background task when the cog is unloaded
-        self.external_api_handler.close_session()
+        if "result_worker" in self.__dict__:
+            await self.result_worker.close()
 
     @tasks.loop(
         seconds=60
     )  # Temporary interval, will be reset in before_publish_results
     async def publish_results(self):
-        for job in self.job_queue:
-            results = await self.external_api_handler.check_job_result(
-                job["api_key"], job["job_id"]
-            )
-            if results:
-                # Assuming that the job is considered complete if any results are returned
-                result_channel = self.bot.get_channel(job["result_channel_id"])
-                if result_channel:
-                    for result in results:
-                        message = f"Job ID: {job['job_id']}, Worker Address: {result['workerAddress']}, Solution: {result['solution']}"
-                        if 'error' in result and result['error']:
-                            message += f", Error: {result['error']}"
-                        await result_channel.send(message)
-                    self.job_queue.remove(
-                        job
-                    )  # Remove job from queue after publishing results
+        # An error, e.g. a locked database, must not stop the loop for good, see worker.py
+        try:
+            await self.result_worker.run_pass()
+        except Exception as e:
+            self.bot.logger.exception(f"Result check failed: {e}")
 
     @publish_results.before_loop
     async def before_publish_results(self):
         await self.bot.wait_until_ready()  # Wait until the bot is ready before starting the loop
+        await self.result_worker.restore()
         self.publish_results.change_interval(
-            seconds=self.result_check_interval
-        )  # Set the actual interval
+            seconds=self.scheduler.min_interval
+        )  # Check for due jobs as often as the shortest delay
 
     @commands.command(name="setAPIKey")
     async def set_api_key_command(self, context: Context):
@@ -66,122 +85,393 @@ class JobLauncher(commands.Cog, name="JobLauncher"):
         await context.send("API key set successfully.")
 
     @commands.command(name="setResultChannel")
-    async def set_result_channel_command(self, context: Context, channel_id: int):
+    async def set_result_channel_command(
+        self, context: Context, channel_id: int, mode: str = None, interval: int = None
+    ):
+        mode = mode.lower() if mode else None
+        if mode not in (None, "digest", "live") or (interval is not None and interval < 1):
+            await context.send("Usage: `!setResultChannel <CHANNEL_ID> [digest [SECONDS] | live]`")
+            return
+        # The mode applies to everyone publishing in the channel, so only its managers may change it
+        if mode is not None and not await self.can_manage_channel(context.author, channel_id):
+            await context.send("Only members who can manage that channel can change how results are published in it.")
+            return
         await self.bot.database.add_result_channel(context.author.id, channel_id)
-        await context.send("Result channel set successfully.")
+        if mode == "digest":
+            interval = interval or self.digest_interval
+            await self.bot.database.set_channel_digest(channel_id, interval)
+            await context.send(
+                f"Result channel set successfully. Results of every job published in it are sent "
+                f"as one digest every {interval} seconds."
+            )
+        elif mode == "live":
+            await self.bot.database.set_channel_digest(channel_id, None)
+            await context.send("Result channel set successfully. Results are published in it as they come in.")
+        else:
+            await context.send("Result channel set successfully.")
+
+    async def can_manage_channel(self, user, channel_id):
+        """
+        This function checks whether a user may change how results are published in a channel.
+
+        :param user: The user.
+        :param channel_id: The ID of the channel.
+        :return: True if the user can manage the guild channel, or if the channel is their direct message channel.
+        """
+        channel = self.bot.get_channel(channel_id)
+        if channel is None:
+            # Channels of guilds handled by other shards are not cached by this process
+            try:
+                channel = await self.bot.fetch_channel(channel_id)
+                if isinstance(channel, discord.abc.GuildChannel) and self.bot.get_guild(channel.guild.id) is None:
+                    # The permissions of the user are computed from the roles of the guild
+                    channel.guild = await self.bot.fetch_guild(channel.guild.id)
+            except (discord.HTTPException, discord.InvalidData):
+                return False
+        if isinstance(channel, discord.DMChannel):
+            return channel.recipient is not None and channel.recipient.id == user.id
+        if not isinstance(channel, discord.abc.GuildChannel):
+            return False
+        member = channel.guild.get_member(user.id)
+        if member is None:
+            try:
+                member = await channel.guild.fetch_member(user.id)
+            except discord.HTTPException:
+                return False
+        return channel.permissions_for(member).manage_channels
 
     @commands.command(name="launchJob")
     async def launch_job(self, context: Context):
         settings = await self.bot.database.get_user_settings(context.author.id)
-
-        # Check if both API key and result channel have been set
-        if not settings or not settings[0] or not settings[1]:
-            missing_settings = []
-            if not settings or not settings[0]:
-                missing_settings.append("API key")
-            if not settings or not settings[1]:
-                missing_settings.append("result channel")
-            await context.send(
-                f"You need to set the following before launching a job: {', '.join(missing_settings)}. "
-                f"Use the commands `!setAPIKey` and `!setResultChannel <CHANNEL_ID>`."
-            )
+        missing_settings = self.missing_settings(settings)
+        if missing_settings:
+            await context.send(missing_settings)
             return
-
-        api_key = settings[0]
-        result_channel_id = settings[1]
-
+        if not self.bot.networks:
+            await context.send("No networks are configured, jobs cannot be launched.")
+            return
+        # Prefix commands cannot open a modal, so the launch continues in the components of this message
         await context.send(
-            "Let's launch a new job. I will need some information from you."
+            "Let's launch a new job. Select the network, then fill in the details of the job.",
+            view=LaunchJobView(self, context.author.id),
         )
 
-        requesterTitle = await self.ask(context, "What is the title for the job?")
-        if requesterTitle is None:
+    @app_commands.command(name="launchjob", description="Launch a new job.")
+    async def launch_job_app_command(self, interaction: discord.Interaction):
+        settings = await self.bot.database.get_user_settings(interaction.user.id)
+        missing_settings = self.missing_settings(settings)
+        if missing_settings:
+            await interaction.response.send_message(missing_settings, ephemeral=True)
             return
-
-        submissionsRequired = await self.ask(
-            context, "How many submissions are required?"
-        )
-        if submissionsRequired is None:
+        if not self.bot.networks:
+            await interaction.response.send_message(
+                "No networks are configured, jobs cannot be launched.", ephemeral=True
+            )
             return
+        await interaction.response.send_message(
+            "Select the network, then fill in the details of the job.",
+            view=LaunchJobView(self, interaction.user.id),
+            ephemeral=True,
+        )
 
-        requesterDescription = await self.ask(
-            context, "Please provide a description for the requester."
+    def missing_settings(self, settings):
+        # Check if both API key and result channel have been set
+        if settings and settings[0] and settings[1]:
+            return None
+        missing_settings = []
+        if not settings or not settings[0]:
+            missing_settings.append("API key")
+        if not settings or not settings[1]:
+            missing_settings.append("result channel")
+        return (
+            f"You need to set the following before launching a job: {', '.join(missing_settings)}. "
+            f"Use the commands `!setAPIKey` and `!setResultChannel <CHANNEL_ID>`."
         )
-        if requesterDescription is None:
-            return
 
-        fundAmount = await self.ask(context, "What is the fund amount for this job?")
-        if fundAmount is None:
+    @commands.command(name="reloadNetworks")
+    @commands.is_owner()
+    async def reload_networks_command(self, context: Context):
+        load_dotenv(override=True)  # Pick up changes made to the .env file
+        try:
+            count = self.bot.networks.reload()
+        except NetworkConfigError as e:
+            await context.send(f"The networks were not reloaded: {e}")
             return
+        await context.send(f"Reloaded {count} networks: {self.bot.networks.choices}")
 
-        # Step to select the network
-        supported_networks_str = os.getenv("SUPPORTED_NETWORKS")
-        supported_networks = json.loads(supported_networks_str.replace("'", '"'))
-        network_choice = await self.ask(
-            context, f"Select a network: {', '.join(supported_networks.keys())}"
-        )
-        if network_choice is None or network_choice not in supported_networks:
-            await context.send("Invalid network selection. Job launch cancelled.")
-            return
-        network_chain_id = supported_networks[network_choice]
+    async def launch(
+        self, user_id, requesterTitle, submissionsRequired, requesterDescription, fundAmount, network
+    ):
+        """
+        This function launches a job with the details collected from the user.
 
-        # Confirm the details with the user before proceeding
-        await context.send(
-            f"Please confirm the details:\n"
-            f"Title: {requesterTitle}\n"
-            f"Submissions Required: {submissionsRequired}\n"
-            f"Description: {requesterDescription}\n"
-            f"Fund Amount: {fundAmount}\n"
-            f"Netowrk: {network_choice}\n"
-            # f"Type 'yes' to confirm and launch the job."
+        :param user_id: The ID of the user launching the job.
+        :param requesterTitle: The title of the job.
+        :param submissionsRequired: The number of submissions required.
+        :param requesterDescription: The description of the job.
+        :param fundAmount: The fund amount of the job.
+        :param network: The name or the chain ID of the network to launch the job on.
+        :return: The message to answer the user with.
+        """
+        # Invalid details are turned down before anything is sent to the job launcher server
+        try:
+            network, submissionsRequired, fundAmount = self.validate_launch(
+                network, submissionsRequired, fundAmount
+            )
+        except LaunchValidationError as e:
+            return f"{e} Job launch cancelled."
+        settings = await self.bot.database.get_user_settings(user_id)
+        missing_settings = self.missing_settings(settings)
+        if missing_settings:
+            return missing_settings
+        api_key, result_channel_id = settings
+        outcome = await self.submit_launch(
+            user_id,
+            api_key,
+            result_channel_id,
+            requesterTitle,
+            submissionsRequired,
+            requesterDescription,
+            fundAmount,
+            network.chain_id,
         )
+        if outcome.unknown:
+            return (
+                "The job launcher server did not answer, so the job may have been launched. "
+                f"Check your jobs before launching it again, it is not sent again for "
+                f"{self.launch_window // 60} minutes."
+            )
+        if not outcome.launched:
+            # If there was an error launching the job, inform the user
+            return "There was an error launching the job."
+        if outcome.job_id is None:
+            return (
+                "The job was launched, but the job launcher server returned no job ID, "
+                "so its results will not be published."
+            )
+        if outcome.already_launched:
+            return f"This job was already launched: {outcome.job_id}"
+        return f"Job launched successfully: {outcome.job_id}"
+
+    def validate_launch(self, network, submissionsRequired, fundAmount):
+        """
+        This function checks the details of a job against the network it is launched on.
+
+        :param network: The name or the chain ID of the network.
+        :param submissionsRequired: The number of submissions required.
+        :param fundAmount: The fund amount of the job.
+        :return: A tuple containing the network, the number of submissions and the fund amount.
+        :raises LaunchValidationError: If the job cannot be launched with these details.
+        """
+        found = self.bot.networks.get(network)
+        if found is None:
+            raise LaunchValidationError("Invalid network selection.")
+        return (found, *found.validate_launch(submissionsRequired, fundAmount))
 
-        confirmation = await self.ask(context, "Is this correct? (yes/no)")
-        if confirmation and confirmation.lower() == "yes":
-            # Here, you would include the code to actually launch the job with the given parameters
-            # Simulate launching the job
+    async def submit_launch(self, user_id, api_key, result_channel_id, *parameters):
+        """
+        This function launches a job at most once per user and parameters within LAUNCH_DEDUP_WINDOW seconds.
+        A launch that is in flight is joined instead of being sent again.
+
+        :param user_id: The ID of the user launching the job.
+        :param api_key: The API key secret of the user.
+        :param result_channel_id: The channel ID where results should be published.
+        :param parameters: The title, submissions, description, fund amount and chain ID of the job.
+        :return: The LaunchOutcome of the launch.
+        """
+        fingerprint = hashlib.sha256(
+            json.dumps([api_key, *map(str, parameters)]).encode()
+        ).hexdigest()
+        key = (user_id, fingerprint)
+        launch = self.launches.get(key)
+        if launch is None:
+            launch = asyncio.ensure_future(
+                self.run_launch(user_id, api_key, result_channel_id, fingerprint, parameters)
+            )
+            self.launches[key] = launch
+            launch.add_done_callback(lambda _: self.launches.pop(key, None))
+        # The launch goes on when the command is cancelled, so its job is still queued
+        return await asyncio.shield(launch)
 
+    async def run_launch(self, user_id, api_key, result_channel_id, fingerprint, parameters):
+        now = int(time.time())
+        launch = await self.bot.database.find_launch(
+            user_id, fingerprint, now - self.launch_window
+        )
+        if launch is not None and (launch[1] is not None or launch[2] is not None):
+            return LaunchOutcome(launch[1], launched=True, already_launched=True)
+        if launch is not None:
+            # The previous attempt may have created the job, resending it would fund a second job unless the
+            # server answers a repeated idempotency key with the job it already created
+            if not self.external_api_handler.idempotency_keys:
+                return LaunchOutcome(unknown=True)
+            idempotency_key = launch[0]
+        else:
+            # The key is stored before the request is sent, so that it survives a timeout or a restart
+            idempotency_key = uuid.uuid4().hex
+            await self.bot.database.add_launch(idempotency_key, user_id, fingerprint, now)
+        try:
             job_response = await self.external_api_handler.launch_job(
-                api_key,
-                requesterTitle,
-                submissionsRequired,
-                requesterDescription,
-                fundAmount,
-                network_chain_id,
+                api_key, *parameters, idempotency_key=idempotency_key
             )
-            if job_response:
-                # If the job was launched successfully, do something with the response
-
-                self.job_queue.append(
-                    {
-                        "result_channel_id": result_channel_id,
-                        "job_id": job_response,  # Store the job ID
-                        "api_key": api_key,
-                    }
-                )
-                await context.send(f"Job launched successfully: {job_response}")
-            else:
-                # If there was an error launching the job, inform the user
-                await context.send("There was an error launching the job.")
+        except LaunchOutcomeUnknownError:
+            return LaunchOutcome(unknown=True)  # The launch is kept, so it is not resent within the window
+        if not job_response:
+            # The job was certainly not launched, so it may be sent again
+            await self.bot.database.delete_launch(idempotency_key)
+            return LaunchOutcome()
+        # Only the ID is kept, not the whole answer of the launcher
+        job_id = parse_job_id(job_response)
+        if job_id is None:
+            self.bot.logger.warning(f"Job launched by user {user_id} has no job ID: {job_response!r:.200}")
         else:
-            await context.send("Job launch cancelled.")
+            await self.bot.database.add_job(
+                job_id,
+                user_id,
+                result_channel_id,
+                int(time.time() + self.scheduler.next_check_delay(0)),
+                idempotency_key,
+                int(parameters[1]),  # The job is complete once this many results were published
+            )
+        # Recorded after the job is queued, so that a launch found accepted is never missing its job
+        await self.bot.database.complete_launch(idempotency_key, int(time.time()))
+        return LaunchOutcome(job_id, launched=True)
 
     async def ask(self, context, question):
         await context.send(question)
         try:
-            message = await self.bot.wait_for(
-                "message",
-                check=lambda m: m.author == context.author
-                and m.channel == context.channel,
+            message = await self.bot.conversations.wait_for_reply(
+                context.channel.id,
+                context.author.id,
                 timeout=60.0,  # Waits for 60 seconds
             )
         except asyncio.TimeoutError:
             await context.send("Sorry, you didn't reply in time!")
             return None
+        if message is None:
+            return None  # The user started another prompt in this channel
         return message.content
 
 
+class NetworkSelect(discord.ui.Select):
+    def __init__(self, cog, networks) -> None:
+        super().__init__(
+            placeholder="Select a network",
+            options=[
+                discord.SelectOption(label=network.name, description=network.describe())
+                for network in networks
+            ],
+        )
+        self.cog = cog
+
+    async def callback(self, interaction: discord.Interaction) -> None:
+        await interaction.response.send_modal(LaunchJobModal(self.cog, self.values[0]))
+
+
+class LaunchJobView(discord.ui.View):
+    def __init__(self, cog, user_id: int) -> None:
+        """
+        Lets a user pick the network of a job, which then opens the form with the details of the job.
+        Interactions are routed by Discord to this view, so waiting for them costs nothing per message.
+
+        :param cog: The JobLauncher cog.
+        :param user_id: The ID of the user launching the job, the only one allowed to use the view.
+        """
+        super().__init__(timeout=300)
+        self.user_id = user_id
+        # A select menu holds at most 25 options
+        self.add_item(NetworkSelect(cog, cog.bot.networks.networks[:25]))
+
+    async def interaction_check(self, interaction: discord.Interaction) -> bool:
+        if interaction.user.id != self.user_id:
+            await interaction.response.send_message(
+                "Use `/launchjob` to launch your own job.", ephemeral=True
+            )
+            return False
+        return True
+
+
+class LaunchJobModal(discord.ui.Modal):
+    requester_title = discord.ui.TextInput(label="Title", max_length=200)
+    submissions_required = discord.ui.TextInput(label="Submissions required", max_length=10)
+    requester_description = discord.ui.TextInput(
+        label="Description", style=discord.TextStyle.paragraph, max_length=2000
+    )
+    fund_amount = discord.ui.TextInput(label="Fund amount", max_length=30)
+
+    def __init__(self, cog, network: str) -> None:
+        super().__init__(title=f"Launch a job on {network}"[:45])
+        self.cog = cog
+        self.network = network
+
+    async def on_submit(self, interaction: discord.Interaction) -> None:
+        details = (
+            self.requester_title.value,
+            self.submissions_required.value,
+            self.requester_description.value,
+            self.fund_amount.value,
+            self.network,
+        )
+        try:
+            network, submissions, fund = self.cog.validate_launch(self.network, details[1], details[3])
+        except LaunchValidationError as e:
+            await interaction.response.send_message(f"{e} Job launch cancelled.", ephemeral=True)
+            return
+        # Confirm the details with the user before the job is funded
+        view = ConfirmLaunchView(self.cog, details)
+        await interaction.response.send_message(
+            f"Please confirm the details:\n"
+            f"Title: {details[0]}\n"
+            f"Submissions Required: {submissions}\n"
+            f"Description: {details[2][:1000]}\n"
+            f"Fund Amount: {fund}\n"
+            f"Network: {network.name}",
+            view=view,
+            ephemeral=True,
+        )
+        view.interaction = interaction
+
+
+class ConfirmLaunchView(discord.ui.View):
+    def __init__(self, cog, details) -> None:
+        """
+        Asks the user to confirm the details of a job before it is launched. The message is ephemeral,
+        so only the user who filled in the form can use it.
+
+        :param cog: The JobLauncher cog.
+        :param details: The title, submissions, description, fund amount and network of the job.
+        """
+        super().__init__(timeout=300)
+        self.cog = cog
+        self.details = details
+        self.interaction = None  # The interaction that sent the message, to edit it on timeout
+
+    @discord.ui.button(label="Confirm", style=discord.ButtonStyle.success)
+    async def confirm(self, interaction: discord.Interaction, button: discord.ui.Button) -> None:
+        self.stop()  # Further clicks are not dispatched to the view
+        await interaction.response.edit_message(content="Launching the job...", view=None)
+        message = await self.cog.launch(interaction.user.id, *self.details)
+        await interaction.edit_original_response(content=message)
+
+    @discord.ui.button(label="Cancel", style=discord.ButtonStyle.secondary)
+    async def cancel(self, interaction: discord.Interaction, button: discord.ui.Button) -> None:
+        self.stop()
+        await interaction.response.edit_message(content="Job launch cancelled.", view=None)
+
+    async def on_timeout(self) -> None:
+        if self.interaction is None:
+            return
+        try:
+            await self.interaction.edit_original_response(
+                content="Sorry, you didn't confirm in time! Job launch cancelled.", view=None
+            )
+        except discord.HTTPException:
+            pass  # The message was dismissed by the user
+
+
 async def setup(bot):
     job_launcher_cog = JobLauncher(bot)
     await bot.add_cog(job_launcher_cog)  # Use 'await' to properly await the coroutine
-    job_launcher_cog.publish_results.start()  # Start the background task when the cog is loaded
+    if not os.getenv("DISABLE_RESULT_POLLING"):
+        # Otherwise the results are published by worker.py
+        job_launcher_cog.publish_results.start()  # Start the background task when the cog is loaded
@@ -3,29 +3,233 @@ Author Sarthak Vijayvergiya - https://github.com/sarthakvijayvergiya
 Description: A Discord bot that helps in launching jobs, setting API keys, and configuring result channels for the Human Protocol.
 """
 
-
+import asyncio
+import os
+import sys
+import time
+import uuid
 
 import aiosqlite
 
+from database.cache import MISSING, TTLCache
+from database.key_vault import KeyVault, KeyVaultError
+from database.records import JobRecord
+from services.metrics import Gauge, Histogram
+
+DATABASE_QUERY_DURATION = Histogram(
+    "database_query_duration_seconds",
+    "Time spent in SQLite queries, write batches are timed from the first statement to the commit.",
+    ["query"],
+)
+JOB_QUEUE_DEPTH = Gauge("job_queue_depth", "Jobs whose results have not been published yet.")
+USER_SETTINGS_CACHE = Gauge(
+    "user_settings_cache", "Size and counters of the user settings cache.", ["stat"]
+)
+API_KEY_CACHE = Gauge(
+    "api_key_cache", "Size and counters of the cache of decrypted API keys.", ["stat"]
+)
+
+
+MIGRATIONS_PATH = f"{os.path.realpath(os.path.dirname(__file__))}/migrations"
+DATABASE_PATH = f"{os.path.realpath(os.path.dirname(__file__))}/database.db"
+
+
+async def open_database():
+    """
+    Open the database shared by the bot and the result workers, configured from the environment.
+
+    :return: The database manager, on which `initialize` still has to be called.
+    """
+    return DatabaseManager(
+        connection=await aiosqlite.connect(DATABASE_PATH),
+        vault=KeyVault.from_env(),
+        settings_cache_size=int(os.getenv("USER_SETTINGS_CACHE_SIZE", 10000)),
+        settings_cache_ttl=float(os.getenv("USER_SETTINGS_CACHE_TTL", 300)),
+        settings_check_interval=float(os.getenv("USER_SETTINGS_CHECK_INTERVAL", 5)),
+        write_window=float(os.getenv("DATABASE_WRITE_WINDOW", 0.005)),
+    )
+
 
 class DatabaseManager:
-    def __init__(self, *, connection: aiosqlite.Connection) -> None:
+    def __init__(
+        self,
+        *,
+        connection: aiosqlite.Connection,
+        vault: KeyVault = None,
+        settings_cache_size: int = 10000,
+        settings_cache_ttl: float = 300,
+        settings_check_interval: float = 5,
+        write_window: float = 0.005,
+    ) -> None:
         self.connection = connection
+        # API keys are stored encrypted by the vault, or as they are when there is none
+        self.vault = vault
+        # Writes arriving within `write_window` seconds of each other are committed in one transaction
+        self.write_window = write_window
+        self.write_queue = []
+        self.write_task = None
+        self.write_lock = asyncio.Lock()
+        # Settings are only changed through this class, so the cache is invalidated on every write. Processes
+        # sharing the database, e.g. shards, write through their own connection, see check_external_writes
+        self.settings_cache = TTLCache(maxsize=settings_cache_size, ttl=settings_cache_ttl)
+        self.settings_version = 0
+        self.settings_check_interval = settings_check_interval
+        self.settings_checked_at = None
+        self.stored_settings_version = None
+
+    async def initialize(self) -> int:
+        """
+        This function tunes the connection and applies the pending migrations. WAL mode lets readers run
+        alongside the writer and, with synchronous=NORMAL, only syncs to disk on checkpoints instead of on
+        every commit.
+
+        :return: The number of migrations that were applied.
+        """
+        await self.connection.execute("PRAGMA journal_mode = WAL")
+        await self.connection.execute("PRAGMA synchronous = NORMAL")
+        await self.connection.execute("PRAGMA temp_store = MEMORY")
+        await self.connection.execute("PRAGMA cache_size = -16000")  # 16 MB
+        await self.connection.execute("PRAGMA busy_timeout = 5000")
+        applied = await self.migrate()
+        await self.encrypt_api_keys()
+        return applied
+
+    async def migrate(self) -> int:
+        """
+        This function applies the migrations in database/migrations that are newer than the database.
+        Migrations are named `<version>_<name>.sql` and the version of the database is kept in
+        `PRAGMA user_version`, so every migration runs exactly once.
+
+        :return: The number of migrations that were applied.
+        """
+        async with self.connection.execute("PRAGMA user_version") as cursor:
+            (current_version,) = await cursor.fetchone()
+        migrations = sorted(
+            (int(file.split("_", 1)[0]), file)
+            for file in os.listdir(MIGRATIONS_PATH)
+            if file.endswith(".sql")
+        )
+        applied = 0
+        for version, file in migrations:
+            if version <= current_version:
+                continue
+            with open(f"{MIGRATIONS_PATH}/{file}") as migration:
+                script = migration.read()
+            # The version is bumped in the same transaction, so a failed migration leaves no trace
+            try:
+                await self.connection.executescript(
+                    f"BEGIN;\n{script}\nPRAGMA user_version = {version};\nCOMMIT;"
+                )
+            except Exception:
+                await self.connection.rollback()
+                raise
+            applied += 1
+        return applied
+
+    async def close(self) -> None:
+        """
+        This function commits the pending writes and closes the connection.
+        """
+        if self.write_task is not None:
+            await self.write_task
+        async with self.write_lock:
+            await self.connection.close()
+
+    async def write(self, sql: str, parameters=(), *, many: bool = False) -> int:
+        """
+        This function runs a write statement. Statements queued within the write window are committed
+        together, and the returned awaitable only resolves once the statement has been committed.
+
+        :param sql: The statement to run.
+        :param parameters: The parameters of the statement, or a list of them if `many` is True.
+        :param many: Whether to run the statement once for every item of `parameters`.
+        :return: The number of rows changed by the statement.
+        """
+        future = asyncio.get_running_loop().create_future()
+        self.write_queue.append((sql, parameters, many, future))
+        if self.write_task is None:
+            self.write_task = asyncio.create_task(self.flush_writes())
+        return await future
+
+    async def flush_writes(self) -> None:
+        await asyncio.sleep(self.write_window)
+        writes, self.write_queue = self.write_queue, []
+        self.write_task = None
+        async with self.write_lock:
+            done = []
+            error = None
+            with DATABASE_QUERY_DURATION.labels("write_batch").time():
+                for sql, parameters, many, future in writes:
+                    try:
+                        if many:
+                            cursor = await self.connection.executemany(sql, parameters)
+                        else:
+                            cursor = await self.connection.execute(sql, parameters)
+                        done.append((future, cursor.rowcount))
+                    except Exception as e:
+                        # A failed statement is rolled back on its own and does not abort the others
+                        if not future.done():
+                            future.set_exception(e)
+                try:
+                    await self.connection.commit()
+                except Exception as e:
+                    await self.connection.rollback()
+                    error = e
+            for future, rowcount in done:
+                if future.done():
+                    continue
+                if error is None:
+                    future.set_result(rowcount)
+                else:
+                    future.set_exception(error)
+
+    async def encrypt_api_keys(self) -> int:
+        """
+        This function encrypts the API keys that were stored before the vault was set up, and marks the keys
+        encrypted before the `api_key_encrypted` column existed.
+
+        :return: The number of keys that were encrypted.
+        """
+        if self.vault is None:
+            return 0
+        async with self.connection.execute(
+            "SELECT user_id, api_key FROM user_settings WHERE api_key IS NOT NULL AND api_key_encrypted = 0"
+        ) as cursor:
+            rows = await cursor.fetchall()
+        keys = []
+        for user_id, api_key in rows:
+            # A plaintext key can look like an encrypted one, only a key the vault can decrypt is one
+            if self.vault.is_encrypted(api_key):
+                try:
+                    self.vault.decrypt(user_id, api_key)
+                    keys.append((api_key, user_id))
+                    continue
+                except KeyVaultError:
+                    pass
+            keys.append((self.vault.encrypt(user_id, api_key), user_id))
+        if keys:
+            await self.write(
+                "UPDATE user_settings SET api_key = ?, api_key_encrypted = 1 WHERE user_id = ?", keys, many=True
+            )
+        return len(keys)
 
     async def add_api_key(self, user_id: int, api_key: str) -> None:
         """
         This function will add or update the API key and secret for a user in the database.
 
         :param user_id: The ID of the user.
-        :param api_key: The API key secret to store.
+        :param api_key: The API key secret to store, encrypted by the vault.
         """
-        await self.connection.execute(
-            "INSERT INTO user_settings(user_id, api_key) VALUES (?, ?) "
-            "ON CONFLICT(user_id) DO UPDATE SET api_key = excluded.api_key",
-            (user_id, api_key),
+        encrypted = self.vault is not None
+        if encrypted:
+            api_key = self.vault.encrypt(user_id, api_key)
+        await self.write(
+            "INSERT INTO user_settings(user_id, api_key, api_key_encrypted) VALUES (?, ?, ?) "
+            "ON CONFLICT(user_id) DO UPDATE SET api_key = excluded.api_key, "
+            "api_key_encrypted = excluded.api_key_encrypted",
+            (user_id, api_key, encrypted),
         )
-        await self.connection.commit()
-    
+        self.invalidate_user_settings(user_id)
 
     async def add_result_channel(self, user_id: int, channel_id: int) -> None:
         """
@@ -34,22 +238,339 @@ class DatabaseManager:
         :param user_id: The ID of the user.
         :param channel_id: The channel ID where results should be published.
         """
-        await self.connection.execute(
+        await self.write(
             "INSERT INTO user_settings(user_id, result_channel_id) VALUES (?, ?) "
             "ON CONFLICT(user_id) DO UPDATE SET result_channel_id = excluded.result_channel_id",
             (user_id, channel_id),
         )
-        await self.connection.commit()
+        self.invalidate_user_settings(user_id)
+
+    async def set_channel_digest(self, channel_id: int, interval: int = None) -> None:
+        """
+        This function turns the digest mode of a result channel on or off.
+
+        :param channel_id: The ID of the result channel.
+        :param interval: The number of seconds between two digests, or None to publish results as they come in.
+        """
+        if interval is None:
+            await self.write("DELETE FROM channel_digests WHERE channel_id = ?", (channel_id,))
+            return
+        await self.write(
+            "INSERT INTO channel_digests(channel_id, digest_interval) VALUES (?, ?) "
+            "ON CONFLICT(channel_id) DO UPDATE SET digest_interval = excluded.digest_interval",
+            (channel_id, interval),
+        )
+
+    async def get_channel_digests(self) -> dict:
+        """
+        This function returns the result channels in digest mode.
+
+        :return: A dictionary mapping channel IDs to the number of seconds between two digests.
+        """
+        with DATABASE_QUERY_DURATION.labels("get_channel_digests").time():
+            async with self.connection.execute(
+                "SELECT channel_id, digest_interval FROM channel_digests"
+            ) as cursor:
+                return {int(channel_id): interval async for channel_id, interval in cursor}
 
     async def get_user_settings(self, user_id: int):
         """
-        This function retrieves the API key and result channel ID for a user.
+        This function retrieves the API key and result channel ID for a user, from the cache when possible.
 
         :param user_id: The ID of the user.
-        :return: A tuple containing the API key and result channel ID.
+        :return: A tuple containing the decrypted API key and result channel ID.
         """
-        async with self.connection.execute(
-            "SELECT api_key, result_channel_id FROM user_settings WHERE user_id = ?",
-            (user_id,)
-        ) as cursor:
-            return await cursor.fetchone()
+        settings = await self.get_stored_user_settings(user_id)
+        if settings is None:
+            return None
+        api_key, result_channel_id, encrypted = settings
+        if api_key is not None and encrypted:
+            if self.vault is None:
+                raise KeyVaultError(f"The API key of user {user_id} is encrypted, but there is no vault")
+            api_key = self.vault.decrypt(user_id, api_key)
+        return api_key, result_channel_id
+
+    async def get_api_key(self, user_id: int):
+        """
+        This function returns the decrypted API key of a user.
+
+        :param user_id: The ID of the user.
+        :return: The API key secret, or None if the user has not set one.
+        """
+        settings = await self.get_user_settings(user_id)
+        return settings[0] if settings else None
+
+    async def get_stored_user_settings(self, user_id: int):
+        await self.check_external_writes()
+        # The cache holds the rows as they are stored, so that decrypted keys only live in the vault's cache
+        settings = self.settings_cache.get(user_id)
+        if settings is not MISSING:
+            return settings
+        version = self.settings_version
+        with DATABASE_QUERY_DURATION.labels("get_user_settings").time():
+            async with self.connection.execute(
+                "SELECT api_key, result_channel_id, api_key_encrypted FROM user_settings WHERE user_id = ?",
+                (user_id,)
+            ) as cursor:
+                settings = await cursor.fetchone()
+        # Do not cache a row that was read before a concurrent write invalidated it
+        if version == self.settings_version:
+            self.settings_cache.set(user_id, settings)
+        return settings
+
+    async def check_external_writes(self) -> None:
+        """
+        This function empties the settings cache when the user settings have changed since the last check,
+        e.g. through the connection of another shard. Triggers bump the `settings_version` row on every change
+        of `user_settings`, so writes to other tables keep the cache, and it is read at most every
+        `settings_check_interval` seconds.
+        """
+        now = time.monotonic()
+        if self.settings_checked_at is not None and now - self.settings_checked_at < self.settings_check_interval:
+            return
+        self.settings_checked_at = now
+        with DATABASE_QUERY_DURATION.labels("get_settings_version").time():
+            async with self.connection.execute("SELECT version FROM settings_version") as cursor:
+                (version,) = await cursor.fetchone()
+        if version != self.stored_settings_version:
+            if self.stored_settings_version is not None:
+                self.settings_version += 1
+                self.settings_cache.clear()
+            self.stored_settings_version = version
+
+    def invalidate_user_settings(self, user_id: int) -> None:
+        """
+        This function drops the cached settings of a user after they have changed.
+
+        :param user_id: The ID of the user.
+        """
+        self.settings_version += 1
+        self.settings_cache.invalidate(user_id)
+
+    async def add_launch(self, idempotency_key: str, user_id: int, fingerprint: str, created_at: int) -> None:
+        """
+        This function records a launch before it is sent to the job launcher server, so that a retry can
+        reuse its idempotency key.
+
+        :param idempotency_key: The idempotency key sent with the launch.
+        :param user_id: The ID of the user launching the job.
+        :param fingerprint: A hash of the parameters of the launch.
+        :param created_at: The current UNIX timestamp.
+        """
+        await self.write(
+            "INSERT INTO launches(idempotency_key, user_id, fingerprint, created_at) VALUES (?, ?, ?, ?)",
+            (idempotency_key, user_id, fingerprint, created_at),
+        )
+
+    async def delete_launch(self, idempotency_key: str) -> None:
+        """
+        This function forgets a launch that certainly failed, so that it can be sent again.
+
+        :param idempotency_key: The idempotency key sent with the launch.
+        """
+        await self.write("DELETE FROM launches WHERE idempotency_key = ?", (idempotency_key,))
+
+    async def complete_launch(self, idempotency_key: str, launched_at: int) -> None:
+        """
+        This function records that the job launcher server accepted a launch, so that it is never sent again.
+
+        :param idempotency_key: The idempotency key sent with the launch.
+        :param launched_at: The current UNIX timestamp.
+        """
+        await self.write(
+            "UPDATE launches SET launched_at = ? WHERE idempotency_key = ?", (launched_at, idempotency_key)
+        )
+
+    async def find_launch(self, user_id: int, fingerprint: str, since: int):
+        """
+        This function returns the latest launch of a user with the same parameters.
+
+        :param user_id: The ID of the user.
+        :param fingerprint: A hash of the parameters of the launch.
+        :param since: The UNIX timestamp before which launches are ignored.
+        :return: A tuple containing the idempotency key, the job ID, which is None if the job has not been queued,
+        and the UNIX timestamp at which the launch was accepted, which is None if it has not succeeded yet, or None
+        if there is no such launch.
+        """
+        with DATABASE_QUERY_DURATION.labels("find_launch").time():
+            async with self.connection.execute(
+                "SELECT launches.idempotency_key, jobs.job_id, launches.launched_at FROM launches "
+                "LEFT JOIN jobs ON jobs.launch_key = launches.idempotency_key "
+                "WHERE launches.user_id = ? AND launches.fingerprint = ? AND launches.created_at >= ? "
+                "ORDER BY launches.created_at DESC LIMIT 1",
+                (user_id, fingerprint, since),
+            ) as cursor:
+                return await cursor.fetchone()
+
+    async def add_job(
+        self,
+        job_id: str,
+        user_id: int,
+        result_channel_id: int,
+        next_check_at: int,
+        launch_key: str = None,
+        submissions_required: int = None,
+    ) -> None:
+        """
+        This function will add a launched job to the queue of jobs whose results should be published.
+        A job is added only once per launch, so reconciling a retried launch does not queue it twice.
+
+        :param job_id: The ID of the job on the job launcher server.
+        :param user_id: The ID of the user who launched the job, whose API key is used to check the job result.
+        :param result_channel_id: The channel ID where results should be published.
+        :param next_check_at: The UNIX timestamp of the first result check.
+        :param launch_key: The idempotency key of the launch that created the job.
+        :param submissions_required: The number of results that completes the job.
+        """
+        await self.write(
+            "INSERT OR IGNORE INTO jobs"
+            "(job_id, user_id, result_channel_id, next_check_at, launch_key, submissions_required) "
+            "VALUES (?, ?, ?, ?, ?, ?)",
+            (job_id, user_id, result_channel_id, next_check_at, launch_key, submissions_required),
+        )
+
+    async def claim_due_jobs(self, worker_id: str, now: int, lease_expires_at: int, limit: int) -> list:
+        """
+        This function leases the pending jobs that are due for a result check to a worker. Jobs are claimed
+        in a single statement, so that processes sharing the database never claim the same job, and a job
+        whose lease expires, e.g. because its worker died, can be claimed again.
+
+        :param worker_id: The ID of the worker claiming the jobs.
+        :param now: The current UNIX timestamp.
+        :param lease_expires_at: The UNIX timestamp until which the claimed jobs belong to the worker.
+        :param limit: The maximum number of jobs to claim.
+        :return: A list of the claimed jobs.
+        """
+        # Every pass claims with its own token, so that jobs claimed by an earlier pass are not returned again
+        claim = f"{worker_id}:{uuid.uuid4().hex}"
+        claimed = await self.write(
+            "UPDATE jobs SET claimed_by = ?, lease_expires_at = ? WHERE id IN ("
+            "SELECT id FROM jobs WHERE status = 'pending' AND next_check_at <= ? "
+            "AND (lease_expires_at IS NULL OR lease_expires_at <= ?) ORDER BY next_check_at LIMIT ?)",
+            (claim, lease_expires_at, now, now, limit),
+        )
+        if not claimed:
+            return []
+        with DATABASE_QUERY_DURATION.labels("claim_due_jobs").time():
+            async with self.connection.execute(
+                "SELECT id, job_id, user_id, result_channel_id, attempts, published_count, submissions_required "
+                "FROM jobs "
+                "WHERE claimed_by = ?",
+                (claim,),
+            ) as cursor:
+                rows = await cursor.fetchall()
+        # The IDs are stored as text, the caches and Discord use integers. Jobs of the same user or
+        # channel share one integer instead of holding a copy each
+        ids = {}
+        return [
+            JobRecord(
+                row[0],
+                sys.intern(row[1]),
+                ids.setdefault(row[2], int(row[2])),
+                ids.setdefault(row[3], int(row[3])),
+                row[4],
+                claim,
+                row[5],
+                row[6],
+            )
+            for row in rows
+        ]
+
+    async def renew_leases(self, jobs: list, lease_expires_at: int) -> int:
+        """
+        This function extends the leases of jobs a worker is still working on, so that no other worker
+        claims them in the meantime.
+
+        :param jobs: The claimed jobs.
+        :param lease_expires_at: The UNIX timestamp until which the jobs belong to the worker.
+        :return: The number of leases that were renewed, leases lost to another worker are not.
+        """
+        if not jobs:
+            return 0
+        return await self.write(
+            "UPDATE jobs SET lease_expires_at = ? WHERE id = ? AND claimed_by = ?",
+            [(lease_expires_at, job.id, job.claim) for job in jobs],
+            many=True,
+        )
+
+    async def complete_jobs(self, jobs: list) -> None:
+        """
+        This function marks jobs as completed so that they are no longer checked, and stores how many of
+        their results were published. A job whose lease was lost to another worker is left to that worker.
+
+        :param jobs: The claimed jobs.
+        """
+        if not jobs:
+            return
+        await self.write(
+            "UPDATE jobs SET status = 'completed', published_count = ?, claimed_by = NULL, lease_expires_at = NULL "
+            "WHERE id = ? AND claimed_by = ?",
+            [(job.published, job.id, job.claim) for job in jobs],
+            many=True,
+        )
+
+    async def fail_jobs(self, jobs: list) -> None:
+        """
+        This function marks jobs as failed so that they are no longer checked, e.g. because their result
+        channel is gone, and stores how many of their results were published.
+
+        :param jobs: The claimed jobs.
+        """
+        if not jobs:
+            return
+        await self.write(
+            "UPDATE jobs SET status = 'failed', published_count = ?, claimed_by = NULL, lease_expires_at = NULL "
+            "WHERE id = ? AND claimed_by = ?",
+            [(job.published, job.id, job.claim) for job in jobs],
+            many=True,
+        )
+
+    async def reschedule_jobs(self, schedules: list) -> None:
+        """
+        This function sets when pending jobs are checked next, stores how many of their results were
+        published so far and releases their lease.
+
+        :param schedules: A list of (claimed job, next check UNIX timestamp, attempts) tuples.
+        """
+        if not schedules:
+            return
+        await self.write(
+            "UPDATE jobs SET next_check_at = ?, attempts = ?, published_count = ?, "
+            "claimed_by = NULL, lease_expires_at = NULL WHERE id = ? AND claimed_by = ?",
+            [
+                (next_check_at, attempts, job.published, job.id, job.claim)
+                for job, next_check_at, attempts in schedules
+            ],
+            many=True,
+        )
+
+    async def release_stale_leases(self, worker_id: str) -> int:
+        """
+        This function releases the leases left by an earlier run of a worker, so that its jobs are picked up
+        after a restart without waiting for the leases to expire. Jobs keep their next check time, and with it
+        their backoff, and leases held by other workers are kept.
+
+        :param worker_id: The ID of the worker.
+        :return: The number of leases released.
+        """
+        return await self.write(
+            "UPDATE jobs SET claimed_by = NULL, lease_expires_at = NULL "
+            "WHERE status = 'pending' AND claimed_by LIKE ?",
+            (f"{worker_id}:%",),
+        )
+
+    async def collect_metrics(self) -> None:
+        """
+        This function updates the metrics that are only computed when they are scraped.
+        """
+        with DATABASE_QUERY_DURATION.labels("count_pending_jobs").time():
+            async with self.connection.execute(
+                "SELECT COUNT(*) FROM jobs WHERE status = 'pending'"
+            ) as cursor:
+                (pending_jobs,) = await cursor.fetchone()
+        JOB_QUEUE_DEPTH.set(pending_jobs)
+        for stat, value in self.settings_cache.stats().items():
+            USER_SETTINGS_CACHE.labels(stat).set(value)
+        if self.vault is not None:
+            for stat, value in self.vault.cache.stats().items():
+                API_KEY_CACHE.labels(stat).set(value)
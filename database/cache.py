@@ -0,0 +1,83 @@
+"""
+Author Sarthak Vijayvergiya - https://github.com/sarthakvijayvergiya
+Description: A Discord bot that helps in launching jobs, setting API keys, and configuring result channels for the Human Protocol.
+"""
+
+import time
+from collections import OrderedDict
+
+MISSING = object()
+
+
+class TTLCache:
+    def __init__(self, *, maxsize: int, ttl: float) -> None:
+        """
+        A least recently used cache whose entries also expire after `ttl` seconds.
+
+        :param maxsize: The maximum number of entries, the least recently used entry is evicted past it.
+        :param ttl: The number of seconds an entry stays valid.
+        """
+        self.maxsize = maxsize
+        self.ttl = ttl
+        self.entries = OrderedDict()
+        self.hits = 0
+        self.misses = 0
+        self.evictions = 0
+
+    def get(self, key, default=MISSING):
+        """
+        This function returns the cached value of a key.
+
+        :param key: The key to look up.
+        :param default: The value returned when the key is not cached or has expired.
+        :return: The cached value or `default`.
+        """
+        entry = self.entries.get(key)
+        if entry is None or entry[0] < time.monotonic():
+            if entry is not None:
+                del self.entries[key]
+            self.misses += 1
+            return default
+        self.entries.move_to_end(key)
+        self.hits += 1
+        return entry[1]
+
+    def set(self, key, value) -> None:
+        """
+        This function caches the value of a key, evicting the least recently used entry if the cache is full.
+
+        :param key: The key to cache.
+        :param value: The value to cache.
+        """
+        self.entries[key] = (time.monotonic() + self.ttl, value)
+        self.entries.move_to_end(key)
+        while len(self.entries) > self.maxsize:
+            self.entries.popitem(last=False)
+            self.evictions += 1
+
+    def invalidate(self, key) -> None:
+        """
+        This function removes a key from the cache.
+
+        :param key: The key to remove.
+        """
+        self.entries.pop(key, None)
+
+    def clear(self) -> None:
+        """
+        This function removes every key from the cache.
+        """
+        self.entries.clear()
+
+    def stats(self) -> dict:
+        """
+        This function returns the counters of the cache.
+
+        :return: A dictionary with the size, hits, misses and evictions of the cache.
+        """
+        return {
+            "size": len(self.entries),
+            "hits": self.hits,
+            "misses": self.misses,
+            "evictions": self.evictions,
+        }
@@ -0,0 +1,110 @@
+"""
+Author Sarthak Vijayvergiya - https://github.com/sarthakvijayvergiya
+Description: A Discord bot that helps in launching jobs, setting API keys, and configuring result channels for the Human Protocol.
+"""
+
+import base64
+import os
+
+from cryptography.exceptions import InvalidTag
+from cryptography.hazmat.primitives import hashes
+from cryptography.hazmat.primitives.ciphers.aead import AESGCM
+from cryptography.hazmat.primitives.kdf.hkdf import HKDF
+
+from database.cache import MISSING, TTLCache
+
+TOKEN_PREFIX = "v1:"
+NONCE_SIZE = 12
+# Example values that must never be used as the secret, as anyone can read them
+PLACEHOLDER_SECRETS = frozenset({"YOUR_VAULT_SECRET_HERE"})
+
+
+class KeyVaultError(Exception):
+    """
+    Raised when the vault has no secret, or when a stored key cannot be decrypted with it.
+    """
+
+
+def encode(nonce: bytes, ciphertext: bytes) -> str:
+    return base64.urlsafe_b64encode(nonce + ciphertext).decode()
+
+
+def decode(value: str):
+    data = base64.urlsafe_b64decode(value.encode())
+    return data[:NONCE_SIZE], data[NONCE_SIZE:]
+
+
+class KeyVault:
+    def __init__(self, secret: str, *, cache_size: int = 10000, cache_ttl: float = 300) -> None:
+        """
+        Encrypts API keys at rest with envelope encryption: every key is encrypted with its own data key,
+        which is itself encrypted with a master key derived from `secret`. Decrypted keys are kept in a
+        bounded cache, so that checking results does not decrypt a key for every request.
+
+        :param secret: The secret the master key is derived from.
+        :param cache_size: The maximum number of decrypted keys kept in memory.
+        :param cache_ttl: The number of seconds a decrypted key is kept in memory.
+        """
+        if not secret:
+            raise KeyVaultError("API_KEY_VAULT_SECRET is not set")
+        if secret.strip() in PLACEHOLDER_SECRETS:
+            raise KeyVaultError("API_KEY_VAULT_SECRET is still the placeholder of .env.example")
+        master_key = HKDF(
+            algorithm=hashes.SHA256(), length=32, salt=None, info=b"humanprotocol-discord-bot api keys"
+        ).derive(secret.encode())
+        self.master = AESGCM(master_key)
+        self.cache = TTLCache(maxsize=cache_size, ttl=cache_ttl)
+
+    @classmethod
+    def from_env(cls) -> "KeyVault":
+        return cls(
+            os.getenv("API_KEY_VAULT_SECRET"),
+            cache_size=int(os.getenv("API_KEY_CACHE_SIZE", 10000)),
+            cache_ttl=float(os.getenv("API_KEY_CACHE_TTL", 300)),
+        )
+
+    def encrypt(self, user_id: int, api_key: str) -> str:
+        """
+        This function encrypts the API key of a user. The user ID is authenticated along with the key,
+        so that a stored key cannot be moved to another user.
+
+        :param user_id: The ID of the user.
+        :param api_key: The API key secret.
+        :return: The encrypted key, as stored in the database.
+        """
+        data_key = AESGCM.generate_key(bit_length=256)
+        associated_data = str(user_id).encode()
+        key_nonce = os.urandom(NONCE_SIZE)
+        wrapped_key = self.master.encrypt(key_nonce, data_key, associated_data)
+        nonce = os.urandom(NONCE_SIZE)
+        ciphertext = AESGCM(data_key).encrypt(nonce, api_key.encode(), associated_data)
+        return f"{TOKEN_PREFIX}{encode(key_nonce, wrapped_key)}:{encode(nonce, ciphertext)}"
+
+    def decrypt(self, user_id: int, token: str) -> str:
+        """
+        This function returns the decrypted API key of a user, from the cache when possible.
+
+        :param user_id: The ID of the user.
+        :param token: The encrypted key, as stored in the database.
+        :return: The API key secret.
+        :raises KeyVaultError: If the key was not encrypted with the secret of the vault.
+        """
+        cached = self.cache.get(user_id)
+        # The encrypted key is part of the entry, so a changed key is never answered from the cache
+        if cached is not MISSING and cached[0] == token:
+            return cached[1]
+        if not self.is_encrypted(token):
+            raise KeyVaultError(f"The API key of user {user_id} is not encrypted by the vault")
+        try:
+            wrapped, encrypted = token[len(TOKEN_PREFIX):].split(":")
+            associated_data = str(user_id).encode()
+            data_key = self.master.decrypt(*decode(wrapped), associated_data)
+            api_key = AESGCM(data_key).decrypt(*decode(encrypted), associated_data).decode()
+        except (InvalidTag, ValueError) as e:
+            raise KeyVaultError(f"The API key of user {user_id} cannot be decrypted: {type(e).__name__}")
+        self.cache.set(user_id, (token, api_key))
+        return api_key
+
+    def is_encrypted(self, token: str) -> bool:
+        # Only tells whether the value has the format of an encrypted key, a plaintext key may have it too
+        return token.startswith(TOKEN_PREFIX)
@@ -0,0 +1,22 @@
+CREATE TABLE IF NOT EXISTS `user_settings` (
+  `user_id` VARCHAR(20) NOT NULL,
+  `api_key` VARCHAR(255),
+  `result_channel_id` VARCHAR(20),
+  PRIMARY KEY (`user_id`)
+);
+
+CREATE TABLE IF NOT EXISTS `jobs` (
+  `id` INTEGER PRIMARY KEY AUTOINCREMENT,
+  `job_id` VARCHAR(255) NOT NULL,
+  `user_id` VARCHAR(20) NOT NULL,
+  `api_key` VARCHAR(255) NOT NULL,
+  `result_channel_id` VARCHAR(20) NOT NULL,
+  `status` VARCHAR(20) NOT NULL DEFAULT 'pending',
+  `next_check_at` INTEGER NOT NULL,
+  `attempts` INTEGER NOT NULL DEFAULT 0,
+  `created_at` TIMESTAMP DEFAULT CURRENT_TIMESTAMP
+);
+
+CREATE INDEX IF NOT EXISTS `idx_jobs_status_next_check_at` ON `jobs` (`status`, `next_check_at`);
+CREATE INDEX IF NOT EXISTS `idx_jobs_user_id` ON `jobs` (`user_id`);
+CREATE INDEX IF NOT EXISTS `idx_jobs_result_channel_id` ON `jobs` (`result_channel_id`);
@@ -0,0 +1,13 @@
+CREATE TABLE IF NOT EXISTS `launches` (
+  `idempotency_key` VARCHAR(64) NOT NULL,
+  `user_id` VARCHAR(20) NOT NULL,
+  `fingerprint` VARCHAR(64) NOT NULL,
+  `created_at` INTEGER NOT NULL,
+  PRIMARY KEY (`idempotency_key`)
+);
+
+CREATE INDEX IF NOT EXISTS `idx_launches_user_id_fingerprint` ON `launches` (`user_id`, `fingerprint`, `created_at`);
+
+ALTER TABLE `jobs` ADD COLUMN `launch_key` VARCHAR(64);
+
+CREATE UNIQUE INDEX IF NOT EXISTS `idx_jobs_launch_key` ON `jobs` (`launch_key`);
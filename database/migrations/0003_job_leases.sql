@@ -0,0 +1,4 @@
+ALTER TABLE `jobs` ADD COLUMN `claimed_by` VARCHAR(255);
+ALTER TABLE `jobs` ADD COLUMN `lease_expires_at` INTEGER;
+
+CREATE INDEX IF NOT EXISTS `idx_jobs_claimed_by` ON `jobs` (`claimed_by`);
@@ -0,0 +1,2 @@
+-- Jobs refer to the API key of their user, which is encrypted in user_settings
+ALTER TABLE `jobs` DROP COLUMN `api_key`;
@@ -0,0 +1,4 @@
+-- The number of results of a job already published, so that every check publishes only newer results
+ALTER TABLE `jobs` ADD COLUMN `published_count` INTEGER NOT NULL DEFAULT 0;
+-- The number of results that completes a job, NULL for jobs queued before it was stored
+ALTER TABLE `jobs` ADD COLUMN `submissions_required` INTEGER;
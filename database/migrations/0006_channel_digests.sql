@@ -0,0 +1,6 @@
+-- Channels whose results are collected from every job and published as one digest every `digest_interval` seconds
+CREATE TABLE IF NOT EXISTS `channel_digests` (
+  `channel_id` VARCHAR(20) NOT NULL,
+  `digest_interval` INTEGER NOT NULL,
+  PRIMARY KEY (`channel_id`)
+);
@@ -0,0 +1,2 @@
+-- Whether `api_key` is encrypted by the vault, as a plaintext key may look like an encrypted one
+ALTER TABLE `user_settings` ADD COLUMN `api_key_encrypted` INTEGER NOT NULL DEFAULT 0;
@@ -0,0 +1,2 @@
+-- When the job launcher server accepted the launch, so that a retry is not sent again even if the job has no ID
+ALTER TABLE `launches` ADD COLUMN `launched_at` INTEGER;
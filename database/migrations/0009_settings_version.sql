@@ -0,0 +1,24 @@
+-- Bumped on every change of the user settings, so that processes sharing the database know when to drop
+-- their cached settings
+CREATE TABLE IF NOT EXISTS `settings_version` (
+  `id` INTEGER NOT NULL CHECK (`id` = 1),
+  `version` INTEGER NOT NULL,
+  PRIMARY KEY (`id`)
+);
+
+INSERT OR IGNORE INTO `settings_version` (`id`, `version`) VALUES (1, 0);
+
+CREATE TRIGGER IF NOT EXISTS `user_settings_inserted` AFTER INSERT ON `user_settings`
+BEGIN
+  UPDATE `settings_version` SET `version` = `version` + 1;
+END;
+
+CREATE TRIGGER IF NOT EXISTS `user_settings_updated` AFTER UPDATE ON `user_settings`
+BEGIN
+  UPDATE `settings_version` SET `version` = `version` + 1;
+END;
+
+CREATE TRIGGER IF NOT EXISTS `user_settings_deleted` AFTER DELETE ON `user_settings`
+BEGIN
+  UPDATE `settings_version` SET `version` = `version` + 1;
+END;
@@ -0,0 +1,76 @@
+"""
+Author Sarthak Vijayvergiya - https://github.com/sarthakvijayvergiya
+Description: A Discord bot that helps in launching jobs, setting API keys, and configuring result channels for the Human Protocol.
+"""
+
+
+class JobRecord:
+    # Without a __dict__ per instance, a queued job costs a fraction of the memory of a dictionary
+    __slots__ = (
+        "id", "job_id", "user_id", "result_channel_id", "attempts", "claim", "published", "submissions_required"
+    )
+
+    def __init__(
+        self,
+        id: int,
+        job_id: str,
+        user_id: int,
+        result_channel_id: int,
+        attempts: int,
+        claim: str,
+        published: int = 0,
+        submissions_required: int = None,
+    ) -> None:
+        """
+        A job claimed for a result check.
+
+        :param id: The database ID of the job.
+        :param job_id: The ID of the job on the job launcher server.
+        :param user_id: The ID of the user who launched the job.
+        :param result_channel_id: The channel ID where results should be published.
+        :param attempts: The number of result checks that found no results.
+        :param claim: The claim of the worker holding the job, shared by every job of a polling pass.
+        :param published: The number of results of the job already published, the cursor of its next check.
+        :param submissions_required: The number of results that completes the job, or None if it is unknown.
+        """
+        self.id = id
+        self.job_id = job_id
+        self.user_id = user_id
+        self.result_channel_id = result_channel_id
+        self.attempts = attempts
+        self.claim = claim
+        self.published = published
+        self.submissions_required = submissions_required
+
+    def __repr__(self) -> str:
+        return (
+            f"JobRecord(id={self.id}, job_id={self.job_id!r}, user_id={self.user_id}, attempts={self.attempts}, "
+            f"published={self.published}/{self.submissions_required})"
+        )
+
+
+class LaunchOutcome:
+    __slots__ = ("job_id", "launched", "already_launched", "unknown")
+
+    def __init__(
+        self, job_id: str = None, launched: bool = False, already_launched: bool = False, unknown: bool = False
+    ) -> None:
+        """
+        The outcome of the launch of a job.
+
+        :param job_id: The ID of the launched job, or None if it is unknown.
+        :param launched: Whether the job launcher server accepted the launch.
+        :param already_launched: Whether the job had been launched by an earlier, identical launch.
+        :param unknown: Whether the launch, or an earlier identical one, was sent without an answer, so the job
+        may have been launched.
+        """
+        self.job_id = job_id
+        self.launched = launched
+        self.already_launched = already_launched
+        self.unknown = unknown
+
+    def __repr__(self) -> str:
+        return (
+            f"LaunchOutcome(job_id={self.job_id!r}, launched={self.launched}, "
+            f"already_launched={self.already_launched}, unknown={self.unknown})"
+        )
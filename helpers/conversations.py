@@ -0,0 +1,88 @@
+"""
+Author Sarthak Vijayvergiya - https://github.com/sarthakvijayvergiya
+Description: A Discord bot that helps in launching jobs, setting API keys, and configuring result channels for the Human Protocol.
+"""
+
+import asyncio
+import math
+
+
+class ConversationRouter:
+    def __init__(self, *, tick: float = 1.0, slots: int = 64) -> None:
+        """
+        Hands every message to the prompt waiting for a reply from its author in its channel. Prompts are
+        kept in a dictionary keyed by (channel ID, author ID), so routing a message is a single lookup,
+        and they expire on one shared timer wheel instead of one timeout per prompt.
+
+        :param tick: The number of seconds between two turns of the timer wheel, i.e. the timeout precision.
+        :param slots: The number of slots of the timer wheel. Longer timeouts go around the wheel several times.
+        """
+        self.tick = tick
+        self.pending = {}
+        self.wheel = [[] for _ in range(slots)]
+        self.position = 0
+        self.task = None
+
+    def dispatch(self, message) -> bool:
+        """
+        This function hands a message to the prompt waiting for it, if there is one.
+
+        :param message: The message that was sent.
+        :return: Whether the message was a reply to a prompt.
+        """
+        future = self.pending.pop((message.channel.id, message.author.id), None)
+        if future is None or future.done():
+            return False
+        future.set_result(message)
+        return True
+
+    async def wait_for_reply(self, channel_id: int, author_id: int, timeout: float):
+        """
+        This function waits for the next message of an author in a channel. A newer prompt for the same
+        author and channel replaces this one.
+
+        :param channel_id: The ID of the channel.
+        :param author_id: The ID of the author.
+        :param timeout: The number of seconds to wait, rounded up to the tick of the timer wheel.
+        :return: The message, or None if the prompt was replaced.
+        :raises asyncio.TimeoutError: If no message came in time.
+        """
+        key = (channel_id, author_id)
+        previous = self.pending.get(key)
+        if previous is not None and not previous.done():
+            previous.set_result(None)
+        future = asyncio.get_running_loop().create_future()
+        self.pending[key] = future
+        ticks = max(1, math.ceil(timeout / self.tick))
+        slot = (self.position + ticks) % len(self.wheel)
+        self.wheel[slot].append([key, future, (ticks - 1) // len(self.wheel)])
+        if self.task is None:
+            self.task = asyncio.create_task(self.turn())
+        try:
+            return await future
+        finally:
+            if self.pending.get(key) is future:
+                del self.pending[key]
+
+    async def turn(self) -> None:
+        # The wheel only turns while prompts are waiting
+        try:
+            while self.pending:
+                await asyncio.sleep(self.tick)
+                self.position = (self.position + 1) % len(self.wheel)
+                remaining = []
+                for entry in self.wheel[self.position]:
+                    key, future, rounds = entry
+                    if future.done():
+                        continue
+                    if rounds:
+                        entry[2] -= 1
+                        remaining.append(entry)
+                        continue
+                    future.set_exception(asyncio.TimeoutError())
+                self.wheel[self.position] = remaining
+        finally:
+            self.task = None
+            if not self.pending:
+                # Only answered or replaced prompts are left on the wheel
+                self.wheel = [[] for _ in self.wheel]
@@ -0,0 +1,64 @@
+"""
+Author Sarthak Vijayvergiya - https://github.com/sarthakvijayvergiya
+Description: A Discord bot that helps in launching jobs, setting API keys, and configuring result channels for the Human Protocol.
+"""
+
+import builtins
+import importlib.util
+import sys
+import threading
+import time
+
+
+class ImportProfiler:
+    def __init__(self) -> None:
+        """
+        Measures how long every module takes to import, like `python -X importtime`, but can be turned on
+        from the environment and reports through the logger. Only the first import of a module is timed.
+        """
+        self.timings = {}  # Module name -> (self seconds, cumulative seconds)
+        self.local = threading.local()
+        self.original_import = None
+
+    def install(self) -> None:
+        self.original_import = builtins.__import__
+        builtins.__import__ = self.timed_import
+
+    def uninstall(self) -> None:
+        if self.original_import is not None:
+            builtins.__import__ = self.original_import
+            self.original_import = None
+
+    def timed_import(self, name, globals=None, locals=None, fromlist=(), level=0):
+        module_name = name
+        if level:
+            try:
+                module_name = importlib.util.resolve_name("." * level + name, (globals or {}).get("__package__"))
+            except (ImportError, ValueError):
+                pass
+        if module_name in sys.modules:
+            return self.original_import(name, globals, locals, fromlist, level)
+        stack = self.local.__dict__.setdefault("stack", [])
+        stack.append(0.0)
+        started_at = time.perf_counter()
+        try:
+            return self.original_import(name, globals, locals, fromlist, level)
+        finally:
+            elapsed = time.perf_counter() - started_at
+            children = stack.pop()
+            if stack:
+                stack[-1] += elapsed
+            self.timings[module_name] = (elapsed - children, elapsed)
+
+    def summary(self, limit: int = 15) -> str:
+        """
+        This function lists the imports that took the longest, including the modules they imported.
+
+        :param limit: The number of imports to list.
+        :return: A table of self and cumulative import times in milliseconds.
+        """
+        lines = [f"{'self [ms]':>10} | {'cumulative':>10} | module"]
+        slowest = sorted(self.timings.items(), key=lambda item: item[1][1], reverse=True)[:limit]
+        for module_name, (self_time, cumulative) in slowest:
+            lines.append(f"{self_time * 1000:>10.1f} | {cumulative * 1000:>10.1f} | {module_name}")
+        return "\n".join(lines)
@@ -0,0 +1,116 @@
+"""
+Author Sarthak Vijayvergiya - https://github.com/sarthakvijayvergiya
+Description: A Discord bot that helps in launching jobs, setting API keys, and configuring result channels for the Human Protocol.
+"""
+
+import atexit
+import json
+import logging
+import logging.handlers
+import os
+import queue
+import re
+
+
+class LoggingFormatter(logging.Formatter):
+    # Colors
+    black = "\x1b[30m"
+    red = "\x1b[31m"
+    green = "\x1b[32m"
+    yellow = "\x1b[33m"
+    blue = "\x1b[34m"
+    gray = "\x1b[38m"
+    # Styles
+    reset = "\x1b[0m"
+    bold = "\x1b[1m"
+
+    COLORS = {
+        logging.DEBUG: gray + bold,
+        logging.INFO: blue + bold,
+        logging.WARNING: yellow + bold,
+        logging.ERROR: red,
+        logging.CRITICAL: red + bold,
+    }
+
+    def __init__(self) -> None:
+        super().__init__()
+        # Build one formatter per level once instead of one per record
+        format = "(black){asctime}(reset) (levelcolor){levelname:<8}(reset) (green){name}(reset) {message}"
+        format = format.replace("(black)", self.black + self.bold)
+        format = format.replace("(reset)", self.reset)
+        format = format.replace("(green)", self.green + self.bold)
+        self.formatters = {
+            level: logging.Formatter(
+                format.replace("(levelcolor)", color), "%Y-%m-%d %H:%M:%S", style="{"
+            )
+            for level, color in self.COLORS.items()
+        }
+
+    def format(self, record):
+        return self.formatters[record.levelno].format(record)
+
+
+class JsonFormatter(logging.Formatter):
+    def format(self, record):
+        return json.dumps(
+            {
+                "time": self.formatTime(record, "%Y-%m-%dT%H:%M:%S%z"),
+                "level": record.levelname,
+                "name": record.name,
+                "message": record.getMessage(),
+            }
+        )
+
+
+def process_log_file(process: str) -> str:
+    """
+    This function returns the log file of one of several processes running side by side, such as shards or
+    workers. A rotating log file cannot be shared, as every process would rotate it on its own.
+
+    :param process: The name of the process.
+    :return: The name of the log file.
+    """
+    return f"discord-{re.sub(r'[^A-Za-z0-9_.-]', '_', process)}.log"
+
+
+def setup_logging(name: str = "discord_bot", log_file: str = "discord.log") -> logging.Logger:
+    """
+    This function sets up the logger of the bot. Records are put on a queue by the logger and written to the
+    console and the log file by a background thread, so that no file I/O happens on the event loop.
+
+    :param name: The name of the logger.
+    :param log_file: The log file used when LOG_FILE is not set, or None to only log to the console.
+    :return: The logger.
+    """
+    # Console handler
+    console_handler = logging.StreamHandler()
+    console_handler.setFormatter(LoggingFormatter())
+    handlers = [console_handler]
+    log_file = os.getenv("LOG_FILE") or log_file
+    if log_file:
+        # File handler, rotated once it reaches LOG_MAX_BYTES
+        file_handler = logging.handlers.RotatingFileHandler(
+            filename=log_file,
+            encoding="utf-8",
+            maxBytes=int(os.getenv("LOG_MAX_BYTES", 10 * 1024 * 1024)),
+            backupCount=int(os.getenv("LOG_BACKUP_COUNT", 5)),
+        )
+        if os.getenv("LOG_FORMAT", "text").lower() == "json":
+            file_handler.setFormatter(JsonFormatter())
+        else:
+            file_handler.setFormatter(
+                logging.Formatter(
+                    "[{asctime}] [{levelname:<8}] {name}: {message}", "%Y-%m-%d %H:%M:%S", style="{"
+                )
+            )
+        handlers.append(file_handler)
+
+    log_queue = queue.SimpleQueue()
+    listener = logging.handlers.QueueListener(log_queue, *handlers)
+    listener.start()
+    atexit.register(listener.stop)  # Flush the queue on exit
+
+    logger = logging.getLogger(name)
+    logger.setLevel(logging.INFO)
+    logger.addHandler(logging.handlers.QueueHandler(log_queue))
+    return logger
@@ -0,0 +1,101 @@
+"""
+Author Sarthak Vijayvergiya - https://github.com/sarthakvijayvergiya
+Description: A Discord bot that helps in launching jobs, setting API keys, and configuring result channels for the Human Protocol.
+"""
+
+import time
+
+from services.metrics import Gauge
+
+CIRCUIT_STATE = Gauge(
+    "launcher_circuit_state",
+    "State of the circuit breaker of every job launcher endpoint: 0 closed, 1 half open, 2 open.",
+    ["endpoint"],
+)
+
+
+class CircuitBreaker:
+    CLOSED = "closed"
+    HALF_OPEN = "half_open"
+    OPEN = "open"
+
+    STATE_VALUES = {CLOSED: 0, HALF_OPEN: 1, OPEN: 2}
+
+    def __init__(self, name: str, *, failure_threshold: int, reset_timeout: float, half_open_calls: int = 1) -> None:
+        """
+        Stops calls to an endpoint after `failure_threshold` consecutive failures. Once `reset_timeout` seconds
+        have passed, `half_open_calls` trial calls are let through: a success closes the circuit again and a
+        failure opens it for another `reset_timeout` seconds.
+
+        :param name: The name of the endpoint, used in logs and metrics.
+        :param failure_threshold: The number of consecutive failures that open the circuit.
+        :param reset_timeout: The number of seconds the circuit stays open.
+        :param half_open_calls: The number of trial calls let through while the circuit is half open.
+        """
+        self.name = name
+        self.failure_threshold = failure_threshold
+        self.reset_timeout = reset_timeout
+        self.half_open_calls = half_open_calls
+        self.failures = 0
+        self.opened_at = None
+        self.trial_calls = 0
+        CIRCUIT_STATE.labels(name).set(0)
+
+    @property
+    def state(self) -> str:
+        if self.opened_at is None:
+            return self.CLOSED
+        if time.monotonic() - self.opened_at >= self.reset_timeout:
+            return self.HALF_OPEN
+        return self.OPEN
+
+    def remaining(self) -> float:
+        """
+        This function returns how long the circuit stays open.
+
+        :return: The number of seconds before trial calls are let through, 0 if calls are allowed.
+        """
+        if self.opened_at is None:
+            return 0.0
+        return max(0.0, self.opened_at + self.reset_timeout - time.monotonic())
+
+    def is_available(self) -> bool:
+        """
+        This function returns whether calls may currently go through, without reserving a trial call.
+        """
+        state = self.state
+        return state == self.CLOSED or (state == self.HALF_OPEN and self.trial_calls < self.half_open_calls)
+
+    def allow(self) -> bool:
+        """
+        This function returns whether a call may go through, reserving a trial call if the circuit is half open.
+        """
+        state = self.state
+        if state == self.CLOSED:
+            return True
+        if state == self.HALF_OPEN and self.trial_calls < self.half_open_calls:
+            self.trial_calls += 1
+            CIRCUIT_STATE.labels(self.name).set(self.STATE_VALUES[state])
+            return True
+        return False
+
+    def release(self) -> None:
+        """
+        This function gives back a trial call that ended without a success or a failure, e.g. when it was cancelled.
+        """
+        if self.trial_calls:
+            self.trial_calls -= 1
+
+    def record_success(self) -> None:
+        self.failures = 0
+        self.opened_at = None
+        self.trial_calls = 0
+        CIRCUIT_STATE.labels(self.name).set(0)
+
+    def record_failure(self) -> None:
+        self.failures += 1
+        if self.opened_at is not None or self.failures >= self.failure_threshold:
+            # A failed trial call, or too many failures in a row, opens the circuit
+            self.opened_at = time.monotonic()
+            self.trial_calls = 0
+            CIRCUIT_STATE.labels(self.name).set(2)
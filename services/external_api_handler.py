@@ -4,15 +4,278 @@ Description: A Discord bot that helps in launching jobs, setting API keys, and c
 """
 
 import aiohttp
+import asyncio
+import codecs
 import os
 import json
+import logging
+import random
+import uuid
+from decimal import Decimal
+
+from services.circuit_breaker import CircuitBreaker
+from services.metrics import Counter, Histogram
+
+logger = logging.getLogger("discord_bot")
+
+LAUNCHER_REQUEST_DURATION = Histogram(
+    "launcher_request_duration_seconds",
+    "Time spent in requests to the job launcher server.",
+    ["endpoint"],
+)
+LAUNCHER_RESPONSES = Counter(
+    "launcher_responses",
+    "Responses of the job launcher server by status code, or error when no response came back.",
+    ["endpoint", "status"],
+)
+
+class JobResultError(Exception):
+    """
+    Raised when the result of a job could not be fetched.
+    """
+
+    def __init__(self, message: str, status: int = None) -> None:
+        super().__init__(message)
+        self.status = status
+
+
+class LauncherUnavailableError(JobResultError):
+    """
+    Raised when the job launcher server answers 429 or 5xx, so callers can back off.
+    """
+
+    def __init__(self, status: int, retry_after: float = None) -> None:
+        super().__init__(f"Job launcher server answered {status}", status)
+        self.retry_after = retry_after
+
+
+class CircuitOpenError(JobResultError):
+    """
+    Raised instead of sending a request while the circuit breaker of an endpoint is open.
+    """
+
+    def __init__(self, endpoint: str, retry_after: float) -> None:
+        super().__init__(f"Circuit breaker of the {endpoint} endpoint is open for {retry_after:.0f}s")
+        self.retry_after = retry_after
+
+
+class LaunchOutcomeUnknownError(Exception):
+    """
+    Raised when a launch was sent but no answer came back, e.g. after a timeout, so the job may have been created.
+    """
+
+
+class BatchNotSupportedError(Exception):
+    """
+    Raised when the job launcher server has no batch result endpoint.
+    """
+
+
+def parse_retry_after(value):
+    try:
+        return float(value)
+    except (TypeError, ValueError):
+        return None
+
+
+def parse_result(item):
+    # Assuming the API returns an array of FortuneFinalResultDto objects
+    return {
+        "workerAddress": item.get("workerAddress", ""),
+        "solution": item.get("solution", ""),
+    }
+
+
+def parse_job_id(data):
+    """
+    This function extracts the ID of a job from the answer to its launch, which is either the ID itself
+    or a JSON object holding it.
+
+    :param data: The answer of the job launcher server.
+    :return: The job ID as a string, or None if the answer holds none.
+    """
+    if isinstance(data, dict):
+        data = next((data[key] for key in ("id", "jobId") if data.get(key) is not None), None)
+    if isinstance(data, bool) or not isinstance(data, (int, str)):
+        return None
+    return str(data).strip().strip('"') or None
+
+
+def dumps_json(data) -> str:
+    """
+    This function serializes data to JSON like json.dumps, but writes Decimal values as exact JSON numbers.
+    json.dumps only knows floats, which would turn 0.123456789012345678 into 0.12345678901234568.
+
+    :param data: The data to serialize.
+    :return: The JSON text.
+    :raises ValueError: If a Decimal is not a finite number.
+    """
+    numbers = {}
+    # The Decimals are first written as strings no other value can contain, which are then replaced
+    marker = uuid.uuid4().hex
+
+    def default(value):
+        if not isinstance(value, Decimal):
+            raise TypeError(f"Object of type {type(value).__name__} is not JSON serializable")
+        if not value.is_finite():
+            raise ValueError(f"{value} is not a valid JSON number")
+        placeholder = json.dumps(f"{marker}:{len(numbers)}")
+        numbers[placeholder] = format(value, "f")
+        return placeholder[1:-1]
+
+    text = json.dumps(data, default=default)
+    for placeholder, number in numbers.items():
+        text = text.replace(placeholder, number, 1)
+    return text
+
+
+def parse_results(data):
+    return [parse_result(item) for item in data]
+
+
+async def iterate(items):
+    for item in items:
+        yield item
+
+
+async def skip(items, count: int):
+    # Drops the results before the cursor of a job, when the server cannot leave them out
+    async for item in items:
+        if count > 0:
+            count -= 1
+            continue
+        yield item
+
+
+def parse_job_status(data):
+    """
+    This function extracts the status of a job from its details, which hold it either at the top level
+    or in a nested details object.
+
+    :param data: The answer of the job launcher server.
+    :return: The status in upper case, or None if the answer holds none.
+    """
+    if isinstance(data, dict) and "status" not in data and isinstance(data.get("details"), dict):
+        data = data["details"]
+    status = data.get("status") if isinstance(data, dict) else None
+    return status.upper() if isinstance(status, str) else None
+
+
+# Characters that may follow a complete item of a JSON array
+VALUE_DELIMITERS = frozenset(", \t\n\r]")
+
+
+async def iter_json_array(stream, chunk_size: int = 65536):
+    """
+    This function parses a JSON array from a stream and yields its items as soon as they are complete,
+    so that memory use depends on the size of one item rather than the size of the array.
+
+    :param stream: The stream to read, such as the content of an aiohttp response.
+    :param chunk_size: The number of bytes to read at once.
+    :raises ValueError: If the stream is not a JSON array.
+    """
+    decoder = json.JSONDecoder()
+    text_decoder = codecs.getincrementaldecoder("utf-8")()
+    buffer = ""
+    position = 0
+    state = "start"  # start -> first -> (item -> separator)* -> end
+    eof = False
+    while not eof:
+        chunk = await stream.read(chunk_size)
+        eof = not chunk
+        buffer = buffer[position:] + text_decoder.decode(chunk, final=eof)
+        position = 0
+        while True:
+            while position < len(buffer) and buffer[position] in " \t\n\r":
+                position += 1
+            if position == len(buffer):
+                break
+            character = buffer[position]
+            if state == "start":
+                if character != "[":
+                    raise ValueError(f"Expected a JSON array, got {buffer[position:position + 20]!r}")
+                position += 1
+                state = "first"
+                continue
+            if state in ("first", "separator") and character == "]":
+                return
+            if state == "separator":
+                if character != ",":
+                    raise ValueError(f"Expected ',' or ']', got {character!r}")
+                position += 1
+                state = "item"
+                continue
+            try:
+                item, end = decoder.raw_decode(buffer, position)
+            except json.JSONDecodeError:
+                if eof:
+                    raise ValueError("Incomplete JSON array")
+                break  # Wait for the rest of the item
+            if (
+                not eof
+                and not isinstance(item, (dict, list, str))
+                and (end == len(buffer) or buffer[end] not in VALUE_DELIMITERS)
+            ):
+                break  # A number or literal may continue in the next chunk, e.g. "1" followed by ".25"
+            yield item
+            position = end
+            state = "separator"
+    raise ValueError("Incomplete JSON array")
+
+
+def discard_response(task):
+    # Releases the response of a request that lost a hedged race
+    if not task.cancelled() and task.exception() is None:
+        task.result().release()
+
+
+def raise_for_launcher_status(response):
+    if response.status == 429 or response.status >= 500:
+        raise LauncherUnavailableError(
+            response.status, parse_retry_after(response.headers.get("Retry-After"))
+        )
+
 
 class ExternalAPIHandler:
-    def __init__(self):
-        self.session = aiohttp.ClientSession()
+    def __init__(self, session: aiohttp.ClientSession):
+        self.session = session  # Owned by the bot, see services/http_client.py
         self.base_url = os.getenv(
             "API_BASE_URL"
         )  # Read API URL from an environment variable
+        self.batch_result_path = os.getenv(
+            "API_BATCH_RESULT_PATH"
+        )  # Optional batch result endpoint, e.g. /job/results
+        self.result_offset_param = os.getenv(
+            "API_RESULT_OFFSET_PARAM"
+        )  # Optional query parameter of the result endpoint skipping already published results
+        self.job_status_path = os.getenv(
+            "API_JOB_STATUS_PATH"
+        )  # Optional job details endpoint, e.g. /job/details/{job_id}
+        self.idempotency_keys = os.getenv(
+            "API_IDEMPOTENCY_KEYS", "false"
+        ).lower() == "true"  # Whether the launch endpoint answers a repeated Idempotency-Key with the same job
+        self.request_timeout = float(os.getenv("API_REQUEST_TIMEOUT", 10))
+        self.retries = int(os.getenv("API_RETRIES", 2))
+        self.retry_backoff = float(os.getenv("API_RETRY_BACKOFF", 0.5))
+        hedge_after = os.getenv("API_HEDGE_AFTER")
+        self.hedge_after = float(hedge_after) if hedge_after else None
+        self.breakers = {
+            endpoint: CircuitBreaker(
+                endpoint,
+                failure_threshold=int(os.getenv("API_BREAKER_FAILURES", 5)),
+                reset_timeout=float(os.getenv("API_BREAKER_RESET_TIMEOUT", 30)),
+            )
+            for endpoint in ("launch", "result")
+        }
+
+    def is_available(self, endpoint: str) -> bool:
+        """
+        This function returns whether requests to an endpoint may currently be sent.
+
+        :param endpoint: Either launch or result.
+        :return: False while the circuit breaker of the endpoint is open.
+        """
+        return self.breakers[endpoint].is_available()
 
     async def launch_job(
         self,
@@ -21,47 +284,220 @@ class ExternalAPIHandler:
         submissionsRequired,
         requesterDescription,
         fundAmount,
-        network_chain_id
+        network_chain_id,
+        idempotency_key=None
     ):
+        """
+        This function sends the launch of a job to the job launcher server.
+
+        :return: The answer of the server, or None if the job was certainly not launched.
+        :raises LaunchOutcomeUnknownError: If the launch was sent but its answer was lost.
+        """
         url = f"{self.base_url}/job/fortune"
 
         headers = {
             "x-api-key": api_key,  # Use the API key secret as the header value
             "Content-Type": "application/json",
         }
+        if idempotency_key:
+            # Lets the server answer a retried launch with the job it already created
+            headers["Idempotency-Key"] = idempotency_key
 
         payload = {
             "requesterTitle": requesterTitle,
             "submissionsRequired": int(submissionsRequired),
             "requesterDescription": requesterDescription,
-            "fundAmount": int(fundAmount),
+            # Sent as the exact number that was validated, see services/network_registry.py
+            "fundAmount": Decimal(str(fundAmount)),
             "chainId": int(network_chain_id)
         }
+        body = dumps_json(payload)
+        breaker = self.breakers["launch"]
+        if not breaker.allow():
+            logger.warning(f"Not launching job, the job launcher server is unavailable for {breaker.remaining():.0f}s")
+            return None
+        # Launches are not idempotent, so they are never retried
         try:
-            async with self.session.post(
-                url, json=payload, headers=headers
-            ) as response:
-                if response.status == 201:
-                    if response.headers.get("Content-Type") == "application/json":
-                        data = await response.json()
-                        return data  # You might want to return the job ID or some confirmation data
+            with LAUNCHER_REQUEST_DURATION.labels("launch").time():
+                async with self.session.post(
+                    url, data=body, headers=headers
+                ) as response:
+                    LAUNCHER_RESPONSES.labels("launch", response.status).inc()
+                    if response.status >= 500:
+                        breaker.record_failure()
+                    else:
+                        breaker.record_success()
+                    if response.status == 201:
+                        if response.content_type == "application/json":
+                            data = await response.json()
+                            return data  # You might want to return the job ID or some confirmation data
+                        else:
+                            response_text = await response.text()
+                            logger.warning(
+                                f"Expected JSON, but got a different content type: {response.headers.get('Content-Type')}"
+                            )
+                            logger.warning(f"Response text: {response_text}")
+                            return response_text
                     else:
                         response_text = await response.text()
-                        print(
-                            f"Expected JSON, but got a different content type: {response.headers.get('Content-Type')}"
-                        )
-                        print(f"Response text: {response_text}")
-                        return response_text
-                else:
-                    response_text = await response.text()
-                    print(f"Failed to launch job: {response.status} {response_text}")
-                    return None
-        except Exception as e:
-            print(f"Error while making API request: {str(e)}")
+                        logger.error(f"Failed to launch job: {response.status} {response_text}")
+                        return None
+        except (aiohttp.ClientConnectorError, aiohttp.ConnectionTimeoutError) as e:
+            # Nothing was sent, so the job was not launched
+            LAUNCHER_RESPONSES.labels("launch", "error").inc()
+            breaker.record_failure()
+            logger.error(f"Error while making API request: {str(e)}")
             return None
+        except Exception as e:
+            LAUNCHER_RESPONSES.labels("launch", "error").inc()
+            breaker.record_failure()
+            logger.error(f"No answer to the launch of a job, it may have been launched: {e!r}")
+            raise LaunchOutcomeUnknownError(str(e) or type(e).__name__) from e
+        except BaseException:
+            breaker.release()
+            raise
+
+    async def check_job_results(
+        self, api_key, job_ids, consume, *, semaphore=None, timeout=None, offsets=None
+    ):
+        """
+        This function fetches the results of several jobs launched with the same API key. It uses the batch
+        endpoint set in API_BATCH_RESULT_PATH when there is one, and otherwise sends one request per job
+        concurrently over the pooled connections. The results of every job are handed to `consume` as an
+        async iterator while they are being downloaded.
+
+        :param api_key: The API key secret the jobs were launched with.
+        :param job_ids: The IDs of the jobs.
+        :param consume: A coroutine function called with a job ID and an async iterator of its results.
+        :param semaphore: An optional semaphore limiting the number of requests in flight.
+        :param timeout: The number of seconds to wait for a single request and the consumption of its results.
+        :param offsets: An optional dictionary mapping job IDs to the number of their results to leave out,
+        because they were already published.
+        :return: A dictionary mapping every job ID to the value returned by `consume`, or to the JobResultError
+        explaining why its results could not be fetched.
+        """
+        job_ids = list(dict.fromkeys(job_ids))
+        if not job_ids:
+            return {}
+        offsets = offsets or {}
+        breaker = self.breakers["result"]
+        if self.batch_result_path:
+            if not breaker.allow():
+                error = CircuitOpenError("result", breaker.remaining())
+                return {job_id: error for job_id in job_ids}
+            try:
+                batch = await asyncio.wait_for(
+                    self._fetch_job_results_batch(api_key, job_ids), timeout
+                )
+            except BatchNotSupportedError:
+                breaker.release()
+                logger.warning(
+                    f"Batch result endpoint {self.batch_result_path} is not supported, falling back to one request per job"
+                )
+                self.batch_result_path = None
+            except asyncio.TimeoutError:
+                LAUNCHER_RESPONSES.labels("result_batch", "timeout").inc()
+                breaker.record_failure()
+                error = JobResultError(f"Timed out after {timeout}s")
+                return {job_id: error for job_id in job_ids}
+            except JobResultError as e:
+                if e.status is not None and e.status >= 500:
+                    breaker.record_failure()
+                else:
+                    breaker.record_success()
+                return {job_id: e for job_id in job_ids}
+            except Exception as e:
+                LAUNCHER_RESPONSES.labels("result_batch", "error").inc()
+                breaker.record_failure()
+                error = JobResultError(f"Error while making API request: {str(e)}")
+                return {job_id: error for job_id in job_ids}
+            except BaseException:
+                breaker.release()
+                raise
+            else:
+                breaker.record_success()
+                outcomes = {}
+                for job_id, results in batch.items():
+                    if isinstance(results, JobResultError):
+                        outcomes[job_id] = results
+                    else:
+                        outcomes[job_id] = await consume(
+                            job_id, iterate(results[offsets.get(job_id, 0):])
+                        )
+                return outcomes
+
+        semaphore = semaphore or asyncio.Semaphore(len(job_ids))
+
+        async def fetch_and_consume(job_id):
+            results = self.iter_job_result(api_key, job_id, offsets.get(job_id, 0))
+            try:
+                return await consume(job_id, results)
+            finally:
+                await results.aclose()
 
-    async def check_job_result(self, api_key, job_id):
+        async def fetch(job_id):
+            async with semaphore:
+                try:
+                    return await asyncio.wait_for(fetch_and_consume(job_id), timeout)
+                except asyncio.TimeoutError:
+                    LAUNCHER_RESPONSES.labels("result", "timeout").inc()
+                    return JobResultError(f"Timed out after {timeout}s")
+                except JobResultError as e:
+                    return e
+                except Exception as e:
+                    LAUNCHER_RESPONSES.labels("result", "error").inc()
+                    return JobResultError(f"Error while making API request: {str(e)}")
+
+        return dict(zip(job_ids, await asyncio.gather(*(fetch(job_id) for job_id in job_ids))))
+
+    async def iter_job_result(self, api_key, job_id, offset=0):
+        """
+        This function yields the results of a job while the response is being downloaded, so that the whole
+        body is never held in memory. Failed requests are retried as long as no result has been yielded.
+
+        :param api_key: The API key secret the job was launched with.
+        :param job_id: The ID of the job.
+        :param offset: The number of results to leave out, because they were already published.
+        """
         url = f"{self.base_url}/job/result?jobId={job_id}"
+        if offset and self.result_offset_param:
+            # The server leaves out the published results, so only new ones are transferred
+            url += f"&{self.result_offset_param}={offset}"
+            offset = 0
+
+        headers = {
+            "x-api-key": api_key,  # Use the API key secret as the header value
+            "Content-Type": "application/json",
+        }
+
+        response = await self._request_job_result(url, headers)
+        try:
+            # The body is parsed as JSON whatever its content type
+            try:
+                async for item in skip(iter_json_array(response.content), offset):
+                    yield parse_result(item)
+            except ValueError as e:
+                raise JobResultError(
+                    f"Unexpected job result with content type {response.headers.get('Content-Type')}: {e}"
+                )
+        finally:
+            response.release()
+
+    async def get_job_status(self, api_key, job_id):
+        """
+        This function fetches the status of a job from the endpoint set in API_JOB_STATUS_PATH, so that a job
+        that will never get all its submissions, e.g. because it was cancelled, is no longer checked.
+
+        :param api_key: The API key secret the job was launched with.
+        :param job_id: The ID of the job.
+        :return: The status of the job in upper case, or None if there is no status endpoint or the request failed.
+        """
+        if not self.job_status_path:
+            return None
+        breaker = self.breakers["result"]
+        if not breaker.allow():
+            return None
+        url = f"{self.base_url}{self.job_status_path.format(job_id=job_id)}"
 
         headers = {
             "x-api-key": api_key,  # Use the API key secret as the header value
@@ -69,44 +505,170 @@ class ExternalAPIHandler:
         }
 
         try:
-            async with self.session.get(url, headers=headers) as response:
-                if response.status == 200:
-                    if response.headers.get("Content-Type") == "application/json":
-                        data = await response.json()
-                        # Assuming the API returns an array of FortuneFinalResultDto objects
-                        results = []
-                        for item in data:
-                            result = {
-                                "workerAddress": item.get("workerAddress", ""),
-                                "solution": item.get("solution", ""),
-                            }
-                            results.append(result)
-                        return results
+            with LAUNCHER_REQUEST_DURATION.labels("status").time():
+                async with self.session.get(
+                    url, headers=headers, timeout=aiohttp.ClientTimeout(total=self.request_timeout)
+                ) as response:
+                    LAUNCHER_RESPONSES.labels("status", response.status).inc()
+                    if response.status >= 500:
+                        breaker.record_failure()
                     else:
-                        response_text = await response.text()
-                        print(
-                            f"Expected JSON, but got a different content type: {response.headers.get('Content-Type')}"
-                        )
-                        print(f"Response text: {response_text}")
-                        try:
-                            data = json.loads(response_text)
-                            return data
-                        except json.JSONDecodeError:
-                        # If parsing fails, handle it as a non-JSON response
-                            print(
-                                f"Expected JSON, but got a different content type: {response.headers.get('Content-Type')}"
-                            )
-                            print(f"Response text: {response_text}")
-                            return None
-                else:
-                    response_text = await response.text()
-                    print(
-                        f"Failed to check job result: {response.status} {response_text}"
-                    )
-                    return None
+                        breaker.record_success()
+                    if response.status != 200:
+                        logger.warning(f"Failed to check job status: {response.status} {await response.text()}")
+                        return None
+                    try:
+                        return parse_job_status(await response.json(content_type=None))
+                    except ValueError as e:
+                        logger.warning(f"Unexpected job status: {str(e)}")
+                        return None
         except Exception as e:
-            print(f"Error while making API request to check job result: {str(e)}")
+            LAUNCHER_RESPONSES.labels("status", "error").inc()
+            breaker.record_failure()
+            logger.error(f"Error while making API request to check job status: {str(e)}")
             return None
+        except BaseException:
+            breaker.release()
+            raise
+
+    async def _request_job_result(self, url, headers):
+        """
+        This function sends a result request, retrying it with exponential backoff when it times out, fails
+        to connect or gets a 5xx answer. A 429 answer is not retried, so that callers can back off.
+
+        :param url: The URL of the result endpoint.
+        :param headers: The headers of the request.
+        :return: The response, whose status is 200 and whose body has not been read yet.
+        """
+        for attempt in range(self.retries + 1):
+            if attempt:
+                await asyncio.sleep(self.retry_backoff * 2 ** (attempt - 1) * random.uniform(0.5, 1))
+            last_attempt = attempt == self.retries
+            try:
+                return await self._hedge_job_result(url, headers)
+            except LauncherUnavailableError as e:
+                if e.status == 429 or last_attempt:
+                    raise
+            except asyncio.TimeoutError:
+                if last_attempt:
+                    raise JobResultError(f"Timed out after {self.request_timeout}s")
+            except aiohttp.ClientError as e:
+                if last_attempt:
+                    raise JobResultError(f"Error while making API request: {str(e)}")
+
+    async def _hedge_job_result(self, url, headers):
+        """
+        This function sends a result request and, if no answer has come back after API_HEDGE_AFTER seconds,
+        a second identical one. The first successful answer is kept and the other request is cancelled.
+
+        :param url: The URL of the result endpoint.
+        :param headers: The headers of the request.
+        :return: The first response whose status is 200.
+        """
+        if self.hedge_after is None:
+            return await self._open_job_result(url, headers)
+        tasks = [asyncio.ensure_future(self._open_job_result(url, headers))]
+        winner = None
+        try:
+            done, _ = await asyncio.wait(tasks, timeout=self.hedge_after)
+            if not done:
+                tasks.append(asyncio.ensure_future(self._open_job_result(url, headers)))
+            pending = set(tasks)
+            error = None
+            while pending:
+                done, pending = await asyncio.wait(pending, return_when=asyncio.FIRST_COMPLETED)
+                for task in done:
+                    if task.exception() is None:
+                        winner = task
+                        return task.result()
+                    # Keep the most useful error, a hedge refused by an open circuit says little
+                    if error is None or isinstance(error, CircuitOpenError):
+                        error = task.exception()
+            raise error
+        finally:
+            for task in tasks:
+                if task is not winner:
+                    task.cancel()
+                    task.add_done_callback(discard_response)
+
+    async def _open_job_result(self, url, headers):
+        """
+        This function sends a single result request and checks its status, recording the outcome in the
+        circuit breaker of the result endpoint.
+
+        :param url: The URL of the result endpoint.
+        :param headers: The headers of the request.
+        :return: The response, whose status is 200 and whose body has not been read yet.
+        """
+        breaker = self.breakers["result"]
+        if not breaker.allow():
+            raise CircuitOpenError("result", breaker.remaining())
+        try:
+            with LAUNCHER_REQUEST_DURATION.labels("result").time():
+                response = await asyncio.wait_for(
+                    self.session.get(url, headers=headers), self.request_timeout
+                )
+        except asyncio.TimeoutError:
+            LAUNCHER_RESPONSES.labels("result", "timeout").inc()
+            breaker.record_failure()
+            raise
+        except aiohttp.ClientError:
+            LAUNCHER_RESPONSES.labels("result", "error").inc()
+            breaker.record_failure()
+            raise
+        except BaseException:
+            breaker.release()
+            raise
+        LAUNCHER_RESPONSES.labels("result", response.status).inc()
+        if response.status >= 500:
+            breaker.record_failure()
+        else:
+            breaker.record_success()
+        try:
+            raise_for_launcher_status(response)
+            if response.status != 200:
+                response_text = await response.text()
+                raise JobResultError(
+                    f"Failed to check job result: {response.status} {response_text}",
+                    response.status,
+                )
+        except BaseException:
+            response.release()
+            raise
+        return response
+
+    async def _fetch_job_results_batch(self, api_key, job_ids):
+        url = f"{self.base_url}{self.batch_result_path}"
+
+        headers = {
+            "x-api-key": api_key,  # Use the API key secret as the header value
+            "Content-Type": "application/json",
+        }
+
+        with LAUNCHER_REQUEST_DURATION.labels("result_batch").time():
+            async with self.session.post(
+                url, json={"jobIds": job_ids}, headers=headers
+            ) as response:
+                LAUNCHER_RESPONSES.labels("result_batch", response.status).inc()
+                if response.status in (404, 405):
+                    raise BatchNotSupportedError()
+                raise_for_launcher_status(response)
+                if response.status != 200:
+                    response_text = await response.text()
+                    raise JobResultError(
+                        f"Failed to check job results: {response.status} {response_text}",
+                        response.status,
+                    )
+                # Assuming the batch endpoint maps every job ID to its results or to an error
+                data = await response.json(content_type=None)
 
-    async def close_session(self):
-        await self.session.close()
+        results = {}
+        for job_id in job_ids:
+            item = data.get(str(job_id))
+            if isinstance(item, list):
+                results[job_id] = parse_results(item)
+            elif isinstance(item, dict) and item.get("error"):
+                results[job_id] = JobResultError(item["error"])
+            else:
+                results[job_id] = JobResultError("Missing from the batch response")
+        return results
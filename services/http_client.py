@@ -0,0 +1,30 @@
+"""
+Author Sarthak Vijayvergiya - https://github.com/sarthakvijayvergiya
+Description: A Discord bot that helps in launching jobs, setting API keys, and configuring result channels for the Human Protocol.
+"""
+
+import os
+
+import aiohttp
+
+
+def create_http_session() -> aiohttp.ClientSession:
+    """
+    This function creates the HTTP session shared by every cog and service of the bot.
+    It must be called from a running event loop, and the session must be closed on shutdown.
+
+    :return: A session whose connection pool keeps TCP/TLS connections alive between requests.
+    """
+    connector = aiohttp.TCPConnector(
+        limit=int(os.getenv("HTTP_POOL_SIZE", 100)),
+        limit_per_host=int(os.getenv("HTTP_POOL_SIZE_PER_HOST", 0)),  # 0 means no per-host limit
+        keepalive_timeout=float(os.getenv("HTTP_KEEPALIVE_TIMEOUT", 60)),
+        use_dns_cache=True,
+        ttl_dns_cache=int(os.getenv("HTTP_DNS_CACHE_TTL", 300)),
+    )
+    timeout = aiohttp.ClientTimeout(
+        total=float(os.getenv("HTTP_TOTAL_TIMEOUT", 60)),
+        connect=float(os.getenv("HTTP_CONNECT_TIMEOUT", 10)),
+        sock_read=float(os.getenv("HTTP_READ_TIMEOUT", 30)),
+    )
+    return aiohttp.ClientSession(connector=connector, timeout=timeout)
@@ -0,0 +1,90 @@
+"""
+Author Sarthak Vijayvergiya - https://github.com/sarthakvijayvergiya
+Description: A Discord bot that helps in launching jobs, setting API keys, and configuring result channels for the Human Protocol.
+"""
+
+import random
+import time
+
+
+class JobScheduler:
+    def __init__(
+        self,
+        *,
+        min_interval: float,
+        max_interval: float,
+        factor: float = 2.0,
+        jitter: float = 0.2,
+        throttle_min_interval: float = 30.0,
+        throttle_max_interval: float = 900.0,
+    ) -> None:
+        """
+        Decides when a job is checked next. Jobs are ordered by their next check time in the `jobs` table,
+        so this class only has to compute the delays.
+
+        :param min_interval: The delay before the first check of a job.
+        :param max_interval: The maximum delay between two checks of the same job.
+        :param factor: How much the delay grows after every check that finds no results.
+        :param jitter: The fraction of the delay that is randomised so that jobs launched together spread out.
+        :param throttle_min_interval: The first pause after the job launcher server answers 429 or 5xx.
+        :param throttle_max_interval: The maximum pause after repeated 429 or 5xx answers.
+        """
+        self.min_interval = min_interval
+        self.max_interval = max_interval
+        self.factor = factor
+        self.jitter = jitter
+        self.throttle_min_interval = throttle_min_interval
+        self.throttle_max_interval = throttle_max_interval
+        self.throttle_errors = 0
+        self.throttled_until = 0.0
+
+    def next_check_delay(self, attempts: int) -> float:
+        """
+        This function returns the delay before the next check of a job.
+
+        :param attempts: The number of checks of the job that found no results.
+        :return: The delay in seconds.
+        """
+        delay = self.backoff(self.min_interval, self.max_interval, attempts)
+        return delay * random.uniform(1 - self.jitter, 1)
+
+    def backoff(self, interval: float, max_interval: float, count: int) -> float:
+        """
+        This function grows `interval` by `factor` `count` times, up to `max_interval`. It stops growing once
+        the maximum is reached, as `factor ** count` overflows for the large counts of long-running jobs.
+
+        :param interval: The first delay.
+        :param max_interval: The maximum delay.
+        :param count: The number of times the delay grows.
+        :return: The delay in seconds.
+        """
+        for _ in range(count):
+            if interval <= 0 or interval >= max_interval:
+                break
+            interval *= self.factor
+        return min(max_interval, interval)
+
+    def record_throttle(self, retry_after: float = None) -> None:
+        """
+        This function pauses all checks after the job launcher server answered 429 or 5xx.
+
+        :param retry_after: The delay requested by the server, if any.
+        """
+        delay = self.backoff(self.throttle_min_interval, self.throttle_max_interval, self.throttle_errors)
+        delay = max(delay * random.uniform(1 - self.jitter, 1), retry_after or 0)
+        self.throttle_errors += 1
+        self.throttled_until = max(self.throttled_until, time.monotonic() + delay)
+
+    def record_success(self) -> None:
+        """
+        This function resets the pause after the job launcher server answered normally again.
+        """
+        self.throttle_errors = 0
+
+    def throttle_remaining(self) -> float:
+        """
+        This function returns how long checks are still paused.
+
+        :return: The remaining pause in seconds, 0 if checks can run.
+        """
+        return max(0.0, self.throttled_until - time.monotonic())
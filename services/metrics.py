@@ -0,0 +1,237 @@
+"""
+Author Sarthak Vijayvergiya - https://github.com/sarthakvijayvergiya
+Description: A Discord bot that helps in launching jobs, setting API keys, and configuring result channels for the Human Protocol.
+"""
+
+import bisect
+import time
+
+from aiohttp import web
+
+DEFAULT_BUCKETS = (0.005, 0.01, 0.025, 0.05, 0.1, 0.25, 0.5, 1, 2.5, 5, 10, 30, 60)
+
+
+def format_labels(names, values, extra="") -> str:
+    labels = [f'{name}="{str(value)}"' for name, value in zip(names, values)]
+    if extra:
+        labels.append(extra)
+    return "{" + ",".join(labels) + "}" if labels else ""
+
+
+class Timer:
+    def __init__(self, metric) -> None:
+        self.metric = metric
+
+    def __enter__(self):
+        self.started_at = time.perf_counter()
+        return self
+
+    def __exit__(self, *exc_info) -> None:
+        self.metric.observe(time.perf_counter() - self.started_at)
+
+
+class Metric:
+    type = None
+
+    def __init__(self, name: str, documentation: str, labelnames=(), registry=None) -> None:
+        """
+        A metric, or a family of metrics when it has label names. Recording a value only updates numbers in
+        memory; the text format is only built when the metrics endpoint is scraped.
+
+        :param name: The name of the metric.
+        :param documentation: The help text of the metric.
+        :param labelnames: The names of the labels of the metric.
+        :param registry: The registry the metric is exposed through, the default registry if not set.
+        """
+        self.name = name
+        self.documentation = documentation
+        self.labelnames = tuple(labelnames)
+        self.children = {}
+        (registry or REGISTRY).register(self)
+
+    def labels(self, *values):
+        """
+        This function returns the metric with the given label values, creating it on first use.
+
+        :param values: The label values, in the order of the label names.
+        """
+        child = self.children.get(values)
+        if child is None:
+            child = self.children[values] = self.new_child()
+        return child
+
+    def new_child(self):
+        raise NotImplementedError
+
+    def samples(self):
+        """
+        This function yields the (suffix, label values, extra label, value) samples of the metric.
+        """
+        raise NotImplementedError
+
+    def render(self) -> str:
+        lines = [f"# HELP {self.name} {self.documentation}", f"# TYPE {self.name} {self.type}"]
+        for suffix, values, extra, value in self.samples():
+            lines.append(
+                f"{self.name}{suffix}{format_labels(self.labelnames, values, extra)} {value}"
+            )
+        return "\n".join(lines)
+
+
+class CounterValue:
+    __slots__ = ("value",)
+
+    def __init__(self) -> None:
+        self.value = 0.0
+
+    def inc(self, amount: float = 1) -> None:
+        self.value += amount
+
+
+class Counter(Metric):
+    type = "counter"
+
+    def new_child(self):
+        return CounterValue()
+
+    def inc(self, amount: float = 1) -> None:
+        self.labels().inc(amount)
+
+    def samples(self):
+        for values, child in self.children.items():
+            yield "_total", values, "", child.value
+
+
+class GaugeValue(CounterValue):
+    __slots__ = ()
+
+    def set(self, value: float) -> None:
+        self.value = value
+
+    def dec(self, amount: float = 1) -> None:
+        self.value -= amount
+
+
+class Gauge(Metric):
+    type = "gauge"
+
+    def new_child(self):
+        return GaugeValue()
+
+    def set(self, value: float) -> None:
+        self.labels().set(value)
+
+    def inc(self, amount: float = 1) -> None:
+        self.labels().inc(amount)
+
+    def dec(self, amount: float = 1) -> None:
+        self.labels().dec(amount)
+
+    def samples(self):
+        for values, child in self.children.items():
+            yield "", values, "", child.value
+
+
+class HistogramValue:
+    __slots__ = ("buckets", "counts", "sum", "count")
+
+    def __init__(self, buckets) -> None:
+        self.buckets = buckets
+        self.counts = [0] * len(buckets)
+        self.sum = 0.0
+        self.count = 0
+
+    def observe(self, value: float) -> None:
+        index = bisect.bisect_left(self.buckets, value)
+        if index < len(self.counts):
+            self.counts[index] += 1
+        self.sum += value
+        self.count += 1
+
+    def time(self) -> Timer:
+        return Timer(self)
+
+
+class Histogram(Metric):
+    type = "histogram"
+
+    def __init__(self, name: str, documentation: str, labelnames=(), registry=None, buckets=DEFAULT_BUCKETS) -> None:
+        self.buckets = tuple(sorted(buckets))
+        super().__init__(name, documentation, labelnames, registry)
+
+    def new_child(self):
+        return HistogramValue(self.buckets)
+
+    def observe(self, value: float) -> None:
+        self.labels().observe(value)
+
+    def time(self) -> Timer:
+        return self.labels().time()
+
+    def samples(self):
+        for values, child in self.children.items():
+            cumulative = 0
+            for bound, count in zip(self.buckets, child.counts):
+                cumulative += count
+                yield "_bucket", values, f'le="{bound}"', cumulative
+            yield "_bucket", values, 'le="+Inf"', child.count
+            yield "_sum", values, "", child.sum
+            yield "_count", values, "", child.count
+
+
+class Registry:
+    def __init__(self) -> None:
+        self.metrics = []
+        self.collectors = []
+
+    def register(self, metric: Metric) -> None:
+        self.metrics.append(metric)
+
+    def add_collector(self, collector) -> None:
+        """
+        This function adds a coroutine function that is awaited before every scrape, to update metrics
+        that are too expensive to keep up to date all the time.
+
+        :param collector: The coroutine function to await.
+        """
+        self.collectors.append(collector)
+
+    def remove_collector(self, collector) -> None:
+        if collector in self.collectors:
+            self.collectors.remove(collector)
+
+    async def render(self) -> str:
+        """
+        This function returns every metric in the Prometheus text format.
+        """
+        for collector in list(self.collectors):
+            await collector()
+        return "\n".join(metric.render() for metric in self.metrics) + "\n"
+
+
+REGISTRY = Registry()
+
+
+async def start_metrics_server(host: str, port: int, registry: Registry = None) -> web.AppRunner:
+    """
+    This function serves the metrics on http://<host>:<port>/metrics.
+
+    :param host: The address to listen on.
+    :param port: The port to listen on.
+    :param registry: The registry to serve, the default registry if not set.
+    :return: The runner of the server, to clean up on shutdown.
+    """
+    registry = registry or REGISTRY
+
+    async def metrics(request: web.Request) -> web.Response:
+        return web.Response(
+            body=(await registry.render()).encode(),
+            headers={"Content-Type": "text/plain; version=0.0.4; charset=utf-8"},
+        )
+
+    app = web.Application()
+    app.router.add_get("/metrics", metrics)
+    runner = web.AppRunner(app, access_log=None)
+    await runner.setup()
+    await web.TCPSite(runner, host, port).start()
+    return runner
@@ -0,0 +1,168 @@
+"""
+Author Sarthak Vijayvergiya - https://github.com/sarthakvijayvergiya
+Description: A Discord bot that helps in launching jobs, setting API keys, and configuring result channels for the Human Protocol.
+"""
+
+import json
+import os
+from decimal import Decimal, InvalidOperation
+
+
+class NetworkConfigError(Exception):
+    """
+    Raised when SUPPORTED_NETWORKS cannot be parsed.
+    """
+
+
+class LaunchValidationError(ValueError):
+    """
+    Raised when the details of a job are not valid for its network. The message is meant for the user.
+    """
+
+
+class Network:
+    __slots__ = ("name", "chain_id", "decimals", "minimum_fund")
+
+    def __init__(self, name: str, chain_id: int, decimals: int = 18, minimum_fund: Decimal = Decimal(0)) -> None:
+        """
+        A network jobs can be launched on.
+
+        :param name: The name shown to users.
+        :param chain_id: The chain ID sent to the job launcher server.
+        :param decimals: The number of decimals of the token funding the job.
+        :param minimum_fund: The smallest fund amount accepted for a job.
+        """
+        self.name = name
+        self.chain_id = chain_id
+        self.decimals = decimals
+        self.minimum_fund = minimum_fund
+
+    def describe(self) -> str:
+        description = f"Chain ID {self.chain_id}"
+        if self.minimum_fund:
+            description += f", minimum fund {self.minimum_fund}"
+        return description
+
+    def validate_launch(self, submissionsRequired, fundAmount):
+        """
+        This function checks the details of a job typed by a user before it is launched on this network.
+
+        :param submissionsRequired: The number of submissions required, as typed by the user.
+        :param fundAmount: The fund amount, as typed by the user.
+        :return: A tuple containing the number of submissions and the fund amount as an exact Decimal.
+        :raises LaunchValidationError: If a value is not valid.
+        """
+        try:
+            submissions = int(str(submissionsRequired).strip())
+        except ValueError:
+            raise LaunchValidationError("Submissions required must be a whole number.")
+        if submissions < 1:
+            raise LaunchValidationError("At least one submission is required.")
+        try:
+            fund = Decimal(str(fundAmount).strip())
+        except InvalidOperation:
+            raise LaunchValidationError("Fund amount must be a number.")
+        if not fund.is_finite() or fund <= 0:
+            raise LaunchValidationError("Fund amount must be greater than 0.")
+        if fund < self.minimum_fund:
+            raise LaunchValidationError(f"The minimum fund amount on {self.name} is {self.minimum_fund}.")
+        if -fund.normalize().as_tuple().exponent > self.decimals:
+            raise LaunchValidationError(f"Fund amount can have at most {self.decimals} decimals on {self.name}.")
+        # Without trailing zeros or an exponent, e.g. 100 rather than 1E+2, so it is shown and sent as typed
+        return submissions, Decimal(format(fund.normalize(), "f"))
+
+
+def parse_networks(value: str) -> list:
+    """
+    This function parses SUPPORTED_NETWORKS, a JSON object mapping every network name either to its chain ID
+    or to an object with `chainId` and the optional `decimals` and `minimumFund`, e.g.
+    {"Mumbai": 80001, "Polygon": {"chainId": 137, "decimals": 18, "minimumFund": 1}}.
+
+    :param value: The value of SUPPORTED_NETWORKS.
+    :return: A list of networks.
+    :raises NetworkConfigError: If the value is not valid.
+    """
+    if not value:
+        raise NetworkConfigError("SUPPORTED_NETWORKS is not set")
+    try:
+        # Single quotes are accepted, as in {'Mumbai': 80001}
+        data = json.loads(value.replace("'", '"'))
+    except ValueError as e:
+        raise NetworkConfigError(f"SUPPORTED_NETWORKS is not valid JSON: {e}")
+    if not isinstance(data, dict):
+        raise NetworkConfigError("SUPPORTED_NETWORKS must be a JSON object")
+    networks = []
+    for name, settings in data.items():
+        if not isinstance(settings, dict):
+            settings = {"chainId": settings}
+        try:
+            networks.append(
+                Network(
+                    name,
+                    int(settings["chainId"]),
+                    int(settings.get("decimals", 18)),
+                    Decimal(str(settings.get("minimumFund", 0))),
+                )
+            )
+        except (KeyError, TypeError, ValueError, InvalidOperation):
+            raise NetworkConfigError(f"Network {name} of SUPPORTED_NETWORKS has no valid chainId, decimals or minimumFund")
+    return networks
+
+
+class NetworkRegistry:
+    def __init__(self, networks=()) -> None:
+        """
+        The networks jobs can be launched on, parsed once and looked up by name or by chain ID.
+
+        :param networks: The networks.
+        """
+        self.load(networks)
+
+    @classmethod
+    def from_env(cls) -> "NetworkRegistry":
+        return cls(parse_networks(os.getenv("SUPPORTED_NETWORKS")))
+
+    def load(self, networks) -> None:
+        """
+        This function replaces the networks of the registry.
+
+        :param networks: The networks.
+        :raises NetworkConfigError: If two networks share a name or a chain ID.
+        """
+        by_name = {}
+        by_chain_id = {}
+        for network in networks:
+            if network.name.casefold() in by_name or network.chain_id in by_chain_id:
+                raise NetworkConfigError(f"Network {network.name} is listed twice in SUPPORTED_NETWORKS")
+            by_name[network.name.casefold()] = network
+            by_chain_id[network.chain_id] = network
+        # The lookups and the choice list are swapped together, so readers never see a mix of both
+        self.by_name, self.by_chain_id = by_name, by_chain_id
+        self.networks = list(by_name.values())
+        self.choices = ", ".join(network.name for network in self.networks)
+
+    def reload(self) -> int:
+        """
+        This function parses SUPPORTED_NETWORKS again. The registry is left unchanged if it is not valid.
+
+        :return: The number of networks.
+        :raises NetworkConfigError: If SUPPORTED_NETWORKS is not valid.
+        """
+        self.load(parse_networks(os.getenv("SUPPORTED_NETWORKS")))
+        return len(self.networks)
+
+    def get(self, value):
+        """
+        This function looks up a network by name, ignoring case, or by chain ID.
+
+        :param value: The name or the chain ID of the network.
+        :return: The network, or None if it is not supported.
+        """
+        value = str(value).strip()
+        network = self.by_name.get(value.casefold())
+        if network is None and value.isdigit():
+            network = self.by_chain_id.get(int(value))
+        return network
+
+    def __len__(self) -> int:
+        return len(self.networks)
@@ -0,0 +1,111 @@
+"""
+Author Sarthak Vijayvergiya - https://github.com/sarthakvijayvergiya
+Description: A Discord bot that helps in launching jobs, setting API keys, and configuring result channels for the Human Protocol.
+"""
+
+import asyncio
+import logging
+from collections import defaultdict
+
+from services.external_api_handler import JobResultError
+from services.metrics import Counter, Histogram
+
+logger = logging.getLogger("discord_bot")
+
+RESULT_POLL_DURATION = Histogram(
+    "result_poll_duration_seconds", "Time spent in one pass of the result polling loop."
+)
+RESULT_POLL_JOBS = Counter(
+    "result_poll_jobs", "Jobs whose results were checked, by outcome.", ["outcome"]
+)
+
+
+class ResultPoller:
+    def __init__(self, external_api_handler, api_keys, *, concurrency: int, timeout: float) -> None:
+        """
+        Checks the results of many jobs concurrently.
+
+        :param external_api_handler: The handler used to talk to the job launcher server.
+        :param api_keys: A coroutine function returning the API key of a user, or None if there is none.
+        :param concurrency: The maximum number of result requests in flight at once.
+        :param timeout: The number of seconds to wait for a single result request.
+        """
+        self.external_api_handler = external_api_handler
+        self.api_keys = api_keys
+        self.concurrency = max(1, concurrency)
+        self.timeout = timeout
+
+    async def poll(self, jobs, consume):
+        """
+        This function checks the results of the given jobs. Jobs are grouped by user, and so by API key,
+        so that every group is fetched as one batch, with at most `concurrency` requests in flight.
+        Only the results past the cursor of every job, those that were not published yet, are consumed.
+
+        :param jobs: The jobs to check.
+        :param consume: A coroutine function called with a job and an async iterator of its new results,
+        while they are being downloaded.
+        :return: A list of (job, outcome, error) tuples in the same order as `jobs`. Outcome is the value
+        returned by `consume`, or None when the check failed and error is the JobResultError explaining why.
+        """
+        semaphore = asyncio.Semaphore(self.concurrency)
+        groups = defaultdict(dict)
+        for job in jobs:
+            groups[job.user_id][job.job_id] = job
+
+        async def check(user_id, group):
+            async def consume_job(job_id, results):
+                return await consume(group[job_id], results)
+
+            try:
+                api_key = await self.api_keys(user_id)
+            except Exception as e:
+                api_key = None
+                logger.error(f"Cannot read the API key of user {user_id}: {e}")
+            if not api_key:
+                error = JobResultError(f"User {user_id} has no usable API key")
+                return user_id, {job_id: error for job_id in group}
+            return user_id, await self.external_api_handler.check_job_results(
+                api_key,
+                list(group),
+                consume_job,
+                semaphore=semaphore,
+                timeout=self.timeout,
+                offsets={job_id: job.published for job_id, job in group.items()},
+            )
+
+        outcomes = dict(
+            await asyncio.gather(
+                *(check(user_id, group) for user_id, group in groups.items())
+            )
+        )
+        checked = []
+        for job in jobs:
+            outcome = outcomes[job.user_id][job.job_id]
+            if isinstance(outcome, JobResultError):
+                logger.warning(f"Could not check the result of job {job.job_id}: {outcome}")
+                checked.append((job, None, outcome))
+            else:
+                checked.append((job, outcome, None))
+        return checked
+
+    async def statuses(self, jobs):
+        """
+        This function fetches the status of the given jobs, with at most `concurrency` requests in flight.
+
+        :param jobs: The jobs to check.
+        :return: A list of the status of every job in the same order as `jobs`, None where it is unknown.
+        """
+        semaphore = asyncio.Semaphore(self.concurrency)
+
+        async def status(job):
+            async with semaphore:
+                try:
+                    api_key = await self.api_keys(job.user_id)
+                except Exception as e:
+                    logger.error(f"Cannot read the API key of user {job.user_id}: {e}")
+                    return None
+                if not api_key:
+                    return None
+                return await self.external_api_handler.get_job_status(api_key, job.job_id)
+
+        return await asyncio.gather(*(status(job) for job in jobs))
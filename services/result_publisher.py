@@ -0,0 +1,433 @@
+"""
+Author Sarthak Vijayvergiya - https://github.com/sarthakvijayvergiya
+Description: A Discord bot that helps in launching jobs, setting API keys, and configuring result channels for the Human Protocol.
+"""
+
+import asyncio
+import json
+import logging
+import tempfile
+import time
+from collections import deque
+
+import discord
+
+from services.metrics import Counter, Histogram
+
+logger = logging.getLogger("discord_bot")
+
+DISCORD_SEND_DURATION = Histogram(
+    "discord_send_duration_seconds", "Time spent sending one result message to Discord."
+)
+DISCORD_SEND_FAILURES = Counter(
+    "discord_send_failures", "Result messages that could not be sent to Discord."
+)
+DIGEST_RESULTS = Counter(
+    "digest_results", "Results collected for digests of channels in digest mode."
+)
+
+MESSAGE_LIMIT = 2000  # Discord's maximum message length
+EMBED_LIMIT = 4096  # Discord's maximum length of an embed description
+
+
+def format_result(result) -> str:
+    line = f"Worker Address: {result['workerAddress']}, Solution: {result['solution']}"
+    if "error" in result and result["error"]:
+        line += f", Error: {result['error']}"
+    return line
+
+
+class MessagePacker:
+    def __init__(self, header: str, limit: int = MESSAGE_LIMIT) -> None:
+        """
+        Packs lines into as few messages as possible, each at most `limit` characters long.
+        Lines that are too long on their own are split.
+
+        :param header: The first line of the first message.
+        :param limit: The maximum length of a message.
+        """
+        self.limit = limit
+        self.current = header
+
+    def add(self, line: str) -> list:
+        """
+        This function adds a line and returns the messages it completed.
+        """
+        messages = []
+        while len(line) > self.limit:
+            if self.current:
+                messages.append(self.current)
+                self.current = ""
+            messages.append(line[: self.limit])
+            line = line[self.limit :]
+        if not self.current:
+            self.current = line
+        elif len(self.current) + 1 + len(line) <= self.limit:
+            self.current += "\n" + line
+        else:
+            messages.append(self.current)
+            self.current = line
+        return messages
+
+    def flush(self) -> list:
+        """
+        This function returns the last, partially filled message.
+        """
+        messages = [self.current] if self.current else []
+        self.current = ""
+        return messages
+
+
+class Delivery:
+    def __init__(self, callback=None) -> None:
+        """
+        The messages holding the results of one check of a job. Once every message has been sent or dropped,
+        `callback` is told how many of the results were sent. The messages of a channel are sent in order,
+        so the results counted as sent are always the first ones.
+
+        :param callback: A function called with the number of results sent, the number of results read and
+        whether messages were dropped because the channel is gone or closed to the bot.
+        """
+        self.callback = callback
+        self.messages = 0
+        self.results = 0
+        self.sent = 0
+        self.failed = False
+        self.undeliverable = False
+
+    def add(self, results: int) -> None:
+        self.messages += 1
+        self.results += results
+
+    def done(self, results: int, sent: bool, undeliverable: bool = False) -> None:
+        if sent and not self.failed:
+            self.sent += results
+        else:
+            # The results after a message that was not sent are published again by the next check
+            self.failed = True
+        self.undeliverable = self.undeliverable or undeliverable
+        self.messages -= 1
+        if not self.messages and self.callback is not None:
+            self.callback(self.sent, self.results, self.undeliverable)
+
+
+class ResultDigest:
+    def __init__(self) -> None:
+        """
+        The results collected for a channel in digest mode since its last digest.
+        """
+        self.lines = []
+        self.size = 0
+        self.results = 0
+        self.jobs = set()
+        self.last_job_id = None
+        self.timer = None
+        self.deliveries = []  # (Delivery, number of results) of the checks whose results are in the digest
+
+    def add(self, job_id, line: str) -> None:
+        if job_id != self.last_job_id:
+            # Results of a job usually come in together, so they are listed under one heading
+            self.append(f"Job {job_id}:")
+            self.last_job_id = job_id
+            self.jobs.add(job_id)
+        self.append(line)
+        self.results += 1
+
+    def append(self, line: str) -> None:
+        self.lines.append(line)
+        self.size += len(line) + 1
+
+    def include(self, delivery: Delivery, results: int) -> None:
+        # The check is only delivered once the digest holding its results has been sent
+        delivery.add(results)
+        self.deliveries.append((delivery, results))
+
+    def summary(self) -> str:
+        return f"Results digest: {self.results} results of {len(self.jobs)} jobs"
+
+
+class ResultPublisher:
+    def __init__(
+        self,
+        client: discord.Client,
+        *,
+        file_threshold: int,
+        digest_size: int = 100000,
+        rate: int = 5,
+        per: float = 5.0,
+    ) -> None:
+        """
+        Publishes job results to Discord channels. Every channel has its own queue and sender,
+        so a slow or rate limited channel never holds up the others or the polling loop.
+        Results for channels in digest mode are collected from every job and sent as one message per digest.
+
+        :param client: The client used to find the channels and send the messages.
+        :param file_threshold: The number of characters of results sent as messages, the rest is sent as an attached file.
+        :param digest_size: The number of characters of results after which a digest is sent before its interval is up.
+        :param rate: The number of messages that can be sent to one channel every `per` seconds.
+        :param per: The length of the rate limit window in seconds.
+        """
+        self.client = client
+        self.file_threshold = file_threshold
+        self.digest_size = digest_size
+        self.rate = rate
+        self.per = per
+        self.queues = {}
+        self.senders = {}
+        self.digest_intervals = {}  # Channel ID -> seconds between two digests, for channels in digest mode
+        self.digests = {}  # Channel ID -> ResultDigest collecting the results of the next digest
+
+    async def publish(self, channel_id: int, job_id, results, offset: int = 0, delivered=None) -> int:
+        """
+        This function reads the results of a job and queues them for publishing. Messages are only queued once
+        all results have been read, so that a check failing halfway publishes nothing, and results past
+        `file_threshold` characters are written to a temporary file instead of being kept in memory.
+
+        :param channel_id: The ID of the channel where the results should be published.
+        :param job_id: The ID of the job.
+        :param results: An async iterator of the results of the job.
+        :param offset: The number of results of the job published before these.
+        :param delivered: An optional function called with the number of results sent, the number of results
+        read and whether the channel is gone or closed to the bot, once the messages have been sent or dropped.
+        It is not called when no results were read.
+        :return: The number of results read.
+        """
+        if channel_id in self.digest_intervals:
+            return await self.collect(channel_id, job_id, results, delivered)
+        packer = MessagePacker(f"{'More results' if offset else 'Results'} for job {job_id}:")
+        messages = []  # [content, number of results whose line ends in the message]
+        pending = 0  # Results whose line is not in a completed message yet
+        size = 0
+        count = 0
+        attachment = None
+        try:
+            async for result in results:
+                line = format_result(result)
+                count += 1
+                if attachment is None and size + len(line) > self.file_threshold:
+                    attachment = tempfile.TemporaryFile()
+                    attached = 0
+                if attachment is not None:
+                    attachment.write(line.encode() + b"\n")
+                    attached += 1
+                    continue
+                size += len(line) + 1
+                completed = packer.add(line)
+                if completed:
+                    messages.extend([content, 0] for content in completed)
+                    messages[-1][1] += pending
+                    pending = 0
+                pending += 1
+        except BaseException:
+            if attachment is not None:
+                attachment.close()
+            raise
+        if not count:
+            return 0
+        messages.extend([content, 0] for content in packer.flush())
+        messages[-1][1] += pending
+        delivery = Delivery(delivered)
+        for content, included in messages:
+            delivery.add(included)
+            self.enqueue(channel_id, content, deliveries=[(delivery, included)])
+        if attachment is not None:
+            attachment.seek(0)
+            delivery.add(attached)
+            self.enqueue(
+                channel_id,
+                f"{attached} more results for job {job_id} are attached.",
+                (attachment, f"job-{job_id}-results.txt"),
+                deliveries=[(delivery, attached)],
+            )
+        return count
+
+    async def collect(self, channel_id: int, job_id, results, delivered=None) -> int:
+        """
+        This function adds the results of a job to the next digest of a channel. The digest is sent once the
+        interval of the channel is up, or as soon as it holds `digest_size` characters of results. Like with
+        `publish`, nothing is added unless all results have been read, results past `file_threshold` characters
+        wait in a temporary file meanwhile, and `delivered` is only called once the digests holding the results
+        have been sent or dropped.
+
+        :param channel_id: The ID of the channel in digest mode.
+        :param job_id: The ID of the job.
+        :param results: An async iterator of the results of the job.
+        :param delivered: An optional function called like the one of `publish`.
+        :return: The number of results read.
+        """
+        lines = []
+        size = 0
+        count = 0
+        staged = None
+        try:
+            async for result in results:
+                line = format_result(result)
+                count += 1
+                if staged is None and size + len(line) > self.file_threshold:
+                    staged = tempfile.TemporaryFile()
+                if staged is not None:
+                    # Results may span several lines, so each one is written as a JSON string
+                    staged.write(json.dumps(line).encode() + b"\n")
+                    continue
+                size += len(line) + 1
+                lines.append(line)
+            if staged is not None:
+                staged.seek(0)
+            delivery = Delivery(delivered)
+            included = 0
+            for line in self.staged_lines(lines, staged):
+                digest = self.digests.get(channel_id)
+                if digest is None:
+                    digest = self.digests[channel_id] = ResultDigest()
+                    digest.timer = asyncio.create_task(
+                        self.send_digest_later(channel_id, digest, self.digest_intervals.get(channel_id, 0))
+                    )
+                digest.add(job_id, line)
+                included += 1
+                if digest.size >= self.digest_size:
+                    digest.include(delivery, included)
+                    included = 0
+                    self.send_digest(channel_id)
+            if included:
+                digest.include(delivery, included)
+        finally:
+            if staged is not None:
+                staged.close()
+        DIGEST_RESULTS.inc(count)
+        return count
+
+    @staticmethod
+    def staged_lines(lines: list, staged=None):
+        yield from lines
+        if staged is not None:
+            for line in staged:
+                yield json.loads(line)
+
+    async def send_digest_later(self, channel_id: int, digest: ResultDigest, interval: float) -> None:
+        await asyncio.sleep(interval)
+        if self.digests.get(channel_id) is digest:
+            digest.timer = None  # The digest is sent by its own timer, which must not cancel itself
+            self.send_digest(channel_id)
+
+    def send_digest(self, channel_id: int) -> None:
+        """
+        This function queues the digest of a channel as one message, an embed when it is short enough
+        and an attached file otherwise.
+
+        :param channel_id: The ID of the channel in digest mode.
+        """
+        digest = self.digests.pop(channel_id, None)
+        if digest is None:
+            return
+        if digest.timer is not None:
+            digest.timer.cancel()
+        text = "\n".join(digest.lines)
+        if len(text) <= EMBED_LIMIT:
+            embed = discord.Embed(title="Results digest", description=text)
+            embed.set_footer(text=f"{digest.results} results of {len(digest.jobs)} jobs")
+            self.enqueue(channel_id, None, embed=embed, deliveries=digest.deliveries)
+            return
+        attachment = tempfile.TemporaryFile()
+        attachment.write(text.encode() + b"\n")
+        attachment.seek(0)
+        self.enqueue(
+            channel_id,
+            f"{digest.summary()} are attached.",
+            (attachment, "results-digest.txt"),
+            deliveries=digest.deliveries,
+        )
+
+    def set_digest_intervals(self, digest_intervals: dict) -> None:
+        """
+        This function sets which channels are in digest mode. Digests of channels that left digest mode
+        are sent right away.
+
+        :param digest_intervals: A dictionary mapping channel IDs to the number of seconds between two digests.
+        """
+        self.digest_intervals = digest_intervals
+        for channel_id in [channel_id for channel_id in self.digests if channel_id not in digest_intervals]:
+            self.send_digest(channel_id)
+
+    def enqueue(self, channel_id: int, content: str, attachment=None, embed=None, deliveries=()) -> None:
+        self.queues.setdefault(channel_id, deque()).append((content, attachment, embed, deliveries))
+        if channel_id not in self.senders:
+            self.senders[channel_id] = asyncio.create_task(self.send_queued(channel_id))
+
+    async def send_queued(self, channel_id: int) -> None:
+        queue = self.queues[channel_id]
+        sent_at = deque(maxlen=self.rate)
+        try:
+            # A partial channel sends over REST without fetching the channel first, e.g. in worker.py
+            channel = self.client.get_channel(channel_id) or self.client.get_partial_messageable(channel_id)
+            while queue:
+                content, attachment, embed, deliveries = queue[0]
+                # Stay within the channel's rate limit bucket instead of waiting for a 429
+                if len(sent_at) == self.rate:
+                    wait = sent_at[0] + self.per - time.monotonic()
+                    if wait > 0:
+                        await asyncio.sleep(wait)
+                sent = False
+                try:
+                    with DISCORD_SEND_DURATION.time():
+                        if embed is not None:
+                            await channel.send(content, embed=embed)
+                        elif attachment is None:
+                            await channel.send(content)
+                        else:
+                            file, filename = attachment
+                            await channel.send(content, file=discord.File(file, filename=filename))
+                    sent = True
+                except (discord.NotFound, discord.Forbidden):
+                    raise  # The channel is gone or closed to the bot, so are the next messages
+                except discord.HTTPException as e:
+                    DISCORD_SEND_FAILURES.inc()
+                    logger.error(f"Failed to publish results in channel {channel_id}: {e}")
+                sent_at.append(time.monotonic())
+                queue.popleft()
+                if attachment is not None:
+                    attachment[0].close()
+                self.deliver(deliveries, sent)
+        except (discord.NotFound, discord.Forbidden) as e:
+            logger.error(f"Cannot publish results in channel {channel_id}: {e}")
+            self.drop(queue, undeliverable=True)
+        except discord.HTTPException as e:
+            logger.error(f"Cannot publish results in channel {channel_id}: {e}")
+            self.drop(queue)
+        finally:
+            del self.senders[channel_id]
+            if not queue:
+                del self.queues[channel_id]
+
+    def deliver(self, deliveries, sent: bool, undeliverable: bool = False) -> None:
+        for delivery, results in deliveries:
+            try:
+                delivery.done(results, sent, undeliverable)
+            except Exception:
+                logger.exception("Failed to report the delivery of results")
+
+    def drop(self, queue, undeliverable: bool = False) -> None:
+        DISCORD_SEND_FAILURES.inc(len(queue))
+        while queue:
+            content, attachment, embed, deliveries = queue.popleft()
+            if attachment is not None:
+                attachment[0].close()
+            self.deliver(deliveries, False, undeliverable)
+
+    async def close(self) -> None:
+        """
+        This function stops every sender. Results that have not been sent yet, including those collected
+        for digests, are dropped, and the checks whose messages were queued learn they were not delivered.
+        """
+        for digest in self.digests.values():
+            if digest.timer is not None:
+                digest.timer.cancel()
+            self.deliver(digest.deliveries, False)
+        DISCORD_SEND_FAILURES.inc(len(self.digests))
+        self.digests.clear()
+        senders = list(self.senders.values())
+        for sender in senders:
+            sender.cancel()
+        await asyncio.gather(*senders, return_exceptions=True)
+        for queue in self.queues.values():
+            self.drop(queue)
+        self.queues.clear()
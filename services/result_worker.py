@@ -0,0 +1,272 @@
+"""
+Author Sarthak Vijayvergiya - https://github.com/sarthakvijayvergiya
+Description: A Discord bot that helps in launching jobs, setting API keys, and configuring result channels for the Human Protocol.
+"""
+
+import asyncio
+import logging
+import os
+import socket
+import time
+
+from services.external_api_handler import CircuitOpenError, LauncherUnavailableError
+from services.job_scheduler import JobScheduler
+from services.result_poller import RESULT_POLL_DURATION, RESULT_POLL_JOBS, ResultPoller
+from services.result_publisher import ResultPublisher
+
+# Statuses of a job on the job launcher server after which no more results come in
+FINAL_JOB_STATUSES = frozenset({"COMPLETED", "FAILED", "CANCELED", "CANCELLED"})
+
+
+class ResultWorker:
+    def __init__(self, client, database, external_api_handler, *, logger) -> None:
+        """
+        Checks the results of due jobs and publishes them. It runs inside the bot, or on its own in worker.py,
+        and only needs a client that can send messages over REST.
+
+        :param client: The Discord client used to publish results.
+        :param database: The database holding the job queue.
+        :param external_api_handler: The handler used to talk to the job launcher server.
+        :param logger: The logger.
+        """
+        self.database = database
+        self.external_api_handler = external_api_handler
+        self.logger = logger
+        self.scheduler = JobScheduler(
+            min_interval=int(os.getenv("RESULT_CHECK_MIN_INTERVAL", 15)),
+            max_interval=int(os.getenv("RESULT_CHECK_MAX_INTERVAL", 1800)),
+            factor=float(os.getenv("RESULT_CHECK_BACKOFF_FACTOR", 2)),
+        )
+        self.result_poller = ResultPoller(
+            external_api_handler,
+            database.get_api_key,
+            concurrency=int(os.getenv("RESULT_CHECK_CONCURRENCY", 10)),
+            timeout=float(os.getenv("RESULT_CHECK_TIMEOUT", 30)),
+        )
+        # Processes sharing the job store poll disjoint jobs, each holding a lease on the jobs it checks
+        self.worker_id = os.getenv("WORKER_ID") or f"{socket.gethostname()}-{os.getpid()}"
+        self.lease_duration = int(os.getenv("JOB_LEASE_DURATION", 300))
+        self.claim_limit = int(os.getenv("RESULT_CHECK_BATCH_SIZE", 1000))
+        # A pass may outlast the lease, e.g. with many slow jobs, so leases are renewed until jobs are released
+        self.held = {}  # Database ID -> claimed job
+        self.renewer = None
+        # Jobs with published results are held until their messages are sent, then their cursor is advanced
+        self.delivered = []  # (claimed job, results sent, results read, channel gone) tuples
+        self.result_publisher = ResultPublisher(
+            client,
+            file_threshold=int(os.getenv("RESULT_FILE_THRESHOLD", 6000)),
+            digest_size=int(os.getenv("RESULT_DIGEST_MAX_SIZE", 100000)),
+        )
+
+    async def restore(self) -> int:
+        """
+        This function releases the jobs this worker held before a restart. The other pending jobs are
+        checked when they are due, as their next check time is stored with them.
+
+        :return: The number of jobs released.
+        """
+        released_jobs = await self.database.release_stale_leases(self.worker_id)
+        self.logger.info(f"Released {released_jobs} jobs held by an earlier run of worker {self.worker_id}")
+        return released_jobs
+
+    async def run_pass(self) -> None:
+        """
+        This function checks the results of the jobs that are due and publishes them.
+        """
+        await self.write_deliveries()
+        throttle_remaining = self.scheduler.throttle_remaining()
+        if throttle_remaining > 0:
+            self.logger.info(
+                f"Job launcher server is throttled, skipping result checks for {throttle_remaining:.0f}s"
+            )
+            return
+        if not self.external_api_handler.is_available("result"):
+            self.logger.info(
+                f"Job launcher server is unavailable, skipping result checks for "
+                f"{self.external_api_handler.breakers['result'].remaining():.0f}s"
+            )
+            return
+        started_at = time.perf_counter()
+        now = int(time.time())
+        # Jobs that are never rescheduled, e.g. because the worker died, are claimed again once their lease expires
+        jobs = await self.database.claim_due_jobs(
+            self.worker_id, now, now + self.lease_duration, self.claim_limit
+        )
+        self.hold(jobs)
+        try:
+            finished = await self.check_jobs(jobs, now)
+        except BaseException:
+            # Leases of held jobs are renewed for good, so the jobs of a failed pass are handed back
+            await self.abandon(jobs, now)
+            raise
+        elapsed = time.perf_counter() - started_at
+        RESULT_POLL_DURATION.observe(elapsed)
+        RESULT_POLL_JOBS.labels("finished").inc(len(finished))
+        RESULT_POLL_JOBS.labels("pending").inc(len(jobs) - len(finished))
+        # Most passes find no due jobs, logging them would push everything else out of the log file
+        self.logger.log(
+            logging.INFO if jobs else logging.DEBUG,
+            f"Checked {len(jobs)} jobs in {elapsed:.2f}s, {len(finished)} finished",
+        )
+
+    async def check_jobs(self, jobs, now: int):
+        """
+        This function checks the results of claimed jobs, publishes them, and completes or reschedules the
+        jobs without new results. Jobs with published results stay held until their results are sent.
+
+        :param jobs: The claimed jobs.
+        :param now: The UNIX timestamp of the claim.
+        :return: The completed jobs.
+        """
+        if jobs:
+            # Read every pass, as digest mode may be set by another process sharing the database
+            self.result_publisher.set_digest_intervals(await self.database.get_channel_digests())
+        finished = []
+        schedules = []
+        stalled = []
+        throttled = False
+        for job, published, error in await self.result_poller.poll(
+            jobs, self.publish_job_results
+        ):
+            if isinstance(error, LauncherUnavailableError):
+                if not throttled:
+                    self.scheduler.record_throttle(error.retry_after)
+                    throttled = True
+                # Do not count answers of an unavailable server against the job
+                schedules.append(
+                    (job, now + int(self.scheduler.throttle_remaining()), job.attempts)
+                )
+                continue
+            if isinstance(error, CircuitOpenError):
+                # The circuit opened during the pass, check again once it lets trial calls through
+                delay = max(error.retry_after, self.scheduler.min_interval)
+                schedules.append((job, now + int(delay), job.attempts))
+                continue
+            if published:
+                continue  # The job stays held until its results are sent, see write_deliveries
+            stalled.append(job)
+        # A job without new results may have ended before getting all its submissions
+        if stalled and self.external_api_handler.job_status_path:
+            statuses = await self.result_poller.statuses(stalled)
+        else:
+            statuses = [None] * len(stalled)
+        for job, status in zip(stalled, statuses):
+            if status in FINAL_JOB_STATUSES:
+                finished.append(job)
+                continue
+            delay = self.scheduler.next_check_delay(job.attempts + 1)
+            schedules.append((job, now + int(delay), job.attempts + 1))
+        if jobs and not throttled:
+            self.scheduler.record_success()
+        # Update jobs after the pass so that a single statement updates all of them
+        await self.release(finished, schedules)
+        return finished
+
+    async def abandon(self, jobs, now: int) -> None:
+        """
+        This function reschedules the jobs of a failed pass with a backoff. If that fails too, e.g. because
+        the database is locked, the jobs are still released, so that their lease expires.
+
+        :param jobs: The claimed jobs.
+        :param now: The UNIX timestamp of the claim.
+        """
+        schedules = [
+            (job, now + int(self.scheduler.next_check_delay(job.attempts + 1)), job.attempts + 1) for job in jobs
+        ]
+        try:
+            await self.release([], schedules)
+        except Exception as e:
+            self.logger.error(f"Could not reschedule the {len(jobs)} jobs of a failed pass: {e}")
+
+    async def write_deliveries(self) -> None:
+        """
+        This function advances the cursor of the jobs whose published results were sent, or dropped, since
+        the last pass, and completes, fails or reschedules them, which releases their lease. Jobs whose result
+        channel is gone or closed to the bot fail, as their results could never be sent.
+        """
+        if not self.delivered:
+            return
+        delivered, self.delivered = self.delivered, []
+        now = int(time.time())
+        finished = []
+        failed = []
+        schedules = []
+        for job, sent, read, channel_gone in delivered:
+            job.published += sent
+            if channel_gone:
+                self.logger.warning(
+                    f"Stopped checking job {job.job_id}, its result channel {job.result_channel_id} is gone "
+                    f"or closed to the bot"
+                )
+                failed.append(job)
+            elif sent < read:
+                # Messages were not sent, e.g. Discord had an outage, so the rest is published again after a backoff
+                delay = self.scheduler.next_check_delay(job.attempts + 1)
+                schedules.append((job, now + int(delay), job.attempts + 1))
+            elif job.submissions_required is None or job.published >= job.submissions_required:
+                # Jobs queued before the number of submissions was stored complete with their first results
+                finished.append(job)
+            else:
+                # The job is still getting submissions, so check it again as soon as a new job
+                schedules.append((job, now + int(self.scheduler.next_check_delay(0)), 0))
+        await self.release(finished, schedules, failed)
+        RESULT_POLL_JOBS.labels("finished").inc(len(finished))
+        RESULT_POLL_JOBS.labels("failed").inc(len(failed))
+
+    def hold(self, jobs) -> None:
+        for job in jobs:
+            self.held[job.id] = job
+        if self.held and self.renewer is None:
+            self.renewer = asyncio.create_task(self.renew_leases())
+
+    async def release(self, finished, schedules, failed=()) -> None:
+        """
+        This function completes, reschedules or fails claimed jobs, which releases their lease.
+
+        :param finished: The jobs to complete.
+        :param schedules: A list of (claimed job, next check UNIX timestamp, attempts) tuples.
+        :param failed: The jobs to fail.
+        """
+        try:
+            await self.database.complete_jobs(finished)
+            await self.database.reschedule_jobs(schedules)
+            await self.database.fail_jobs(failed)
+        finally:
+            # Jobs that could not be updated are claimed again once their lease expires
+            for job in [*finished, *failed]:
+                self.held.pop(job.id, None)
+            for job, _, _ in schedules:
+                self.held.pop(job.id, None)
+
+    async def renew_leases(self) -> None:
+        try:
+            while self.held:
+                await asyncio.sleep(self.lease_duration / 3)
+                jobs = list(self.held.values())
+                try:
+                    renewed = await self.database.renew_leases(jobs, int(time.time()) + self.lease_duration)
+                except Exception as e:
+                    self.logger.error(f"Could not renew the leases of {len(jobs)} jobs: {e}")
+                    continue
+                if renewed < len(jobs):
+                    self.logger.warning(f"Lost the leases of {len(jobs) - renewed} jobs to other workers")
+        finally:
+            self.renewer = None
+
+    async def publish_job_results(self, job, results):
+        # Results are queued while they are downloaded and sent in the background,
+        # so that a slow channel does not hold up polling
+        return await self.result_publisher.publish(
+            job.result_channel_id,
+            job.job_id,
+            results,
+            job.published,
+            delivered=lambda sent, read, channel_gone: self.delivered.append((job, sent, read, channel_gone)),
+        )
+
+    async def close(self) -> None:
+        if self.renewer is not None:
+            self.renewer.cancel()
+        await self.result_publisher.close()
+        # Results dropped by the publisher are published again by the next check of their job
+        await self.write_deliveries()
@@ -0,0 +1,58 @@
+"""
+Author Sarthak Vijayvergiya - https://github.com/sarthakvijayvergiya
+Description: Fixtures shared by the tests. Tests written as coroutine functions run in the event loop of the
+`runner` fixture, which the fixtures opening databases share.
+"""
+
+import asyncio
+import inspect
+
+import aiosqlite
+import pytest
+
+from database import DatabaseManager
+
+
+@pytest.fixture(autouse=True)
+def runner():
+    with asyncio.Runner() as runner:
+        yield runner
+
+
+@pytest.hookimpl(tryfirst=True)
+def pytest_pyfunc_call(pyfuncitem):
+    if not inspect.iscoroutinefunction(pyfuncitem.obj):
+        return None
+    parameters = inspect.signature(pyfuncitem.obj).parameters
+    arguments = {name: pyfuncitem.funcargs[name] for name in parameters}
+    pyfuncitem.funcargs["runner"].run(pyfuncitem.obj(**arguments))
+    return True
+
+
+@pytest.fixture
+def open_manager(runner):
+    """
+    Opens database managers that are closed after the test. Writes are committed right away unless the test
+    sets a write window.
+    """
+    managers = []
+
+    async def open_manager(path=":memory:", *, initialize: bool = True, **options) -> DatabaseManager:
+        options.setdefault("write_window", 0)
+        manager = DatabaseManager(connection=await aiosqlite.connect(path), **options)
+        managers.append(manager)
+        if initialize:
+            await manager.initialize()
+        return manager
+
+    yield open_manager
+    for manager in reversed(managers):
+        runner.run(manager.close())
+
+
+@pytest.fixture
+def database(runner, open_manager) -> DatabaseManager:
+    """
+    An initialized database in memory.
+    """
+    return runner.run(open_manager())
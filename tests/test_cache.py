@@ -0,0 +1,47 @@
+"""
+Author Sarthak Vijayvergiya - https://github.com/sarthakvijayvergiya
+Description: Tests of the cache of user settings and API keys.
+"""
+
+import time
+
+from database.cache import MISSING, TTLCache
+
+
+def test_least_recently_used_entry_is_evicted():
+    cache = TTLCache(maxsize=2, ttl=60)
+    cache.set("a", 1)
+    cache.set("b", 2)
+    # Reading "a" makes "b" the least recently used entry
+    assert cache.get("a") == 1
+    cache.set("c", 3)
+    assert cache.get("b") is MISSING and cache.get("a") == 1 and cache.get("c") == 3
+    # Setting an existing key does not evict anything
+    cache.set("a", 4)
+    assert cache.get("a") == 4 and cache.stats()["evictions"] == 1
+
+
+def test_entries_expire(monkeypatch):
+    now = time.monotonic()
+    monkeypatch.setattr(time, "monotonic", lambda: now)
+    cache = TTLCache(maxsize=10, ttl=60)
+    cache.set("a", 1)
+    now += 60
+    assert cache.get("a") == 1
+    now += 1
+    assert cache.get("a", "expired") == "expired"
+    assert cache.stats()["size"] == 0
+
+
+def test_counters():
+    cache = TTLCache(maxsize=1, ttl=60)
+    assert cache.get("a") is MISSING
+    cache.set("a", None)
+    # A cached None is a hit, only a missing key is a miss
+    assert cache.get("a", "missing") is None
+    cache.set("b", 2)
+    cache.invalidate("b")
+    assert cache.get("b") is MISSING
+    cache.set("c", 3)
+    cache.clear()
+    assert cache.stats() == {"size": 0, "hits": 1, "misses": 2, "evictions": 1}
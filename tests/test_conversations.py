@@ -0,0 +1,58 @@
+"""
+Author Sarthak Vijayvergiya - https://github.com/sarthakvijayvergiya
+Description: Tests of the conversation router and its timer wheel.
+"""
+
+import asyncio
+import types
+
+import pytest
+
+from helpers.conversations import ConversationRouter
+
+
+def message(channel_id: int, author_id: int):
+    return types.SimpleNamespace(channel=types.SimpleNamespace(id=channel_id), author=types.SimpleNamespace(id=author_id))
+
+
+async def test_reply_is_routed_to_its_prompt():
+    router = ConversationRouter(tick=0.01, slots=4)
+    prompt = asyncio.create_task(router.wait_for_reply(1, 2, timeout=1))
+    await asyncio.sleep(0)
+    assert not router.dispatch(message(1, 3))  # Another author
+    assert not router.dispatch(message(2, 2))  # Another channel
+    reply = message(1, 2)
+    assert router.dispatch(reply)
+    assert await prompt is reply
+    assert not router.dispatch(message(1, 2))  # The prompt was answered
+    assert not router.pending
+
+
+async def test_newer_prompt_replaces_older_one():
+    router = ConversationRouter(tick=0.01, slots=4)
+    first = asyncio.create_task(router.wait_for_reply(1, 2, timeout=1))
+    await asyncio.sleep(0)
+    second = asyncio.create_task(router.wait_for_reply(1, 2, timeout=1))
+    await asyncio.sleep(0)
+    assert await first is None
+    reply = message(1, 2)
+    assert router.dispatch(reply)
+    assert await second is reply
+
+
+async def test_timeouts_longer_than_the_wheel():
+    router = ConversationRouter(tick=0.01, slots=4)
+    loop = asyncio.get_running_loop()
+    started_at = loop.time()
+    short = asyncio.create_task(router.wait_for_reply(1, 1, timeout=0.02))
+    # 10 ticks go around the 4 slots of the wheel twice
+    long = asyncio.create_task(router.wait_for_reply(1, 2, timeout=0.1))
+    with pytest.raises(asyncio.TimeoutError):
+        await short
+    assert not long.done()
+    with pytest.raises(asyncio.TimeoutError):
+        await long
+    assert loop.time() - started_at >= 0.1
+    await asyncio.sleep(0.02)
+    assert router.task is None and not router.pending
+    assert all(not slot for slot in router.wheel)
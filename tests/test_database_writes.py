@@ -0,0 +1,67 @@
+"""
+Author Sarthak Vijayvergiya - https://github.com/sarthakvijayvergiya
+Description: Tests of the batching of database writes into one transaction.
+"""
+
+import asyncio
+import sqlite3
+
+
+INSERT_USER = "INSERT INTO user_settings (user_id) VALUES (?)"
+
+
+async def stored_users(manager) -> list:
+    async with manager.connection.execute("SELECT user_id FROM user_settings ORDER BY user_id") as cursor:
+        return [user_id async for (user_id,) in cursor]
+
+
+async def test_writes_resolve_once_committed(tmp_path, open_manager):
+    manager = await open_manager(tmp_path / "bot.db", write_window=0.05)
+    reader = await open_manager(tmp_path / "bot.db")
+    events = []
+    commit = manager.connection.commit
+
+    async def recorded_commit():
+        await commit()
+        # Another connection only sees the rows once they are committed
+        events.append(("commit", await stored_users(reader)))
+
+    manager.connection.commit = recorded_commit
+    writes = [asyncio.ensure_future(manager.write(INSERT_USER, (str(user_id),))) for user_id in range(3)]
+    for write in writes:
+        write.add_done_callback(lambda _: events.append("resolved"))
+    assert await asyncio.gather(*writes) == [1, 1, 1]
+    assert events == [("commit", ["0", "1", "2"]), "resolved", "resolved", "resolved"]
+
+
+async def test_failed_statement_does_not_fail_the_batch(tmp_path, open_manager):
+    manager = await open_manager(tmp_path / "bot.db", write_window=0.05)
+    reader = await open_manager(tmp_path / "bot.db")
+    results = await asyncio.gather(
+        manager.write(INSERT_USER, ("1",)),
+        # The user already exists when this statement runs
+        manager.write(INSERT_USER, ("1",)),
+        manager.write(INSERT_USER, [("2",), ("3",)], many=True),
+        return_exceptions=True,
+    )
+    assert results[0] == 1 and results[2] == 2
+    assert isinstance(results[1], sqlite3.IntegrityError)
+    assert await stored_users(reader) == ["1", "2", "3"]
+
+
+async def test_failed_commit_fails_every_write_of_the_batch(open_manager):
+    manager = await open_manager(write_window=0.05)
+
+    async def failing_commit():
+        raise sqlite3.OperationalError("database is locked")
+
+    commit = manager.connection.commit
+    manager.connection.commit = failing_commit
+    results = await asyncio.gather(
+        *(manager.write(INSERT_USER, (str(user_id),)) for user_id in range(3)), return_exceptions=True
+    )
+    assert [str(result) for result in results] == ["database is locked"] * 3
+    manager.connection.commit = commit
+    # The batch was rolled back, so the next one starts from a clean transaction
+    assert await manager.write(INSERT_USER, ("3",)) == 1
+    assert await stored_users(manager) == ["3"]
@@ -0,0 +1,61 @@
+"""
+Author Sarthak Vijayvergiya - https://github.com/sarthakvijayvergiya
+Description: Tests of the answers of the job launcher server to job launches.
+"""
+
+import asyncio
+import socket
+
+import aiohttp
+import pytest
+from aiohttp import web
+
+from services.external_api_handler import ExternalAPIHandler, LaunchOutcomeUnknownError
+
+
+async def launch(monkeypatch, base_url):
+    monkeypatch.setenv("API_BASE_URL", base_url)
+    async with aiohttp.ClientSession(timeout=aiohttp.ClientTimeout(total=0.5)) as session:
+        return await ExternalAPIHandler(session).launch_job("key", "Title", 1, "Description", 1, 137)
+
+
+async def serve(create_job):
+    app = web.Application()
+    app.router.add_post("/job/fortune", create_job)
+    server = web.AppRunner(app)
+    await server.setup()
+    await web.TCPSite(server, "127.0.0.1", 0).start()
+    return server, f"http://127.0.0.1:{server.addresses[0][1]}"
+
+
+@pytest.mark.parametrize("status, answer", [(201, {"id": "job"}), (400, None), (500, None)])
+async def test_answered_launches(monkeypatch, status, answer):
+    async def create_job(request):
+        return web.json_response(answer, status=status)
+
+    server, base_url = await serve(create_job)
+    try:
+        assert await launch(monkeypatch, base_url) == answer
+    finally:
+        await server.cleanup()
+
+
+async def test_launch_to_a_closed_port_certainly_failed(monkeypatch):
+    with socket.socket() as unused:
+        unused.bind(("127.0.0.1", 0))
+        port = unused.getsockname()[1]
+    assert await launch(monkeypatch, f"http://127.0.0.1:{port}") is None
+
+
+async def test_launch_without_answer_has_an_unknown_outcome(monkeypatch):
+    async def create_job(request):
+        # The job is created, but the answer comes after the client gave up
+        await asyncio.sleep(2)
+        return web.json_response({"id": "job"}, status=201)
+
+    server, base_url = await serve(create_job)
+    try:
+        with pytest.raises(LaunchOutcomeUnknownError):
+            await launch(monkeypatch, base_url)
+    finally:
+        await server.cleanup()
@@ -0,0 +1,92 @@
+"""
+Author Sarthak Vijayvergiya - https://github.com/sarthakvijayvergiya
+Description: Tests of the deduplication of job launches and of the checks of result channels.
+"""
+
+import logging
+from types import SimpleNamespace
+
+import discord
+import pytest
+
+from cogs.job_launcher import JobLauncher
+from services.external_api_handler import LaunchOutcomeUnknownError
+
+
+class FakeLauncher:
+    def __init__(self, response, idempotency_keys: bool = False) -> None:
+        self.response = response
+        self.idempotency_keys = idempotency_keys
+        self.keys = []
+
+    async def launch_job(self, *parameters, idempotency_key):
+        self.keys.append(idempotency_key)
+        if isinstance(self.response, Exception):
+            raise self.response
+        return self.response
+
+
+async def run_launches(database, response, count=2, **options):
+    cog = JobLauncher(SimpleNamespace(database=database, logger=logging.getLogger("tests")))
+    # The cached services are replaced before their first use
+    cog.__dict__["external_api_handler"] = launcher = FakeLauncher(response, **options)
+    cog.__dict__["result_worker"] = SimpleNamespace(scheduler=SimpleNamespace(next_check_delay=lambda _: 0))
+    outcomes = [await cog.submit_launch(1, "key", 2, "Title", 3, "Description", "1", 137) for _ in range(count)]
+    return outcomes, launcher.keys
+
+
+async def test_launch_is_sent_once(database):
+    (first, second), keys = await run_launches(database, {"id": "job"})
+    assert len(keys) == 1
+    assert (first.job_id, first.launched, first.already_launched) == ("job", True, False)
+    assert (second.job_id, second.launched, second.already_launched) == ("job", True, True)
+
+
+async def test_launch_without_job_id_is_not_sent_again(database):
+    (first, second), keys = await run_launches(database, {"status": "created"})
+    assert len(keys) == 1
+    assert (first.job_id, first.launched, first.already_launched) == (None, True, False)
+    assert (second.job_id, second.launched, second.already_launched) == (None, True, True)
+
+
+async def test_failed_launch_is_retried(database):
+    (first, second), keys = await run_launches(database, None)
+    assert len(keys) == 2
+    assert not first.launched and not second.launched
+    assert not first.unknown and not second.unknown
+
+
+async def test_launch_without_answer_is_not_sent_again(database):
+    (first, second), keys = await run_launches(database, LaunchOutcomeUnknownError("Timed out"))
+    assert len(keys) == 1
+    assert first.unknown and second.unknown and not second.launched
+
+
+async def test_launch_without_answer_is_resent_with_its_idempotency_key(database):
+    outcomes, keys = await run_launches(
+        database, LaunchOutcomeUnknownError("Timed out"), count=3, idempotency_keys=True
+    )
+    assert len(keys) == 3 and len(set(keys)) == 1
+    assert all(outcome.unknown for outcome in outcomes)
+
+
+def direct_message_channel(recipient_id: int) -> discord.DMChannel:
+    channel = discord.DMChannel.__new__(discord.DMChannel)
+    channel.recipients = [SimpleNamespace(id=recipient_id)]
+    return channel
+
+
+@pytest.mark.parametrize("cached", [False, True])
+async def test_only_the_recipient_manages_a_direct_message_channel(cached):
+    channels = {1: direct_message_channel(1), 2: direct_message_channel(2)}
+
+    async def fetch_channel(channel_id):
+        return channels[channel_id]
+
+    bot = SimpleNamespace(
+        get_channel=lambda channel_id: channels[channel_id] if cached else None, fetch_channel=fetch_channel
+    )
+    cog = JobLauncher(bot)
+    user = SimpleNamespace(id=1)
+    assert await cog.can_manage_channel(user, 1)
+    assert not await cog.can_manage_channel(user, 2)
@@ -0,0 +1,48 @@
+"""
+Author Sarthak Vijayvergiya - https://github.com/sarthakvijayvergiya
+Description: Tests of the delays computed by the job scheduler.
+"""
+
+import pytest
+
+from services.job_scheduler import JobScheduler
+
+
+def make_scheduler(**options) -> JobScheduler:
+    return JobScheduler(min_interval=15, max_interval=1800, **options)
+
+
+@pytest.mark.parametrize("attempts, expected", [(0, 15), (1, 30), (3, 120), (7, 1800), (1100, 1800), (10**6, 1800)])
+def test_delay_grows_up_to_the_maximum(attempts, expected):
+    assert make_scheduler(jitter=0).next_check_delay(attempts) == expected
+
+
+def test_delay_without_minimum_does_not_grow():
+    assert JobScheduler(min_interval=0, max_interval=1800).next_check_delay(2000) == 0
+
+
+def test_jitter_shortens_the_delay_by_at_most_its_fraction():
+    scheduler = make_scheduler(jitter=0.2)
+    delays = [scheduler.next_check_delay(2) for _ in range(1000)]
+    assert all(48 <= delay <= 60 for delay in delays)
+    assert len(set(delays)) > 1
+    assert all(1440 <= scheduler.next_check_delay(5000) <= 1800 for _ in range(100))
+
+
+def test_throttle_grows_up_to_the_maximum_and_resets():
+    scheduler = make_scheduler(jitter=0, throttle_min_interval=30, throttle_max_interval=900)
+    scheduler.record_throttle()
+    assert 29 < scheduler.throttle_remaining() <= 30
+    for _ in range(2000):
+        scheduler.record_throttle()
+    assert 899 < scheduler.throttle_remaining() <= 900
+    scheduler.throttled_until = 0
+    scheduler.record_success()
+    scheduler.record_throttle()
+    assert 29 < scheduler.throttle_remaining() <= 30
+
+
+def test_throttle_honours_the_delay_requested_by_the_server():
+    scheduler = make_scheduler(jitter=0)
+    scheduler.record_throttle(retry_after=120)
+    assert 119 < scheduler.throttle_remaining() <= 120
@@ -0,0 +1,65 @@
+"""
+Author Sarthak Vijayvergiya - https://github.com/sarthakvijayvergiya
+Description: Tests of the streaming JSON array parser used to read job results.
+"""
+
+import json
+import random
+
+import pytest
+
+from services.external_api_handler import iter_json_array
+
+
+class ChunkedStream:
+    # Answers every read with the next chunk, like the content of an aiohttp response
+    def __init__(self, data: bytes, sizes) -> None:
+        self.data = data
+        self.sizes = iter(sizes)
+
+    async def read(self, chunk_size: int) -> bytes:
+        size = next(self.sizes, len(self.data)) or 1
+        chunk, self.data = self.data[:size], self.data[size:]
+        return chunk
+
+
+async def parse(text: str, sizes) -> list:
+    return [item async for item in iter_json_array(ChunkedStream(text.encode(), sizes))]
+
+
+@pytest.mark.parametrize(
+    "text, size",
+    [
+        ("[1.25]", 1),
+        ("[-4.5e3]", 3),
+        ("[12, 3.0E+2, -0.5]", 2),
+        ("[true, false, null]", 1),
+        ('[{"a": [1, 2]}, "x,]"]', 1),
+        ("  [ ]  ", 1),
+        ("[]", 64),
+    ],
+)
+async def test_items_split_across_chunks(text, size):
+    assert await parse(text, iter(lambda: size, None)) == json.loads(text)
+
+
+async def test_random_chunk_boundaries():
+    generator = random.Random(1234)
+    results = [
+        {
+            "workerAddress": f"0x{index:040x}",
+            "solution": "é" * generator.randint(0, 5) + str(generator.random() * 10 ** generator.randint(-5, 5)),
+            "score": generator.choice([generator.randint(-10 ** 6, 10 ** 6), generator.uniform(-1e3, 1e3), None]),
+        }
+        for index in range(50)
+    ]
+    text = json.dumps(results, indent=generator.choice([None, 2]))
+    for _ in range(200):
+        sizes = [generator.randint(1, 12) for _ in range(len(text.encode()))]
+        assert await parse(text, sizes) == results
+
+
+@pytest.mark.parametrize("text", ['{"a": 1}', "[1, 2", "[1 2]", "[1.]", '["unterminated]'])
+async def test_invalid_arrays(text):
+    with pytest.raises(ValueError):
+        await parse(text, iter(lambda: 1, None))
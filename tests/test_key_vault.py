@@ -0,0 +1,50 @@
+"""
+Author Sarthak Vijayvergiya - https://github.com/sarthakvijayvergiya
+Description: Tests of the encryption of API keys at rest.
+"""
+
+import pytest
+
+from database.key_vault import KeyVault, KeyVaultError
+
+
+def test_placeholder_secret_is_refused():
+    with pytest.raises(KeyVaultError):
+        KeyVault("YOUR_VAULT_SECRET_HERE")
+    with pytest.raises(KeyVaultError):
+        KeyVault("")
+
+
+def test_key_is_bound_to_its_user():
+    vault = KeyVault("secret")
+    token = vault.encrypt(1, "api key")
+    assert token != "api key" and vault.decrypt(1, token) == "api key"
+    with pytest.raises(KeyVaultError):
+        KeyVault("secret").decrypt(2, token)
+    with pytest.raises(KeyVaultError):
+        KeyVault("another secret").decrypt(1, token)
+
+
+async def test_stored_keys_are_encrypted_once(database):
+    vault = KeyVault("secret")
+    # Stored before the vault existed, one of them looking like an encrypted key
+    await database.add_api_key(1, "plain key")
+    await database.add_api_key(2, "v1:not:encrypted")
+    # Encrypted before encrypted keys were marked
+    await database.connection.execute(
+        "INSERT INTO user_settings(user_id, api_key) VALUES (3, ?)", (vault.encrypt(3, "old key"),)
+    )
+    await database.connection.commit()
+    database.vault = vault
+    assert await database.encrypt_api_keys() == 3
+    assert await database.encrypt_api_keys() == 0
+    async with database.connection.execute(
+        "SELECT user_id, api_key FROM user_settings WHERE api_key_encrypted = 1"
+    ) as cursor:
+        stored = dict(await cursor.fetchall())
+    assert all(vault.is_encrypted(token) for token in stored.values()) and len(stored) == 3
+    for user_id, api_key in [(1, "plain key"), (2, "v1:not:encrypted"), (3, "old key")]:
+        database.invalidate_user_settings(user_id)
+        assert (await database.get_user_settings(user_id))[0] == api_key
+    await database.add_api_key(2, "v1:new")
+    assert await database.get_api_key(2) == "v1:new"
@@ -0,0 +1,41 @@
+"""
+Author Sarthak Vijayvergiya - https://github.com/sarthakvijayvergiya
+Description: Tests of the database migrations.
+"""
+
+import os
+
+import pytest
+
+import database
+
+
+async def user_version(manager) -> int:
+    async with manager.connection.execute("PRAGMA user_version") as cursor:
+        return (await cursor.fetchone())[0]
+
+
+async def test_every_migration_runs_once(open_manager):
+    migrations = [file for file in os.listdir(database.MIGRATIONS_PATH) if file.endswith(".sql")]
+    latest = max(int(file.split("_", 1)[0]) for file in migrations)
+    manager = await open_manager(initialize=False)
+    assert await manager.initialize() == len(migrations)
+    assert await user_version(manager) == latest
+    assert await manager.migrate() == 0
+    async with manager.connection.execute("PRAGMA table_info(jobs)") as cursor:
+        columns = {row[1] async for row in cursor}
+    assert {"claimed_by", "lease_expires_at", "published_count", "submissions_required"} <= columns
+    assert "api_key" not in columns
+
+
+async def test_failed_migration_leaves_no_trace(tmp_path, monkeypatch, open_manager):
+    (tmp_path / "0001_good.sql").write_text("CREATE TABLE `first` (`id` INTEGER);")
+    (tmp_path / "0002_broken.sql").write_text("CREATE TABLE `second` (`id` INTEGER);\nNOT SQL;")
+    monkeypatch.setattr(database, "MIGRATIONS_PATH", str(tmp_path))
+    manager = await open_manager(initialize=False)
+    with pytest.raises(Exception):
+        await manager.migrate()
+    assert await user_version(manager) == 1
+    async with manager.connection.execute("SELECT name FROM sqlite_master WHERE type = 'table'") as cursor:
+        tables = {row[0] async for row in cursor}
+    assert "first" in tables and "second" not in tables
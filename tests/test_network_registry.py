@@ -0,0 +1,77 @@
+"""
+Author Sarthak Vijayvergiya - https://github.com/sarthakvijayvergiya
+Description: Tests of the validation of job launches and of the fund amount sent to the job launcher server.
+"""
+
+import json
+from decimal import Decimal
+
+import aiohttp
+import pytest
+from aiohttp import web
+
+from services.external_api_handler import ExternalAPIHandler, dumps_json
+from services.network_registry import LaunchValidationError, Network
+
+
+@pytest.mark.parametrize(
+    "typed, exact",
+    [
+        ("1234567.000000000001", "1234567.000000000001"),
+        ("0.123456789012345678", "0.123456789012345678"),
+        ("100", "100"),
+        (" 1.50 ", "1.5"),
+    ],
+)
+def test_fund_amount_is_kept_exact(typed, exact):
+    submissions, fund = Network("Polygon", 137).validate_launch("3", typed)
+    assert submissions == 3
+    assert fund == Decimal(exact) and str(fund) == exact
+
+
+@pytest.mark.parametrize("submissions, fund", [("0", "1"), ("x", "1"), ("1", "-1"), ("1", "nan"), ("1", "0.1234567")])
+def test_invalid_launches(submissions, fund):
+    with pytest.raises(LaunchValidationError):
+        Network("Polygon", 137, decimals=6).validate_launch(submissions, fund)
+
+
+def test_decimals_are_written_as_exact_json_numbers():
+    data = {
+        "fundAmount": Decimal("0.123456789012345678"),
+        "amounts": [Decimal("1234567.000000000001"), Decimal("1E+3"), 2.5],
+        "requesterTitle": 'A "title" with a Decimal("1")',
+    }
+    text = dumps_json(data)
+    assert '"fundAmount": 0.123456789012345678' in text and "1234567.000000000001, 1000, 2.5" in text
+    amounts = [Decimal("1234567.000000000001"), 1000, Decimal("2.5")]
+    assert json.loads(text, parse_float=Decimal) == {**data, "amounts": amounts}
+    assert dumps_json({"a": [1, "x"]}) == json.dumps({"a": [1, "x"]})
+
+
+@pytest.mark.parametrize("value", [Decimal("nan"), Decimal("inf"), object()])
+def test_values_without_json_number_are_refused(value):
+    with pytest.raises((TypeError, ValueError)):
+        dumps_json({"fundAmount": value})
+
+
+async def test_launch_sends_the_exact_fund_amount(monkeypatch):
+    bodies = []
+
+    async def create_job(request):
+        bodies.append(await request.text())
+        return web.json_response(1, status=201)
+
+    app = web.Application()
+    app.router.add_post("/job/fortune", create_job)
+    server = web.AppRunner(app)
+    await server.setup()
+    await web.TCPSite(server, "127.0.0.1", 0).start()
+    monkeypatch.setenv("API_BASE_URL", f"http://127.0.0.1:{server.addresses[0][1]}")
+    _, fund = Network("Polygon", 137).validate_launch("1", "0.123456789012345678")
+    try:
+        async with aiohttp.ClientSession() as session:
+            assert await ExternalAPIHandler(session).launch_job("key", "Title", 1, "Description", fund, 137) == 1
+    finally:
+        await server.cleanup()
+    assert '"fundAmount": 0.123456789012345678,' in bodies[0]
+    assert json.loads(bodies[0], parse_float=Decimal)["fundAmount"] == Decimal("0.123456789012345678")
@@ -0,0 +1,147 @@
+"""
+Author Sarthak Vijayvergiya - https://github.com/sarthakvijayvergiya
+Description: Tests of the publishing of job results to Discord channels.
+"""
+
+import asyncio
+import tempfile
+import types
+
+import discord
+import pytest
+
+from services.external_api_handler import JobResultError
+from services import result_publisher
+from services.result_publisher import ResultPublisher
+
+
+class StubChannel:
+    def __init__(self, fail_at: int = None) -> None:
+        self.sent = []
+        self.fail_at = fail_at
+
+    async def send(self, content=None, **kwargs) -> None:
+        if len(self.sent) == self.fail_at:
+            self.fail_at = None
+            raise discord.HTTPException(types.SimpleNamespace(status=500, reason="Server Error"), "")
+        self.sent.append((content, kwargs))
+
+
+class StubClient:
+    def __init__(self) -> None:
+        self.channels = {}
+
+    def get_channel(self, channel_id: int):
+        return self.channels.setdefault(channel_id, StubChannel())
+
+
+def results(count: int, fail_after: int = None):
+    async def iterate():
+        for index in range(count):
+            if index == fail_after:
+                # Like a response body that stalls and times out halfway
+                raise JobResultError("Timed out after 1s")
+            yield {"workerAddress": f"0x{index:040x}", "solution": "x" * 100}
+
+    return iterate()
+
+
+@pytest.mark.parametrize("digest", [False, True])
+async def test_failed_check_publishes_nothing(digest):
+    client = StubClient()
+    publisher = ResultPublisher(client, file_threshold=100000, digest_size=1000)
+    if digest:
+        publisher.set_digest_intervals({1: 0})
+    with pytest.raises(JobResultError):
+        # Enough results to fill several messages, or digests, before the failure
+        await publisher.publish(1, "job", results(60, fail_after=30))
+    await asyncio.sleep(0.01)
+    assert not publisher.queues and not publisher.digests
+    assert client.get_channel(1).sent == []
+    await publisher.close()
+
+
+async def test_results_are_published_in_order():
+    client = StubClient()
+    publisher = ResultPublisher(client, file_threshold=100000, rate=100)
+    assert await publisher.publish(1, "job", results(60)) == 60
+    while publisher.senders:
+        await asyncio.sleep(0.01)
+    sent = "\n".join(content for content, _ in client.get_channel(1).sent)
+    assert sent.startswith("Results for job job:")
+    assert sent.count("Worker Address") == 60
+    assert all(len(content) <= 2000 for content, _ in client.get_channel(1).sent)
+    await publisher.close()
+
+
+async def test_delivery_counts_the_results_sent_before_a_failure():
+    client = StubClient()
+    client.channels[1] = StubChannel(fail_at=1)
+    publisher = ResultPublisher(client, file_threshold=100000, rate=100)
+    delivered = []
+    await publisher.publish(1, "job", results(60), delivered=lambda *counts: delivered.append(counts))
+    while publisher.senders:
+        await asyncio.sleep(0.01)
+    first_message = client.get_channel(1).sent[0][0]
+    assert delivered == [(first_message.count("Worker Address"), 60, False)]
+    assert 0 < delivered[0][0] < 60
+    await publisher.close()
+
+
+async def test_dropped_results_are_not_delivered():
+    client = StubClient()
+    # Only the first message is sent before the rate limit holds up the others
+    publisher = ResultPublisher(client, file_threshold=100000, rate=1, per=60)
+    delivered = []
+    await publisher.publish(1, "job", results(60), delivered=lambda *counts: delivered.append(counts))
+    await asyncio.sleep(0.01)
+    await publisher.close()
+    assert delivered == [(client.get_channel(1).sent[0][0].count("Worker Address"), 60, False)]
+
+
+@pytest.mark.parametrize("sent", [False, True])
+async def test_digest_is_delivered_once_sent(sent):
+    client = StubClient()
+    # The results fill one digest that is sent right away, the rest waits for the interval
+    publisher = ResultPublisher(client, file_threshold=100000, digest_size=3000, rate=100)
+    publisher.set_digest_intervals({1: 60})
+    delivered = []
+    await publisher.publish(1, "job", results(30), delivered=lambda *counts: delivered.append(counts))
+    while publisher.senders:
+        await asyncio.sleep(0.01)
+    assert len(client.get_channel(1).sent) == 1 and publisher.digests
+    assert delivered == []
+    if sent:
+        # Leaving digest mode sends the pending digest
+        publisher.set_digest_intervals({})
+        while publisher.senders:
+            await asyncio.sleep(0.01)
+    await publisher.close()
+    first_digest = client.get_channel(1).sent[0][1]["embed"].description
+    assert delivered == [(30 if sent else first_digest.count("Worker Address"), 30, False)]
+
+
+@pytest.mark.parametrize("fail_after", [None, 50])
+async def test_digest_results_past_the_file_threshold_are_staged(monkeypatch, fail_after):
+    staged = []
+    create = tempfile.TemporaryFile
+
+    def temporary_file():
+        staged.append(create())
+        return staged[-1]
+
+    monkeypatch.setattr(result_publisher.tempfile, "TemporaryFile", temporary_file)
+    client = StubClient()
+    publisher = ResultPublisher(client, file_threshold=1000, digest_size=100000, rate=100)
+    publisher.set_digest_intervals({1: 60})
+    if fail_after is not None:
+        with pytest.raises(JobResultError):
+            await publisher.publish(1, "job", results(60, fail_after=fail_after))
+        assert not publisher.digests
+    else:
+        assert await publisher.publish(1, "job", results(60)) == 60
+        digest = publisher.digests[1]
+        assert digest.results == 60
+        assert digest.lines[1:] == [f"Worker Address: 0x{index:040x}, Solution: {'x' * 100}" for index in range(60)]
+    assert len(staged) == 1 and staged[0].closed
+    await publisher.close()
@@ -0,0 +1,151 @@
+"""
+Author Sarthak Vijayvergiya - https://github.com/sarthakvijayvergiya
+Description: Tests of the result worker and the leases it holds on the job queue.
+"""
+
+import asyncio
+import logging
+import time
+import types
+
+import discord
+import pytest
+
+from services.result_worker import ResultWorker
+
+
+class StubHandler:
+    job_status_path = None
+
+    def is_available(self, endpoint: str) -> bool:
+        return True
+
+
+class StubChannel:
+    def __init__(self, error: Exception = None) -> None:
+        self.error = error
+        self.sent = []
+
+    async def send(self, content=None, **kwargs) -> None:
+        if self.error is not None:
+            raise self.error
+        self.sent.append(content)
+
+
+@pytest.fixture
+def make_worker(runner, open_manager, monkeypatch):
+    """
+    Creates result workers with a lease of 3 seconds, closed after the test before their databases.
+    """
+    workers = []
+
+    def make_worker(manager, worker_id: str, client=None) -> ResultWorker:
+        monkeypatch.setenv("WORKER_ID", worker_id)
+        monkeypatch.setenv("JOB_LEASE_DURATION", "3")
+        worker = ResultWorker(
+            client or types.SimpleNamespace(), manager, StubHandler(), logger=logging.getLogger("test")
+        )
+        workers.append(worker)
+        return worker
+
+    yield make_worker
+    for worker in workers:
+        runner.run(worker.close())
+
+
+async def test_lease_is_renewed_during_a_long_pass(tmp_path, open_manager, make_worker):
+    first_manager = await open_manager(tmp_path / "jobs.db")
+    second_manager = await open_manager(tmp_path / "jobs.db")
+    first = make_worker(first_manager, "first")
+    checked = []
+
+    async def slow_poll(jobs, consume):
+        # Longer than the lease of 3 seconds
+        checked.extend(job.job_id for job in jobs)
+        await asyncio.sleep(4.5)
+        return [(job, 0, None) for job in jobs]
+
+    first.result_poller.poll = slow_poll
+    await first_manager.add_job("1", 1, 10, 0, submissions_required=1)
+    pass_task = asyncio.create_task(first.run_pass())
+    await asyncio.sleep(4)
+    now = int(time.time())
+    assert await second_manager.claim_due_jobs("second", now, now + 3, 10) == []
+    await pass_task
+    assert checked == ["1"] and not first.held
+
+
+@pytest.mark.parametrize(
+    "error, stored",
+    [
+        (None, ("completed", 2, 0)),
+        # Results are published again after an outage of Discord
+        (discord.HTTPException(types.SimpleNamespace(status=503, reason=""), ""), ("pending", 0, 1)),
+        # A deleted channel never gets the results, so the job is no longer checked
+        (discord.NotFound(types.SimpleNamespace(status=404, reason=""), ""), ("failed", 0, 0)),
+        (discord.Forbidden(types.SimpleNamespace(status=403, reason=""), ""), ("failed", 0, 0)),
+    ],
+)
+async def test_cursor_advances_once_results_are_sent(database, make_worker, error, stored):
+    channel = StubChannel(error)
+    worker = make_worker(database, "first", types.SimpleNamespace(get_channel=lambda _: channel))
+
+    async def results():
+        for index in range(2):
+            yield {"workerAddress": f"0x{index}", "solution": "x"}
+
+    async def poll(jobs, consume):
+        return [(job, await consume(job, results()), None) for job in jobs]
+
+    worker.result_poller.poll = poll
+    await database.add_job("1", 1, 10, 0, submissions_required=2)
+    await worker.run_pass()
+    # Nothing is stored before the messages are sent
+    async with database.connection.execute("SELECT status, published_count, claimed_by FROM jobs") as cursor:
+        status, published_count, claimed_by = await cursor.fetchone()
+    assert (status, published_count) == ("pending", 0) and claimed_by is not None
+    while worker.result_publisher.senders:
+        await asyncio.sleep(0.01)
+    await worker.write_deliveries()
+    async with database.connection.execute("SELECT status, published_count, attempts FROM jobs") as cursor:
+        assert await cursor.fetchone() == stored
+    assert not worker.held
+
+
+async def test_jobs_of_a_failed_pass_are_released(tmp_path, open_manager, make_worker):
+    first_manager = await open_manager(tmp_path / "jobs.db")
+    second_manager = await open_manager(tmp_path / "jobs.db")
+    first = make_worker(first_manager, "first")
+
+    async def failing_poll(jobs, consume):
+        raise RuntimeError("database is locked")
+
+    first.result_poller.poll = failing_poll
+    await first_manager.add_job("1", 1, 10, 0, submissions_required=1)
+    with pytest.raises(RuntimeError):
+        await first.run_pass()
+    assert not first.held
+    async with first_manager.connection.execute("SELECT attempts, next_check_at, claimed_by FROM jobs") as cursor:
+        attempts, next_check_at, claimed_by = await cursor.fetchone()
+    assert attempts == 1 and claimed_by is None
+    # The job is claimed by the next worker once its backoff is over
+    claimed = await second_manager.claim_due_jobs("second", next_check_at, next_check_at + 3, 10)
+    assert [job.job_id for job in claimed] == ["1"]
+
+
+async def test_restore_only_releases_the_jobs_of_the_worker(database, make_worker):
+    now = int(time.time())
+    for job_id in ["mine", "other", "idle"]:
+        await database.add_job(job_id, 1, 10, now)
+    await database.write(
+        "UPDATE jobs SET claimed_by = ?, lease_expires_at = ? WHERE job_id = ?", ("first:earlier", now + 300, "mine")
+    )
+    await database.write(
+        "UPDATE jobs SET claimed_by = ?, lease_expires_at = ? WHERE job_id = ?", ("second:pass", now + 300, "other")
+    )
+    await database.write("UPDATE jobs SET next_check_at = ? WHERE job_id = ?", (now + 900, "idle"))
+    assert await make_worker(database, "first").restore() == 1
+    async with database.connection.execute("SELECT job_id, next_check_at, claimed_by FROM jobs") as cursor:
+        jobs = {job_id: (next_check_at, claimed_by) async for job_id, next_check_at, claimed_by in cursor}
+    # The backoff of every job is kept
+    assert jobs == {"mine": (now, None), "other": (now, "second:pass"), "idle": (now + 900, None)}
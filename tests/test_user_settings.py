@@ -0,0 +1,32 @@
+"""
+Author Sarthak Vijayvergiya - https://github.com/sarthakvijayvergiya
+Description: Tests of the user settings and their cache.
+"""
+
+
+async def test_settings_written_by_another_process_are_read(tmp_path, open_manager):
+    shard = await open_manager(tmp_path / "settings.db")
+    other_shard = await open_manager(tmp_path / "settings.db", settings_check_interval=0)
+    await shard.add_api_key(1, "old key")
+    await shard.add_result_channel(1, 10)
+    assert await other_shard.get_user_settings(1) == ("old key", "10")
+    await shard.add_api_key(1, "new key")
+    await shard.add_result_channel(1, 20)
+    assert await other_shard.get_user_settings(1) == ("new key", "20")
+    # Without settings changes, settings are answered from the cache, even after other writes
+    await shard.add_job("1", 1, 20, 0)
+    hits = other_shard.settings_cache.hits
+    assert await other_shard.get_user_settings(1) == ("new key", "20")
+    assert other_shard.settings_cache.hits == hits + 1
+
+
+async def test_settings_changes_are_checked_every_interval(tmp_path, open_manager):
+    shard = await open_manager(tmp_path / "settings.db")
+    other_shard = await open_manager(tmp_path / "settings.db", settings_check_interval=60)
+    await shard.add_api_key(1, "old key")
+    assert await other_shard.get_api_key(1) == "old key"
+    await shard.add_api_key(1, "new key")
+    # Within the interval, the cache is kept without reading the settings version
+    assert await other_shard.get_api_key(1) == "old key"
+    other_shard.settings_checked_at -= 60
+    assert await other_shard.get_api_key(1) == "new key"
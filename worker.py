@@ -0,0 +1,78 @@
+"""
+Author Sarthak Vijayvergiya - https://github.com/sarthakvijayvergiya
+Description: Checks the results of launched jobs and publishes them, without a gateway connection. Messages are
+sent over Discord's REST API, so several workers can run next to bot processes started with DISABLE_RESULT_POLLING.
+
+Usage: python worker.py
+"""
+
+import asyncio
+import os
+import time
+
+import discord
+from dotenv import load_dotenv
+
+from database import open_database
+from helpers.logger import process_log_file, setup_logging
+from services.external_api_handler import ExternalAPIHandler
+from services.http_client import create_http_session
+from services.metrics import REGISTRY, start_metrics_server
+from services.result_worker import ResultWorker
+
+load_dotenv()
+
+# Workers run side by side, so each one writes its own log file, or only logs to the console without a WORKER_ID
+logger = setup_logging(
+    log_file=process_log_file(os.getenv("WORKER_ID")) if os.getenv("WORKER_ID") else None
+)
+
+
+async def main() -> None:
+    client = discord.Client(intents=discord.Intents.none())
+    # Logging in only authenticates the REST client, connect() is never called
+    await client.login(os.getenv("TOKEN"))
+    database = await open_database()
+    http_session = None
+    metrics_server = None
+    result_worker = None
+    try:
+        applied = await database.initialize()
+        logger.info(f"Applied {applied} database migrations")
+        http_session = create_http_session()
+        if os.getenv("METRICS_PORT"):
+            REGISTRY.add_collector(database.collect_metrics)
+            metrics_server = await start_metrics_server(
+                os.getenv("METRICS_HOST", "127.0.0.1"), int(os.getenv("METRICS_PORT"))
+            )
+            logger.info(f"Serving metrics on port {os.getenv('METRICS_PORT')}")
+        result_worker = ResultWorker(
+            client, database, ExternalAPIHandler(http_session), logger=logger
+        )
+        await result_worker.restore()
+        # Check for due jobs as often as the shortest delay, like the loop of the JobLauncher cog
+        while True:
+            started_at = time.monotonic()
+            try:
+                await result_worker.run_pass()
+            except Exception as e:
+                logger.exception(f"Result check failed: {e}")
+            await asyncio.sleep(
+                max(0.0, result_worker.scheduler.min_interval - (time.monotonic() - started_at))
+            )
+    finally:
+        if result_worker is not None:
+            await result_worker.close()
+        if metrics_server is not None:
+            await metrics_server.cleanup()
+        if http_session is not None:
+            await http_session.close()
+        await database.close()
+        await client.close()
+
+
+if __name__ == "__main__":
+    try:
+        asyncio.run(main())
+    except KeyboardInterrupt:
+        pass